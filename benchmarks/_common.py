@@ -0,0 +1,109 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks build their synthetic stores under ``$STATSHOT_BENCH_DIR``
+(default: ``<tmp>/statshot-bench``) and reuse them between runs; the cache
+key includes the schema, so a column change triggers a rebuild, and derived
+data is refreshed on every open.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from statshot import schema, synth  # noqa: E402
+from statshot.ingest import refresh  # noqa: E402
+from statshot.store import Store  # noqa: E402
+
+
+def bench_dir() -> Path:
+    root = os.environ.get("STATSHOT_BENCH_DIR") or os.path.join(
+        tempfile.gettempdir(), "statshot-bench")
+    path = Path(root)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _schema_key() -> str:
+    spec = ",".join(f"{c.name}:{c.dtype.str}" for c in schema.COLUMNS)
+    return hashlib.sha1(spec.encode()).hexdigest()[:10]
+
+
+def synthetic_store(n_seasons: int, *, seed: int = 0, first_season: int = 2015) -> Store:
+    """A cached store holding ``n_seasons`` synthetic seasons."""
+    path = bench_dir() / f"store-{_schema_key()}-s{seed}-{first_season}x{n_seasons}"
+    done = path / ".complete"
+    if not done.exists():
+        shutil.rmtree(path, ignore_errors=True)
+        synth.build_store(path, range(first_season, first_season + n_seasons), seed=seed)
+        done.touch()
+    store = Store(path)
+    refresh(store)
+    return store
+
+
+def synthetic_feeds(fmt: str, *, season: int = 2015, seed: int = 0,
+                    n_games: int = synth.GAMES_PER_SEASON) -> Path:
+    """A cached directory of feed files for one synthetic season."""
+    games = "" if n_games == synth.GAMES_PER_SEASON else f"-g{n_games}"
+    path = bench_dir() / f"feeds-{_schema_key()}-s{seed}-{season}{games}-{fmt}"
+    done = path / ".complete"
+    if not done.exists():
+        shutil.rmtree(path, ignore_errors=True)
+        synth.write_feeds(synth.generate_season(season, seed=seed, n_games=n_games), path,
+                          fmt=fmt)
+        done.touch()
+    return path
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def timed(fn, *, repeat: int = 5):
+    """Run ``fn`` ``repeat`` times; return (best seconds, last result)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def arg_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--seed", type=int, default=0, help="synthetic data seed")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    return parser
+
+
+def report(title: str, results: dict, *, as_json: bool = False) -> None:
+    if as_json:
+        print(json.dumps({"benchmark": title, "results": results}, indent=1))
+        return
+    print(title)
+    width = max(map(len, results), default=0)
+    for key, value in results.items():
+        if isinstance(value, float):
+            value = f"{value:.4g}"
+        print(f"  {key:<{width}}  {value}")
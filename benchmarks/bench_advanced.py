@@ -0,0 +1,56 @@
+"""Season constants and adjusted stats: one bulk pass per season, then lookups.
+
+``compute_s`` derives every season's run-expectancy matrix, wOBA weights,
+park factors and per-pitch RE24/wOBA columns from scratch, ``write_s``
+stores them; that is what an ingest pays.  ``per_request_ms`` is the old
+way of answering one player's wRC+, deriving the constants for the
+request, against ``player_ms`` / ``leaderboard_ms`` / ``constants_ms``
+reading what the ingest kept.
+
+    python benchmarks/bench_advanced.py [--seasons 1 5]
+"""
+
+from __future__ import annotations
+
+from _common import arg_parser, report, synthetic_store, timed
+
+from statshot import advanced
+
+
+def measure(n_seasons: int, seed: int) -> dict:
+    store = synthetic_store(n_seasons, seed=seed)
+    partitions = list(store.partitions())
+    tables = [p.table().slice(0, p.rows) for p in partitions]
+    compute_s, seasons = timed(lambda: [advanced.compute(t) for t in tables], repeat=3)
+    write_s, _ = timed(lambda: [advanced._write(p, p.rows, s)
+                                for p, s in zip(partitions, seasons)], repeat=3)
+    results = {"pitches": sum(p.rows for p in partitions), "compute_s": compute_s,
+               "write_s": write_s}
+
+    season = store.seasons()[-1]
+    players = seasons[-1].players["batter"]
+    player = int(players[len(players) // 2])
+
+    def per_request():
+        data = advanced.compute(store.table(season))
+        return data.sums["batter"][data.players["batter"] == player]
+
+    results["per_request_ms"] = timed(per_request, repeat=3)[0] * 1e3
+    results["player_ms"] = timed(lambda: advanced.player_lines(
+        store, seasons=[season], players=[player]))[0] * 1e3
+    results["leaderboard_ms"] = timed(lambda: advanced.leaderboard(
+        store, seasons=[season], min_pa=300))[0] * 1e3
+    results["constants_ms"] = timed(lambda: advanced.constants(store, season))[0] * 1e3
+    return results
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, nargs="+", default=[1, 5])
+    args = parser.parse_args()
+    for n in args.seasons:
+        report(f"advanced stats, {n} season(s)", measure(n, args.seed), as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Load-test the HTTP API at 1, 8 and 64 concurrent keep-alive clients.
+
+The server runs as a separate process (``python -m statshot.api``) against a
+synthetic season and is restarted for every concurrency level, so each
+level starts with a cold cache.  Clients draw from a skewed mix of cheap
+player cards, rollup-backed leaderboards and expensive exit-velocity
+leaderboards that have to scan pitches; latencies are reported overall and
+split by the server's ``X-Cache`` answer.
+
+    python benchmarks/bench_api.py [--clients 1 8 64] [--duration 5] [--workers 2]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store
+
+from statshot import query
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def request_mix(store, rng: np.random.Generator, n: int) -> list[str]:
+    table = store.table()
+    batters = np.unique(table["batter"])
+    pitchers = np.unique(table["pitcher"])
+    rng.shuffle(batters)
+    rng.shuffle(pitchers)
+
+    def zipf_pick(items):
+        weights = 1.0 / np.arange(1, len(items) + 1) ** 1.1
+        return items[rng.choice(len(items), p=weights / weights.sum())]
+
+    paths = []
+    for kind in rng.choice(4, size=n, p=[0.55, 0.2, 0.15, 0.1]):
+        if kind == 0:
+            paths.append(f"/player/{zipf_pick(batters)}")
+        elif kind == 1:
+            paths.append(f"/player/{zipf_pick(pitchers)}?role=pitcher&split=count")
+        elif kind == 2:
+            stat = rng.choice(["woba", "obp", "slg", "k_pct"])
+            split = rng.choice(list(query.SPLITS))
+            paths.append(f"/leaderboard?stat={stat}&split={split}&min_pa=50")
+        else:
+            split = rng.choice(list(query.SPLITS))
+            paths.append(f"/leaderboard?stat=ev_p90&split={split}&min_pa=50")
+    return paths
+
+
+async def client(port: int, paths: list[str], deadline: float, out: list) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            headers = dict(line.split(": ", 1) for line in head.decode().split("\r\n")[1:] if line)
+            await reader.readexactly(int(headers["Content-Length"]))
+            out.append((time.perf_counter() - start, headers.get("X-Cache") == "hit",
+                        head.startswith(b"HTTP/1.1 200")))
+    finally:
+        writer.close()
+
+
+def start_server(root: Path, workers: int) -> tuple[subprocess.Popen, int]:
+    env = dict(os.environ, PYTHONPATH=str(REPO))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "statshot.api", "--store", str(root), "--port", "0",
+         "--workers", str(workers)],
+        stdout=subprocess.PIPE, text=True, env=env)
+    line = proc.stdout.readline()
+    if not line:
+        raise RuntimeError("API server did not start")
+    return proc, int(line.rsplit(":", 1)[1])
+
+
+def measure(root: Path, paths: list[str], clients: int, duration: float, workers: int) -> dict:
+    proc, port = start_server(root, workers)
+    try:
+        samples: list = []
+
+        async def run() -> None:
+            deadline = time.perf_counter() + duration
+            step = max(len(paths) // clients, 1)
+            await asyncio.gather(*(client(port, paths[i * step:] + paths[:i * step],
+                                          deadline, samples) for i in range(clients)))
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    lat = np.array([s[0] for s in samples])
+    hit = np.array([s[1] for s in samples])
+    ok = np.array([s[2] for s in samples])
+
+    def pct(values, q):
+        return float(np.percentile(values, q) * 1e3) if len(values) else float("nan")
+
+    return {
+        "requests": len(samples),
+        "errors": int((~ok).sum()),
+        "requests_per_s": len(samples) / elapsed,
+        "hit_rate": float(hit.mean()) if len(hit) else 0.0,
+        "p50_ms": pct(lat, 50),
+        "p99_ms": pct(lat, 99),
+        "p999_ms": pct(lat, 99.9),
+        "hit_p99_ms": pct(lat[hit], 99),
+        "miss_p50_ms": pct(lat[~hit], 50),
+        "miss_p99_ms": pct(lat[~hit], 99),
+    }
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per level")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="server query worker processes")
+    args = parser.parse_args()
+
+    store = synthetic_store(1, seed=args.seed)
+    paths = request_mix(store, np.random.default_rng(args.seed), 50_000)
+    for clients in args.clients:
+        report(f"API with {clients} concurrent client(s)",
+               measure(store.root, paths, clients, args.duration, args.workers),
+               as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
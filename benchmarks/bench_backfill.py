@@ -0,0 +1,80 @@
+"""Parallel backfill of several seasons of JSON feeds at increasing worker counts.
+
+Each run loads every season into an empty store.  ``speedup`` is relative to
+the single-worker run; ``resume_s`` times a backfill that finds half of the
+shards already staged by an interrupted run.
+
+    python benchmarks/bench_backfill.py [--seasons 4] [--games 1200] [--by month]
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from _common import arg_parser, report, synthetic_feeds
+
+from statshot import backfill
+from statshot.store import Store
+
+
+def feeds_dir(n_seasons: int, n_games: int, seed: int, scratch: str) -> Path:
+    """One directory tree linking to every season's cached feed files."""
+    root = Path(scratch, "feeds")
+    for season in range(2015, 2015 + n_seasons):
+        cached = synthetic_feeds("json", season=season, seed=seed, n_games=n_games)
+        (root / str(season)).mkdir(parents=True)
+        for path in cached.glob("*.json"):
+            os.symlink(path, root / str(season) / path.name)
+    return root
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, default=4)
+    parser.add_argument("--games", type=int, default=1200, help="games per season")
+    parser.add_argument("--by", choices=backfill.SHARD_BY, default="month")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="statshot-backfill-")
+    try:
+        feeds = feeds_dir(args.seasons, args.games, args.seed, scratch)
+        baseline = None
+        for workers in args.workers:
+            path = Path(scratch, f"store-{workers}")
+            result = backfill.backfill(Store(path, create=True), feeds, by=args.by,
+                                       workers=workers)
+            shutil.rmtree(path)
+            baseline = baseline or result.seconds
+            report(f"backfill with {workers} worker(s)", {
+                "shards": result.shards,
+                "games": result.games_added,
+                "pitches": result.pitches,
+                "stage_s": result.stage_seconds,
+                "merge_s": result.merge_seconds,
+                "total_s": result.seconds,
+                "pitches_per_s": result.pitches_per_second,
+                "speedup": baseline / result.seconds,
+            }, as_json=args.json)
+
+        workers = max(args.workers)
+        store = Store(Path(scratch, "resume"), create=True)
+        shards = backfill.plan(feeds, by=args.by)
+        for shard in shards[::2]:
+            backfill.stage(store.root, shard)
+        resumed = backfill.backfill(store, feeds, by=args.by, workers=workers)
+        report(f"resumed backfill with {workers} worker(s)", {
+            "shards_resumed": resumed.shards_resumed,
+            "shards_staged": resumed.shards_staged,
+            "resume_s": resumed.seconds,
+        }, as_json=args.json)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
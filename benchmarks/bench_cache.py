@@ -0,0 +1,110 @@
+"""Replay a Zipf-skewed dashboard query log through the result cache.
+
+The query universe is every player card (per role, for a few splits and stat
+sets) plus a grid of leaderboards; it is shuffled and queries are drawn with
+probability proportional to ``1 / rank**s``.  The same log is replayed with
+no cache to get the uncached latency, and ``--ingest-every`` bumps the store
+generation periodically to show invalidation.
+
+    python benchmarks/bench_cache.py [--queries 20000] [--zipf 1.1] [--max-mb 16]
+"""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store
+
+from statshot import query
+from statshot.cache import CachedQueries, ResultCache
+
+CARD_SPLITS = (None, "count", "month", "pitch_type")
+CARD_STATS = (None, ("avg", "obp", "slg"), ("k_pct", "bb_pct", "ev_p50", "ev_p90"))
+BOARD_STATS = ("woba", "avg", "obp", "slg", "ops", "hr", "k_pct", "bb_pct")
+BOARD_SPLITS = (None, "stand", "p_throws", "home_away", "month")
+
+
+def query_universe(store) -> list[tuple]:
+    table = store.table()
+    universe = []
+    for role in query.ROLES:
+        for player in np.unique(table[role]).tolist():
+            for split in CARD_SPLITS:
+                for stats in CARD_STATS:
+                    universe.append(("player", role, player, split, stats))
+        for stat in BOARD_STATS:
+            for split in BOARD_SPLITS:
+                universe.append(("leaderboard", role, stat, split, None))
+    return universe
+
+
+def run(service: CachedQueries | None, store, log: list[tuple]):
+    latencies = np.empty(len(log))
+    for i, (kind, role, target, split, stats) in enumerate(log):
+        start = time.perf_counter()
+        if kind == "player":
+            if service is None:
+                query.player_card(store, target, role=role, split=split,
+                                  ev_percentiles=(50, 90) if stats and "ev_p50" in stats else ())
+            else:
+                service.player_card(target, role=role, split=split, stats=stats)
+        elif service is None:
+            query.leaderboard(store, target, role=role, split=split, min_pa=100, limit=50)
+        else:
+            service.leaderboard(target, role=role, split=split, min_pa=100, limit=50)
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent s")
+    parser.add_argument("--max-mb", type=float, default=16.0, help="cache size bound")
+    parser.add_argument("--ingest-every", type=int, default=0,
+                        help="bump the store generation every N queries (0: never)")
+    parser.add_argument("--uncached", type=int, default=2000,
+                        help="how many of the queries to also replay without a cache")
+    args = parser.parse_args()
+
+    store = synthetic_store(1, seed=args.seed)
+    universe = query_universe(store)
+    rng = np.random.default_rng(args.seed)
+    rng.shuffle(universe)
+    weights = 1.0 / np.arange(1, len(universe) + 1) ** args.zipf
+    picks = rng.choice(len(universe), size=args.queries, p=weights / weights.sum())
+    log = [universe[i] for i in picks]
+
+    cache = ResultCache(int(args.max_mb * 2**20))
+    service = CachedQueries(store, cache)
+    latencies = np.empty(len(log))
+    step = args.ingest_every or len(log)
+    for lo in range(0, len(log), step):
+        latencies[lo:lo + step] = run(service, store, log[lo:lo + step])
+        if args.ingest_every:
+            store.bump_generation()
+    uncached = run(None, store, log[:args.uncached])
+
+    stats = cache.stats()
+    results = {
+        "distinct_queries": len(universe),
+        "queries": len(log),
+        "hit_rate": stats.hit_rate,
+        "hits": stats.hits,
+        "misses": stats.misses,
+        "evictions": stats.evictions,
+        "invalidations": stats.invalidations,
+        "cache_entries": stats.entries,
+        "cache_mb": stats.bytes / 2**20,
+        "p50_us": np.percentile(latencies, 50) * 1e6,
+        "p99_us": np.percentile(latencies, 99) * 1e6,
+        "uncached_p50_us": np.percentile(uncached, 50) * 1e6,
+        "uncached_p99_us": np.percentile(uncached, 99) * 1e6,
+    }
+    report("zipf query replay", results, as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Start-to-exit time of the ``statshot`` command line.
+
+Each command runs as a fresh ``python -m statshot`` process, the way cron
+jobs and shell scripts call it: once with an empty output cache (``miss``,
+which imports NumPy, maps the store and computes) and then repeatedly
+(``hit``, answered from the cache).  The interpreter's own start-up and a
+bare ``import numpy`` are timed for reference.
+
+    python benchmarks/bench_cli.py [--runs 20]
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store
+
+from statshot.cli import CACHE_DIR
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def _run_ms(argv: list[str], env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run(argv, env=env, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1e3
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    store = synthetic_store(1, seed=args.seed)
+    player = int(store.table()["batter"][0])
+    env = dict(os.environ, PYTHONPATH=str(REPO))
+    cli = [sys.executable, "-m", "statshot", "--store", str(store.root)]
+
+    baseline = {
+        "python_ms": np.median([_run_ms([sys.executable, "-c", "pass"], env)
+                                for _ in range(args.runs)]),
+        "import_numpy_ms": np.median([_run_ms([sys.executable, "-c", "import numpy"], env)
+                                      for _ in range(args.runs)]),
+    }
+    report("interpreter baseline", {k: float(v) for k, v in baseline.items()},
+           as_json=args.json)
+
+    commands = {
+        "leaderboard": ["leaderboard", "woba", "--split", "stand", "--level", "L",
+                        "--min-pa", "100"],
+        "player": ["player", str(player), "--split", "count"],
+        "player_ev": ["player", str(player), "--stats", "pa,avg,ev_p50,ev_p90"],
+        "splits": ["splits", "month", "--players", str(player)],
+    }
+    for name, command in commands.items():
+        shutil.rmtree(store.root / CACHE_DIR, ignore_errors=True)
+        miss = _run_ms(cli + command, env)
+        hits = [_run_ms(cli + command, env) for _ in range(args.runs)]
+        report(f"statshot {name}", {
+            "miss_ms": miss,
+            "hit_p50_ms": float(np.median(hits)),
+            "hit_max_ms": max(hits),
+            "hit_under_100ms": max(hits) < 100,
+        }, as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
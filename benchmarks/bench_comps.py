@@ -0,0 +1,83 @@
+"""Pitch comps: brute force against the k-nearest-neighbour index.
+
+Queries are random pitches of one season; each asks for its ``k`` nearest
+pitches on :data:`~statshot.comps.PITCH_FEATURES`.  ``python_ms`` is a
+plain Python scan over every pitch (a few queries only), ``exact_ms`` the
+same scan vectorized, and ``probe<N>_ms`` / ``probe<N>_recall`` the index
+probing ``N`` cells, with recall the share of the exact neighbours found.
+
+    python benchmarks/bench_comps.py [--queries 200] [--k 10]
+"""
+
+from __future__ import annotations
+
+import math
+import time
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store, timed
+
+from statshot import comps
+
+PROBES = (1, 2, 4, 8, 16, 32)
+
+
+def _python_scan(vectors: list[list[float]], point: list[float], k: int) -> list[int]:
+    best = []
+    for row, vector in enumerate(vectors):
+        best.append((math.dist(vector, point), row))
+    best.sort()
+    return [row for _, row in best[:k]]
+
+
+def _per_query(fn, points) -> float:
+    start = time.perf_counter()
+    for point in points:
+        fn(point)
+    return (time.perf_counter() - start) / len(points) * 1e3
+
+
+def measure(n_queries: int, k: int, seed: int) -> dict:
+    store = synthetic_store(1, seed=seed)
+    season = store.seasons()[0]
+    partition = store.partition(season)
+    features = comps.pitch_features(partition.table())
+    build_s, knn = timed(lambda: comps.build(features), repeat=1)
+    results = {"pitches": len(knn), "cells": len(knn.centroids), "build_s": build_s}
+
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(knn.rows, n_queries, replace=False)
+    points = knn.normalize(features[picked])
+    exact = [set(knn.exact(p, k, normalized=True)[0].tolist()) for p in points]
+
+    vectors = knn.vectors.tolist()
+    few = points[:3].tolist()
+    results["python_ms"] = _per_query(lambda p: _python_scan(vectors, p, k), few)
+    results["exact_ms"] = _per_query(lambda p: knn.exact(p, k, normalized=True), points)
+    for nprobe in PROBES:
+        found = [knn.search(p, k, nprobe=nprobe, normalized=True)[0] for p in points]
+        results[f"probe{nprobe}_recall"] = float(np.mean(
+            [len(truth.intersection(rows.tolist())) / k for truth, rows in zip(exact, found)]))
+        results[f"probe{nprobe}_ms"] = _per_query(
+            lambda p: knn.search(p, k, nprobe=nprobe, normalized=True), points)
+
+    pitchers = store.table(season)["pitcher"]
+    pitcher = int(pitchers[rng.integers(len(pitchers))])
+    comps.update(partition)
+    results["pitch_comps_ms"] = timed(
+        lambda: comps.similar_pitches(store, pitcher, "FF", season=season))[0] * 1e3
+    return results
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    report(f"pitch comps, k={args.k}", measure(args.queries, args.k, args.seed),
+           as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
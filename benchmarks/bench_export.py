@@ -0,0 +1,80 @@
+"""Arrow handoff and streaming Parquet export of whole seasons.
+
+``arrow_us`` wraps a season's every column as an Arrow table over the
+column maps (categoricals as dictionary arrays), against ``copy_ms``
+building the same table from copies.  ``parquet_s`` streams all seasons to
+one zstd Parquet file in row groups of ``--row-group-rows``; ``peak_rss_mb``
+is how far the process grew while it did (sampled every few milliseconds),
+next to ``events_mb``, the size of the columns written.
+
+    python benchmarks/bench_export.py [--seasons 1 10] [--row-group-rows 1048576]
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from _common import arg_parser, report, rss_bytes, synthetic_store, timed
+
+from statshot import export
+
+
+class _PeakRss:
+    """Highest resident set size seen while the block runs."""
+
+    def __enter__(self):
+        self.peak = self.start = rss_bytes()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self) -> None:
+        while not self._done.wait(0.005):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __exit__(self, *exc) -> None:
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+def measure(n_seasons: int, row_group_rows: int, seed: int) -> dict:
+    store = synthetic_store(n_seasons, seed=seed)
+    season = store.seasons()[0]
+    table = store.table(season)
+    results = {"pitches": sum(p.rows for p in store.partitions()),
+               "events_mb": sum(p.rows for p in store.partitions())
+               * sum(table[name].itemsize for name in table.columns) / 2**20}
+    results["arrow_us"] = timed(lambda: export.to_arrow(store.table(season)))[0] * 1e6
+    results["copy_ms"] = timed(lambda: export.to_arrow(
+        {name: np.array(table[name]) for name in table.columns}), repeat=3)[0] * 1e3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "events.parquet")
+        with _PeakRss() as rss:
+            seconds, rows = timed(lambda: export.write_parquet(
+                store, path, row_group_rows=row_group_rows), repeat=1)
+        results["parquet_s"] = seconds
+        results["parquet_rows_per_s"] = rows / seconds
+        results["file_mb"] = os.path.getsize(path) / 2**20
+    results["peak_rss_mb"] = (rss.peak - rss.start) / 2**20
+    return results
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--row-group-rows", type=int, default=export.ROW_GROUP_ROWS)
+    args = parser.parse_args()
+    for n in args.seasons:
+        report(f"export, {n} season(s)", measure(n, args.row_group_rows, args.seed),
+               as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""On-disk size and decode throughput of the column formats.
+
+One synthetic season is copied into stores using each codec, in appends of
+ingest-batch size (so compressed columns get realistic block sizes).
+``decode`` opens a fresh store and materializes every column: for raw
+columns that is reading the mapped pages, for compressed ones decompressing
+every block.  ``wide`` is the same rows as 8-byte numbers per field, for
+scale.
+
+    python benchmarks/bench_format.py [--codecs raw zlib zstd]
+"""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store
+
+from statshot import schema
+from statshot.store import CODECS, Store
+
+_BATCH = 250_000
+
+
+def measure(codec: str, columns: dict[str, np.ndarray], scratch: str) -> dict:
+    path = Path(scratch, codec)
+    store = Store(path, create=True, codecs=None if codec == "raw" else codec)
+    n = len(columns["game_pk"])
+    start = time.perf_counter()
+    for lo in range(0, n, _BATCH):
+        store.append(2015, {name: array[lo:lo + _BATCH] for name, array in columns.items()})
+    write_s = time.perf_counter() - start
+    disk = sum(f.stat().st_size for f in path.glob("season=*/*.bin"))
+
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        part = Store(path).partition(2015)
+        for name in schema.COLUMN_NAMES:
+            np.add.reduce(part.column(name).view(np.uint8))
+        best = min(best, time.perf_counter() - start)
+    decoded = sum(part.column(name).nbytes for name in schema.COLUMN_NAMES)
+    shutil.rmtree(path)
+    return {
+        "wide_bytes_per_pitch": 8 * len(columns),
+        "bytes_per_pitch": disk / n,
+        "memory_bytes_per_pitch": decoded / n,
+        "ten_seasons_mb": disk / n * 10 * n / 2**20,
+        "write_pitches_per_s": n / write_s,
+        "decode_ms": best * 1e3,
+        "decode_mb_per_s": decoded / best / 2**20,
+        "decode_pitches_per_s": n / best,
+    }
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--codecs", nargs="+", default=["raw", *CODECS])
+    args = parser.parse_args()
+
+    columns = {name: np.array(array) for name, array in
+               synthetic_store(1, seed=args.seed).table().to_dict().items()}
+    scratch = tempfile.mkdtemp(prefix="statshot-format-")
+    try:
+        for codec in args.codecs:
+            report(f"format: {codec}", measure(codec, columns, scratch), as_json=args.json)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
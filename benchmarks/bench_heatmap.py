@@ -0,0 +1,61 @@
+"""Spray charts and zone heatmaps for one player and for the whole league.
+
+``bin`` histograms the pitches directly (every batter and pitcher on both
+grids, then one player through his rows); ``cached`` reads the per-season
+heatmaps kept at ingest.  ``density`` normalizes every player's grid, the
+step between the counts and a rendered chart.
+
+    python benchmarks/bench_heatmap.py [--seasons 1 3]
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store, timed
+
+from statshot import heatmap, query
+
+
+def measure(n_seasons: int, seed: int) -> dict:
+    store = synthetic_store(n_seasons, seed=seed)
+    table = store.table()
+    results = {"pitches": len(table)}
+    for grid in heatmap.GRIDS:
+        league_bin = league_cached = density = player_bin = player_cached = 0.0
+        players = 0
+        for role in query.ROLES:
+            seconds, binned = timed(lambda: heatmap.heatmaps(table, grid, role=role), repeat=3)
+            league_bin += seconds
+            seconds, cached = timed(lambda: heatmap.heatmaps(store, grid, role=role))
+            league_cached += seconds
+            assert np.array_equal(binned.counts, cached.counts)
+            seconds, _ = timed(cached.density)
+            density += seconds
+            players += len(cached.players)
+
+            player = int(cached.players[len(cached.players) // 2])
+            seconds, one = timed(lambda: heatmap.player_heatmap(table, player, grid, role=role))
+            player_bin += seconds
+            seconds, _ = timed(lambda: heatmap.player_heatmap(store, player, grid, role=role))
+            player_cached += seconds
+            assert np.array_equal(one, cached.get(player))
+        results[f"{grid}_players"] = players
+        results[f"{grid}_league_bin_ms"] = league_bin * 1e3
+        results[f"{grid}_league_cached_ms"] = league_cached * 1e3
+        results[f"{grid}_density_ms"] = density * 1e3
+        results[f"{grid}_player_bin_ms"] = player_bin / 2 * 1e3
+        results[f"{grid}_player_cached_ms"] = player_cached / 2 * 1e3
+    return results
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, nargs="+", default=[1, 3])
+    args = parser.parse_args()
+    for n in args.seasons:
+        report(f"heatmaps, {n} season(s)", measure(n, args.seed), as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
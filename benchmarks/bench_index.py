@@ -0,0 +1,72 @@
+"""Per-player lookups through the season indexes versus a full scan.
+
+For a sample of batters and pitchers, ``scan`` filters the whole player
+column of every season and ``index`` binary-searches each season's index for
+the player's slice of row numbers.  The ``card`` rows time a complete player
+card with exit-velocity percentiles (which rollups cannot answer) over the
+whole table and through :func:`statshot.index.select`.
+
+    python benchmarks/bench_index.py [--seasons 1 10] [--players 200]
+"""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store
+
+from statshot import index, query
+
+
+def _median_us(fn, items) -> float:
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1e6)
+
+
+def measure(n_seasons: int, n_players: int, seed: int) -> dict:
+    store = synthetic_store(n_seasons, seed=seed)
+    parts = [p for p in store.partitions() if p.rows]
+    table = store.table()
+    rng = np.random.default_rng(seed)
+    results = {"pitches": len(table)}
+    for role in query.ROLES:
+        column = table[role]
+        players = rng.choice(np.unique(column), n_players, replace=False).tolist()
+        indexes = [index.load(part)[role] for part in parts]
+        for player in players[:5]:
+            found = np.concatenate([ix.lookup(player) for ix in indexes])
+            assert len(found) == np.count_nonzero(column == player)
+
+        scan_us = _median_us(lambda p: np.flatnonzero(column == p), players)
+        index_us = _median_us(lambda p: [ix.lookup(p) for ix in indexes], players)
+        results[f"{role}_scan_us"] = scan_us
+        results[f"{role}_index_us"] = index_us
+        results[f"{role}_speedup"] = scan_us / index_us
+
+        card = dict(role=role, ev_percentiles=(50, 90))
+        sample = players[:20]
+        results[f"{role}_card_scan_ms"] = _median_us(
+            lambda p: query.player_card(table, p, **card), sample) / 1e3
+        results[f"{role}_card_index_ms"] = _median_us(
+            lambda p: query.player_card(store, p, **card), sample) / 1e3
+    return results
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--players", type=int, default=200)
+    args = parser.parse_args()
+    for n in args.seasons:
+        report(f"player lookups, {n} season(s)", measure(n, args.players, args.seed),
+               as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
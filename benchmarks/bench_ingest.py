@@ -0,0 +1,71 @@
+"""Ingest throughput for one season of JSON and CSV game feeds.
+
+Three passes per format:
+
+* ``full``: ingest a whole season into an empty store;
+* ``repull``: ingest the same directory again; unchanged files are skipped
+  via the ingest manifest, ``rescan`` forces them to be parsed (every game is
+  then skipped by id);
+* ``daily``: the feed directory and store hold every day but the last; the
+  last day's files land and the whole directory is pulled again.
+
+    python benchmarks/bench_ingest.py [--formats json csv]
+"""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+from pathlib import Path
+
+from _common import arg_parser, report, synthetic_feeds
+
+from statshot.ingest import ingest, iter_feed_files
+from statshot.store import Store
+
+
+def measure(fmt: str, seed: int) -> dict:
+    feeds = synthetic_feeds(fmt, seed=seed)
+    scratch = tempfile.mkdtemp(prefix="statshot-ingest-")
+    try:
+        store = Store(f"{scratch}/full", create=True)
+        full = ingest(store, feeds)
+        repull = ingest(store, feeds)
+        rescan = ingest(store, feeds, rescan=True)
+
+        files = list(iter_feed_files(feeds))
+        last_day = max(f.name[:8] for f in files)
+        pulled = Path(scratch, "pulled")
+        pulled.mkdir()
+        daily_store = Store(f"{scratch}/daily", create=True)
+        for before_last in (True, False):
+            for path in files:
+                if (path.name[:8] < last_day) == before_last:
+                    shutil.copy2(path, pulled / path.name)
+            daily = ingest(daily_store, pulled)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "files": full.files,
+        "games": full.games_added,
+        "pitches": full.pitches,
+        "full_s": full.seconds,
+        "full_pitches_per_s": full.pitches_per_second,
+        "repull_s": repull.seconds,
+        "rescan_s": rescan.seconds,
+        "daily_games_added": daily.games_added,
+        "daily_s": daily.seconds,
+    }
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--formats", nargs="+", default=["json", "csv"])
+    args = parser.parse_args()
+    for fmt in args.formats:
+        report(f"ingest {fmt} feeds", measure(fmt, args.seed), as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
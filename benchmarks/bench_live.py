@@ -0,0 +1,101 @@
+"""End-to-end latency of live updates for a full slate of concurrent games.
+
+A writer thread replays a 15-game stand-in slate, stamping each event with
+its send time; the reader takes it off a tailed file or a socket, applies
+it to a :class:`~statshot.live.LiveBoard` over a season in the store and
+reads back the batter's line and the wOBA and K% leaderboards.  Latency is
+send to updated result.  ``apply`` is the same work without the transport.
+A real slate sends about one pitch a second; ``--rate`` replays far faster.
+
+    python benchmarks/bench_live.py [--games 15] [--rate 500]
+"""
+
+from __future__ import annotations
+
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store
+
+from statshot import live
+
+
+def _board(store, season: int) -> live.LiveBoard:
+    board = live.LiveBoard(store, season)
+    board.leaderboard("woba", min_pa=100)
+    board.leaderboard("k_pct", "pitcher", min_pa=100)
+    return board
+
+
+def _consume(board: live.LiveBoard, records) -> list[float]:
+    latencies = []
+    for record in records:
+        if not board.apply(record):
+            continue                    # a game's final record
+        board.line(int(record["batter"]))
+        board.leaderboard("woba", min_pa=100)
+        board.leaderboard("k_pct", "pitcher", min_pa=100)
+        latencies.append(time.perf_counter() - record["sent"])
+    return latencies
+
+
+def _summary(prefix: str, latencies: list[float]) -> dict:
+    ms = np.array(latencies) * 1e3
+    return {f"{prefix}_p50_ms": float(np.median(ms)),
+            f"{prefix}_p99_ms": float(np.percentile(ms, 99)),
+            f"{prefix}_max_ms": float(ms.max())}
+
+
+def measure(n_games: int, rate: float, seed: int) -> dict:
+    store = synthetic_store(1, seed=seed)
+    season = store.seasons()[0]
+    slate = live.stand_in(season, n_games=n_games, seed=seed + 1)
+    results = {"games": n_games,
+               "events": sum(live.FINAL_FIELD not in record for record in slate)}
+
+    board = _board(store, season)
+    latencies = []
+    for record in slate:
+        record = {**record, "sent": time.perf_counter()}
+        latencies.extend(_consume(board, [record]))
+    results.update(_summary("apply", latencies))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, "slate.ndjson")
+        done = threading.Event()
+        writer = threading.Thread(target=lambda: (live.replay(slate, path, rate=rate,
+                                                              stamp=True), done.set()))
+        writer.start()
+        results.update(_summary("tail", _consume(_board(store, season),
+                                                 live.tail(path, poll=0.001, stop=done))))
+        writer.join()
+
+    ready, bound = threading.Event(), []
+
+    def send() -> None:
+        ready.wait()
+        live.replay(slate, bound[0], rate=rate, stamp=True)
+
+    writer = threading.Thread(target=send)
+    writer.start()
+    events = live.listen(ready=ready, bound=bound, connections=1)
+    results.update(_summary("socket", _consume(_board(store, season), events)))
+    writer.join()
+    return results
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=15)
+    parser.add_argument("--rate", type=float, default=500.0, help="events per second")
+    args = parser.parse_args()
+    report(f"live updates, {args.games} games at {args.rate:g} events/s",
+           measure(args.games, args.rate, args.seed), as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Load time and resident memory for one and five seasons of pitches.
+
+"Load" maps every column of every requested season; "scan" then reads every
+byte once, which is the upper bound on what a query can pull into memory.
+
+    python benchmarks/bench_load.py [--seasons 1 5]
+"""
+
+from __future__ import annotations
+
+import gc
+import time
+
+import numpy as np
+
+from _common import arg_parser, report, rss_bytes, synthetic_store
+
+from statshot.store import Store
+
+
+def measure(n_seasons: int, seed: int) -> dict:
+    root = synthetic_store(n_seasons, seed=seed).root
+    gc.collect()
+    rss_before = rss_bytes()
+
+    start = time.perf_counter()
+    store = Store(root)
+    tables = [part.table() for part in store.partitions()]
+    arrays = [table[name] for table in tables for name in table.columns]
+    load_s = time.perf_counter() - start
+    rss_loaded = rss_bytes()
+
+    start = time.perf_counter()
+    for array in arrays:
+        np.add.reduce(array.view(np.uint8))
+    scan_s = time.perf_counter() - start
+    rss_scanned = rss_bytes()
+
+    return {
+        "pitches": sum(len(t) for t in tables),
+        "bytes_on_disk": sum(a.nbytes for a in arrays),
+        "load_ms": load_s * 1e3,
+        "scan_ms": scan_s * 1e3,
+        "rss_after_load_mb": (rss_loaded - rss_before) / 2**20,
+        "rss_after_scan_mb": (rss_scanned - rss_before) / 2**20,
+    }
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, nargs="+", default=[1, 5])
+    args = parser.parse_args()
+    for n in args.seasons:
+        report(f"load {n} season(s)", measure(n, args.seed), as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
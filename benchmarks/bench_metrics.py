@@ -0,0 +1,69 @@
+"""Cost of the metrics registry, and what it reports for a query mix.
+
+``span_ns`` is the overhead of one empty instrumented block; ``query_ms`` /
+``profiled_ms`` time a scanned leaderboard without and with slow-query
+profiling on.  The ``cpu_<split>`` rows are read back from the registry
+after a mix of player cards and leaderboards over every split, as a game-day
+dashboard would find which splits dominate.
+
+    python benchmarks/bench_metrics.py [--queries 200]
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store, timed
+
+from statshot import metrics, query
+
+
+def measure(n_queries: int, seed: int) -> dict:
+    store = synthetic_store(1, seed=seed)
+    registry = metrics.Registry()
+    n = 100_000
+
+    def spans():
+        for _ in range(n):
+            with registry.span("bench", kind="empty"):
+                pass
+
+    seconds, _ = timed(spans, repeat=3)
+    results = {"span_ns": seconds / n * 1e9}
+
+    def scan():
+        return query.leaderboard(store, "ev_p90", split="count", min_pa=50)
+
+    results["query_ms"] = timed(scan)[0] * 1e3
+    metrics.REGISTRY.profile_slow(0.0)
+    try:
+        results["profiled_ms"] = timed(scan)[0] * 1e3
+    finally:
+        metrics.REGISTRY.profile_slow(None)
+
+    metrics.REGISTRY.reset()
+    rng = np.random.default_rng(seed)
+    batters = np.unique(store.table()["batter"])
+    splits = [None, *query.SPLITS]
+    for _ in range(n_queries):
+        split = splits[rng.integers(len(splits))]
+        if rng.random() < 0.7:
+            query.player_card(store, int(rng.choice(batters)), split=split)
+        else:
+            query.leaderboard(store, "woba", split=split, min_pa=100)
+    for timer in metrics.REGISTRY.snapshot()["timers"]:
+        if timer["name"] == "query":
+            key = f"cpu_{timer['labels']['split']}_ms"
+            results[key] = results.get(key, 0.0) + timer["seconds"] * 1e3
+    return results
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    report("metrics registry", measure(args.queries, args.seed), as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
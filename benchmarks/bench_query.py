@@ -0,0 +1,103 @@
+"""League-wide leaderboards per split: vectorized engine vs a per-event loop.
+
+For each split the vectorized :func:`statshot.query.leaderboard` is timed
+(best of ``--repeat``) against a straightforward Python loop over every
+pitch that accumulates the same counting stats and exit velocities in dicts.
+Both produce the same wOBA for every (player, level); the benchmark checks.
+``rollup_ms`` is the same leaderboard without exit velocities, answered from
+the season rollup instead of the pitches.
+
+    python benchmarks/bench_query.py [--role batter] [--splits count month]
+"""
+
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store, timed
+
+from statshot import query
+
+
+def naive_lines(table, role: str, split: str | None) -> dict:
+    """(player, level) -> [wOBA, ev_p50] computed one pitch at a time."""
+    spec = query.SPLITS[split] if split else None
+    n = len(table)
+    all_rows = np.arange(n)
+    levels = spec.levels(table, all_rows, role).tolist() if spec else [0] * n
+    players = table[role].tolist()
+    events = table["event"].tolist()
+    speeds = table["launch_speed"].tolist()
+    stats = query.EVENT_STATS.tolist()
+    totals: dict = defaultdict(lambda: [0] * len(query.COUNTING_STATS))
+    evs: dict = defaultdict(list)
+    for player, level, event, speed in zip(players, levels, events, speeds):
+        if not event:
+            continue
+        acc = totals[(player, level)]
+        for i, inc in enumerate(stats[event]):
+            acc[i] += inc
+        if speed == speed:
+            evs[(player, level)].append(speed)
+
+    col = {name: i for i, name in enumerate(query.COUNTING_STATS)}
+    out = {}
+    for key, acc in totals.items():
+        num = sum(w * acc[col[k]] for k, w in query.WOBA_WEIGHTS.items())
+        den = acc[col["ab"]] + acc[col["bb"]] + acc[col["sf"]] + acc[col["hbp"]]
+        speeds = sorted(evs.get(key, ()))
+        ev50 = float("nan")
+        if speeds:
+            pos = (len(speeds) - 1) * 0.5
+            lo = int(pos)
+            hi = min(lo + 1, len(speeds) - 1)
+            ev50 = speeds[lo] + (speeds[hi] - speeds[lo]) * (pos - lo)
+        out[key] = [num / den if den else float("nan"), ev50]
+    return out
+
+
+def measure(store, role: str, split: str | None, repeat: int) -> dict:
+    table = store.table()
+    fast_s, board = timed(lambda: query.leaderboard(table, "woba", role=role, split=split,
+                                                    ev_percentiles=(50,)),
+                          repeat=repeat)
+    rollup_s, rolled = timed(lambda: query.leaderboard(store, "woba", role=role, split=split),
+                             repeat=repeat)
+    assert rolled.origin == "rollup"
+    start = time.perf_counter()
+    slow = naive_lines(table, role, split)
+    slow_s = time.perf_counter() - start
+
+    fast = {(p, lvl): (w, e) for p, lvl, w, e in zip(
+        board["player"].tolist(), board["level"].tolist(),
+        board["woba"].tolist(), board["ev_p50"].tolist())}
+    assert fast.keys() == slow.keys(), "group mismatch"
+    assert np.allclose([fast[k] for k in slow], list(slow.values()), equal_nan=True), \
+        "value mismatch"
+    return {
+        "groups": len(board),
+        "vectorized_ms": fast_s * 1e3,
+        "rollup_ms": rollup_s * 1e3,
+        "naive_ms": slow_s * 1e3,
+        "speedup": slow_s / fast_s,
+    }
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--role", choices=query.ROLES, default="batter")
+    parser.add_argument("--splits", nargs="+", default=["none", *query.SPLITS])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    store = synthetic_store(1, seed=args.seed)
+    for split in args.splits:
+        split = None if split == "none" else split
+        report(f"{args.role} leaderboard, split={split}",
+               measure(store, args.role, split, args.repeat), as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
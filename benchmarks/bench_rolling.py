@@ -0,0 +1,67 @@
+"""Rolling windows and streaks for a whole league season.
+
+``prefix`` computes every 15/30/50-game window of every batter from the
+game log's running totals; ``naive`` re-sums each window from its games, as
+a per-row loop would.  Both must agree.  The streak rows time hitting
+streaks over the same log and scoreless-inning streaks from the pitches.
+
+    python benchmarks/bench_rolling.py [--windows 15 30 50] [--naive-players 50]
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from _common import arg_parser, report, synthetic_store, timed
+
+from statshot import rolling
+
+
+def naive(log: rolling.GameLog, window: int, players: range) -> np.ndarray:
+    """Window sums by rescanning the last ``window`` games of every row."""
+    sums = []
+    for p in players:
+        lo, hi = log.offsets[p], log.offsets[p + 1]
+        for row in range(lo, hi):
+            sums.append(log.values[max(lo, row + 1 - window):row + 1].sum(axis=0))
+    return np.array(sums)
+
+
+def measure(windows: list[int], naive_players: int, seed: int) -> dict:
+    table = synthetic_store(1, seed=seed).table()
+    results = {"pitches": len(table)}
+    results["game_log_ms"], log = timed(lambda: rolling.game_log(table))
+    results["game_log_ms"] *= 1e3
+    results["player_games"] = len(log)
+    players = range(min(naive_players, len(log.players)))
+    sample_rows = int(log.offsets[players.stop])
+    for window in windows:
+        seconds, (sums, _) = timed(lambda: rolling.window_sums(log.values, log.offsets, window))
+        naive_seconds, expected = timed(lambda: naive(log, window, players), repeat=1)
+        assert np.array_equal(sums[:sample_rows], expected)
+        results[f"w{window}_prefix_ms"] = seconds * 1e3
+        # Scaled from the sample to the whole log.
+        results[f"w{window}_naive_ms"] = naive_seconds * 1e3 * len(log) / sample_rows
+        seconds, _ = timed(lambda: rolling.rolling(log, window))
+        results[f"w{window}_table_ms"] = seconds * 1e3
+    seconds, _ = timed(lambda: rolling.hitting_streaks(log))
+    results["hitting_streaks_ms"] = seconds * 1e3
+    seconds, innings = timed(lambda: rolling.inning_log(table))
+    results["inning_log_ms"] = seconds * 1e3
+    seconds, _ = timed(lambda: rolling.scoreless_streaks(innings))
+    results["scoreless_streaks_ms"] = seconds * 1e3
+    return results
+
+
+def main() -> None:
+    parser = arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--windows", type=int, nargs="+", default=[15, 30, 50])
+    parser.add_argument("--naive-players", type=int, default=50,
+                        help="players the naive rescan covers (scaled up)")
+    args = parser.parse_args()
+    report("rolling windows and streaks, 1 season",
+           measure(args.windows, args.naive_players, args.seed), as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Run the benchmark suite and keep its results as JSON to compare versions.
+
+Each benchmark script runs in its own process with ``--json`` and the same
+``--seed``, against the cached synthetic seasons, so two runs on one box
+differ only by the code under test.  Results go to one file together with
+the commit, Python, NumPy and machine they came from.  ``--compare`` lines
+up two result files metric by metric and flags every timing that got worse
+(or throughput that dropped) by more than ``--threshold``; the exit status
+is 1 when anything regressed.  Nothing needs the network.
+
+    python benchmarks/suite.py [--quick] [--only query rolling] [--out base.json]
+    python benchmarks/suite.py --compare base.json              # run, then compare
+    python benchmarks/suite.py --compare base.json new.json     # compare two files
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+REPO = HERE.parent
+sys.path.insert(0, str(REPO))
+
+#: What ``suite.py`` runs by default, and the lighter arguments of ``--quick``.
+SUITE: dict[str, list[str]] = {
+    "ingest": ["--formats", "csv"],
+    "load": ["--seasons", "1"],
+    "query": ["--splits", "none", "stand", "count", "--repeat", "3"],
+    "cache": [],
+    "rolling": ["--windows", "30", "--naive-players", "10"],
+    "api": ["--clients", "1", "8", "--duration", "2"],
+}
+
+_HIGHER_IS_BETTER = ("per_s", "speedup", "recall", "hit_rate")
+_LOWER_IS_BETTER = ("_ms", "_us", "_ns", "_s", "_mb", "errors")
+
+
+def available() -> list[str]:
+    return sorted(p.stem[len("bench_"):] for p in HERE.glob("bench_*.py"))
+
+
+def _documents(output: str) -> list[dict]:
+    """The JSON reports a benchmark printed, one after another."""
+    decoder = json.JSONDecoder()
+    docs, at = [], 0
+    while True:
+        while at < len(output) and output[at].isspace():
+            at += 1
+        if at == len(output):
+            return docs
+        doc, at = decoder.raw_decode(output, at)
+        docs.append(doc)
+
+
+def run_benchmark(name: str, args: list[str], seed: int) -> dict:
+    command = [sys.executable, str(HERE / f"bench_{name}.py"), "--json", "--seed", str(seed),
+               *args]
+    # Output goes through files, not pipes: a benchmark's process pool can
+    # outlive it for a moment, holding a pipe open after the script is done.
+    with tempfile.TemporaryFile("w+") as out, tempfile.TemporaryFile("w+") as err:
+        start = time.perf_counter()
+        returncode = subprocess.run(command, cwd=REPO, stdout=out, stderr=err).returncode
+        entry = {"args": args, "seconds": time.perf_counter() - start}
+        out.seek(0)
+        err.seek(0)
+        if returncode:
+            entry["error"] = err.read().strip().splitlines()[-1:] or [f"exit {returncode}"]
+            return entry
+        entry["reports"] = _documents(out.read())
+    return entry
+
+
+def _git(*args: str) -> str | None:
+    try:
+        return subprocess.run(["git", *args], cwd=REPO, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(seed: int, quick: bool) -> dict:
+    import numpy
+
+    import statshot
+
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "statshot": statshot.__version__,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "quick": quick,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def flatten(results: dict) -> dict[str, float]:
+    """``benchmark/report title/metric -> value`` for every numeric result."""
+    flat = {}
+    for name, entry in results["benchmarks"].items():
+        for doc in entry.get("reports", ()):
+            for metric, value in doc["results"].items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    flat[f"{name}/{doc['benchmark']}/{metric}"] = float(value)
+    return flat
+
+
+def direction(metric: str) -> int:
+    """+1 if a larger value is better, -1 if smaller is, 0 if it is just a count."""
+    name = metric.rsplit("/", 1)[-1]
+    if any(part in name for part in _HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(_LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(old: dict, new: dict, threshold: float) -> tuple[list[list[str]], int]:
+    """Table rows of every metric both runs have, and how many regressed."""
+    before, after = flatten(old), flatten(new)
+    rows, regressions = [], 0
+    for metric in sorted(before.keys() & after.keys()):
+        a, b = before[metric], after[metric]
+        sense = direction(metric)
+        change = (b - a) / abs(a) if a else 0.0
+        flag = ""
+        if sense and abs(change) > threshold:
+            worse = change * sense < 0
+            flag = "REGRESSION" if worse else "improved"
+            regressions += worse
+        rows.append([metric, f"{a:.4g}", f"{b:.4g}", f"{change:+.1%}", flag])
+    for metric in sorted(before.keys() - after.keys()):
+        rows.append([metric, f"{before[metric]:.4g}", "-", "", "missing"])
+    return rows, regressions
+
+
+def _print_table(rows: list[list[str]]) -> None:
+    header = ["metric", "before", "after", "change", ""]
+    widths = [max(len(r[i]) for r in [header, *rows]) for i in range(len(header))]
+    for row in [header, *rows]:
+        print("  ".join(cell.ljust(w) if i == 0 else cell.rjust(w)
+                        for i, (cell, w) in enumerate(zip(row, widths))).rstrip())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=available(), metavar="NAME",
+                        help=f"benchmarks to run (default: {' '.join(SUITE)})")
+    parser.add_argument("--quick", action="store_true",
+                        help="lighter settings for a smoke run")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic data seed")
+    parser.add_argument("--out", type=Path,
+                        help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", nargs="+", type=Path, metavar="RESULTS",
+                        help="baseline results (and optionally the results to compare)")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change counted as a regression (default 0.10)")
+    args = parser.parse_args()
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a baseline and at most one other results file")
+
+    if args.compare and len(args.compare) == 2:
+        new = json.loads(args.compare[1].read_text())
+    else:
+        new = {"environment": environment(args.seed, args.quick), "benchmarks": {}}
+        for name in args.only or SUITE:
+            bench_args = SUITE.get(name, []) if args.quick else []
+            print(f"running {name} ...", file=sys.stderr, flush=True)
+            entry = new["benchmarks"][name] = run_benchmark(name, bench_args, args.seed)
+            if "error" in entry:
+                print(f"  failed: {' '.join(entry['error'])}", file=sys.stderr)
+        out = args.out or HERE / "results" / f"{new['environment']['commit'] or 'run'}.json"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(new, indent=1) + "\n")
+        print(f"results written to {out}", file=sys.stderr)
+        if not args.compare:
+            return 1 if any("error" in e for e in new["benchmarks"].values()) else 0
+
+    old = json.loads(args.compare[0].read_text())
+    print(f"before: {old['environment'].get('commit')}  after: {new['environment'].get('commit')}")
+    rows, regressions = compare(old, new, args.threshold)
+    _print_table(rows)
+    print(f"{regressions} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
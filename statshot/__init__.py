@@ -0,0 +1,14 @@
+"""StatShot: pitch-level MLB stats over a columnar, memory-mapped event store."""
+
+__all__ = ["EventTable", "Partition", "Store", "StoreError"]
+__version__ = "0.1.0"
+
+
+def __getattr__(name: str):
+    # The store pulls in NumPy; importing the package (as the command line
+    # does on every run) stays cheap until one of these is actually used.
+    if name in __all__:
+        from . import store
+
+        return getattr(store, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,335 @@
+"""Run expectancy, season-derived wOBA weights and park factors, computed in bulk.
+
+One pass over a season's plate appearances derives its constants:
+
+* the run-expectancy matrix: average runs scored from each of the 24
+  base/out states (``outs_when_up * 8 + on_base``) to the end of the
+  half-inning, over half-innings that were played out (walk-off halves
+  stop short and are left out);
+* the RE24 of every plate appearance, ``RE(after) - RE(before) + runs``;
+* linear weights: each event's average RE24 minus an out's, scaled so the
+  league's wOBA equals its OBP (the FanGraphs construction, from the
+  season's own plate appearances instead of published constants);
+* park factors: runs per game in a park over runs per game in the other
+  games of the teams that play there.
+
+Per pitch it stores ``re24``, ``woba_value`` and ``woba_denom`` columns
+(zero except on the pitch that ended a plate appearance, like ``event``),
+and per player the season sums that wOBA, wRAA, RE24 and park-adjusted
+wRC+ are built from.  Park adjustment uses the park of every plate
+appearance, not half the home park's factor, since the store knows where
+each one was played.
+
+The constants depend on every game of the season, so unlike rollups the
+season's ``advanced.npz`` is recomputed whole after each ingest (well under
+a second for a full season) and ignored when stale::
+
+    advanced.constants(store, 2024)["woba_weights"]
+    advanced.leaderboard(store, "wrc_plus", seasons=[2024], min_pa=300)
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from . import metrics, query, schema
+from .store import EventTable, Partition, Store
+
+ADVANCED_FILE = "advanced.npz"
+
+#: Per-pitch columns kept for every season.
+COLUMNS: tuple[str, ...] = ("re24", "woba_value", "woba_denom")
+
+#: Per-player stats :func:`player_lines` derives from the season sums.
+STATS: tuple[str, ...] = ("pa", "woba", "wraa", "re24", "park_factor", "wrc_plus")
+
+#: Events in the wOBA numerator, by their counting stat in :data:`~statshot.query.WOBA_WEIGHTS`.
+WOBA_EVENTS: dict[str, str] = {
+    "bb": "walk", "hbp": "hit_by_pitch", "singles": "single", "doubles": "double",
+    "triples": "triple", "hr": "home_run",
+}
+
+N_STATES = 24
+
+# Season sums per player, in column order of ``Season.sums``.
+_SUMS = ("pa", "woba_value", "woba_denom", "re24", "wraa", "league_runs", "park_runs",
+         "park_factor")
+
+
+class Season(NamedTuple):
+    """A season's constants, per-pitch columns and per-player sums."""
+
+    run_expectancy: np.ndarray
+    woba_weights: np.ndarray
+    woba_scale: float
+    league_woba: float
+    runs_per_pa: float
+    park_factors: np.ndarray
+    columns: dict[str, np.ndarray]
+    players: dict[str, np.ndarray]
+    sums: dict[str, np.ndarray]
+
+    def weights(self) -> dict[str, float]:
+        """The season's wOBA weights, keyed like :data:`~statshot.query.WOBA_WEIGHTS`."""
+        return dict(zip(WOBA_EVENTS, self.woba_weights.tolist()))
+
+
+def _event_mask(names: Iterable[str]) -> np.ndarray:
+    mask = np.zeros(len(schema.EVENTS), dtype=bool)
+    mask[[schema.code_of("event", name) for name in names]] = True
+    return mask
+
+
+# Batting outs: at-bats without a hit, except reaching on an error.
+_stats = dict(zip(query.COUNTING_STATS, query.EVENT_STATS.T))
+_OUTS = (_stats["ab"] == 1) & (_stats["h"] == 0) & ~_event_mask(["field_error"])
+_IN_DENOMINATOR = ((_stats["ab"] + _stats["bb"] + _stats["sf"] + _stats["hbp"]) > 0)
+del _stats
+
+
+def _mean_by(codes: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    sizes = np.bincount(codes, minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.bincount(codes, values, minlength=n) / sizes
+
+
+def _run_expectancy(state: np.ndarray, to_end: np.ndarray, half: np.ndarray,
+                    played_out: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """``(matrix, re24)``: the 24-state matrix and every plate appearance's RE24."""
+    keep = played_out[half]
+    matrix = np.nan_to_num(_mean_by(state[keep], to_end[keep], N_STATES))
+    # The state after a plate appearance is the next one's state in the same
+    # half-inning; after the last one the inning (or game) is over.
+    after = np.zeros(len(state))
+    same = half[1:] == half[:-1]
+    after[:-1][same] = matrix[state[1:][same]]
+    return matrix, after - matrix[state]
+
+
+def _park_factors(table: EventTable, pa: np.ndarray, runs: np.ndarray) -> np.ndarray:
+    """Runs per game in each park over runs per game elsewhere for its teams."""
+    game_pk = table["game_pk"][pa]
+    starts = np.flatnonzero(np.r_[True, game_pk[1:] != game_pk[:-1]])
+    game_runs = np.add.reduceat(runs, starts) if len(starts) else runs[:0]
+    park, home, away = (table[name][pa][starts] for name in ("park", "home_team", "away_team"))
+    factors = np.ones(len(schema.PARKS))
+    for p in np.unique(park).tolist():
+        at = park == p
+        teams = np.unique(home[at])
+        elsewhere = ~at & (np.isin(home, teams) | np.isin(away, teams))
+        if elsewhere.any() and game_runs[elsewhere].sum():
+            factors[p] = game_runs[at].mean() / game_runs[elsewhere].mean()
+    return factors
+
+
+def _empty(rows: int) -> Season:
+    """A season with no plate appearances yet: neutral constants, no players."""
+    columns = {"re24": np.zeros(rows, np.float32), "woba_value": np.zeros(rows, np.float32),
+               "woba_denom": np.zeros(rows, np.int8)}
+    return Season(np.zeros(N_STATES), np.zeros(len(WOBA_EVENTS)), 1.0, 0.0, 0.0,
+                  np.ones(len(schema.PARKS)), columns,
+                  {role: np.empty(0, schema.DTYPES[role]) for role in query.ROLES},
+                  {role: np.zeros((0, len(_SUMS))) for role in query.ROLES})
+
+
+def compute(table: EventTable) -> Season:
+    """Derive a season's constants, columns and player sums from its pitches.
+
+    Pitches without a finished plate appearance among them (the first
+    pitches of a live game, say) give an empty :class:`Season`.
+    """
+    pa = np.flatnonzero(table["event"] != 0)
+    if not len(pa):
+        return _empty(len(table))
+    event = table["event"][pa].astype(np.int64)
+    game_pk = table["game_pk"][pa].astype(np.int64)
+    topbot = table["inning_topbot"][pa].astype(np.int64)
+    key = (game_pk * 64 + table["inning"][pa]) * 2 + topbot
+    half_starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    half = np.cumsum(np.r_[True, key[1:] != key[:-1]]) - 1
+    bat_score = table["bat_score"][pa].astype(np.float64)
+    runs = table["post_bat_score"][pa] - bat_score
+    final = np.maximum.reduceat(table["post_bat_score"][pa], half_starts)
+    last_of_game = np.r_[game_pk[half_starts][1:] != game_pk[half_starts][:-1], True]
+    walk_off = last_of_game & (topbot[half_starts] == 1) & (final > np.r_[0, final[:-1]])
+    state = (np.minimum(table["outs_when_up"][pa], 2).astype(np.int64) * 8
+             + (table["on_base"][pa] & 7))
+    matrix, re24 = _run_expectancy(state, final[half] - bat_score, half, ~walk_off)
+    re24 += runs
+
+    values = np.nan_to_num(_mean_by(event, re24, len(schema.EVENTS)))
+    out_value = re24[_OUTS[event]].mean() if _OUTS[event].any() else 0.0
+    codes = [schema.code_of("event", name) for name in WOBA_EVENTS.values()]
+    raw = values[codes] - out_value
+    denominator = _IN_DENOMINATOR[event]
+    histogram = np.bincount(event, minlength=len(schema.EVENTS))
+    league = dict(zip(query.COUNTING_STATS, (histogram @ query.EVENT_STATS)[:, None]))
+    obp = float(np.nan_to_num(query.rate_stats(league)["obp"][0]))
+    raw_woba = (raw * histogram[codes]).sum() / denominator.sum() if denominator.any() else 0.0
+    scale = obp / raw_woba if raw_woba else 1.0
+    weights = raw * scale
+    lookup = np.zeros(len(schema.EVENTS))
+    lookup[codes] = weights
+    woba_value = lookup[event]
+    runs_per_pa = runs.sum() / len(pa)
+    parks = _park_factors(table, pa, runs)
+
+    columns = {"re24": np.zeros(len(table), np.float32),
+               "woba_value": np.zeros(len(table), np.float32),
+               "woba_denom": np.zeros(len(table), np.int8)}
+    columns["re24"][pa] = re24
+    columns["woba_value"][pa] = woba_value
+    columns["woba_denom"][pa] = denominator
+
+    # wRAA: (wOBA - league wOBA) / scale for each plate appearance in the wOBA
+    # denominator.  League wOBA is the league OBP by construction.
+    wraa = (woba_value - obp * denominator) / scale
+    pf = parks[table["park"][pa]]
+    per_pa = {"pa": np.ones(len(pa)), "woba_value": woba_value, "woba_denom": denominator,
+              "re24": re24, "wraa": wraa, "league_runs": np.full(len(pa), runs_per_pa),
+              "park_runs": runs_per_pa * (1.0 - pf), "park_factor": pf}
+    players, sums = {}, {}
+    for role in query.ROLES:
+        players[role], group = query.factorize(table[role][pa])
+        sums[role] = np.column_stack([np.bincount(group, per_pa[name].astype(np.float64),
+                                                  len(players[role])) for name in _SUMS])
+    return Season(matrix, weights, float(scale), float(obp), float(runs_per_pa), parks,
+                  columns, players, sums)
+
+
+_loaded: dict[str, tuple[int, tuple[int, Season]]] = {}
+
+
+def load(partition: Partition) -> Season | None:
+    """The partition's advanced data, or ``None`` if it has none or it is stale."""
+    stored = _read(partition)
+    if stored is None or stored[0] != partition.rows:
+        return None
+    return stored[1]
+
+
+def _read(partition: Partition):
+    path = partition.path / ADVANCED_FILE
+    cache_key = str(path)
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(cache_key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with np.load(path) as npz:
+        season = Season(
+            npz["run_expectancy"], npz["woba_weights"], float(npz["woba_scale"]),
+            float(npz["league_woba"]), float(npz["runs_per_pa"]), npz["park_factors"],
+            {name: npz[f"column.{name}"] for name in COLUMNS},
+            {role: npz[f"{role}.players"] for role in query.ROLES},
+            {role: npz[f"{role}.sums"] for role in query.ROLES})
+        stored = int(npz["rows"]), season
+    _loaded[cache_key] = (stamp, stored)
+    return stored
+
+
+def _write(partition: Partition, rows: int, season: Season) -> None:
+    arrays = {"rows": np.array(rows)}
+    for field in ("run_expectancy", "woba_weights", "woba_scale", "league_woba",
+                  "runs_per_pa", "park_factors"):
+        arrays[field] = np.asarray(getattr(season, field))
+    arrays.update((f"column.{name}", season.columns[name]) for name in COLUMNS)
+    for role in query.ROLES:
+        arrays[f"{role}.players"] = season.players[role]
+        arrays[f"{role}.sums"] = season.sums[role]
+    path = partition.path / ADVANCED_FILE
+    tmp = path.with_name("advanced.tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    _loaded[str(path)] = (os.stat(path).st_mtime_ns, (rows, season))
+
+
+def update(partition: Partition) -> int:
+    """Recompute the partition's advanced data if stale; returns the rows covered (0 if current)."""
+    if not partition.rows or load(partition) is not None:
+        return 0
+    rows = partition.rows
+    _write(partition, rows, compute(partition.table().slice(0, rows)))
+    return rows
+
+
+def season_data(store: Store, season: int) -> Season:
+    """``season``'s advanced data, computing it first if missing or stale."""
+    if season not in store.seasons():
+        raise query.QueryError(f"no season {season} in the store")
+    partition = store.partition(season)
+    update(partition)
+    return load(partition)
+
+
+def constants(store: Store, season: int) -> dict:
+    """``season``'s constants as plain data: RE matrix by outs, wOBA weights, park factors."""
+    data = season_data(store, season)
+    return {
+        "run_expectancy": data.run_expectancy.reshape(3, 8).tolist(),
+        "woba_weights": data.weights(),
+        "woba_scale": data.woba_scale,
+        "league_woba": data.league_woba,
+        "runs_per_pa": data.runs_per_pa,
+        "park_factors": {name: float(pf) for name, pf in
+                         zip(schema.PARKS[1:], data.park_factors[1:].tolist())},
+    }
+
+
+def player_lines(store: Store, *, role: str = "batter",
+                 seasons: Iterable[int] | int | None = None,
+                 players: Iterable[int] | None = None) -> query.StatTable:
+    """wOBA, wRAA, RE24, park factor and wRC+ per player over ``seasons``.
+
+    Season sums are added up, so wRAA and RE24 are totals and wRC+ weighs
+    each season by its plate appearances and league run environment.  For
+    pitchers the numbers are those of the batters they faced.
+    """
+    query._resolve(role, None)
+    if isinstance(seasons, int):
+        seasons = [seasons]
+    with metrics.span("query", kind="advanced", role=role, split=None) as span:
+        parts = [season_data(store, part.season) for part in store.partitions(seasons)
+                 if part.rows]
+        found = [(s.players[role], s.sums[role]) for s in parts if len(s.players[role])]
+        if found:
+            uniques = np.unique(np.concatenate([p for p, _ in found]))
+            totals = np.zeros((len(uniques), len(_SUMS)))
+            for ids, sums in found:
+                totals[np.searchsorted(uniques, ids)] += sums
+        else:
+            uniques, totals = np.empty(0, np.int32), np.zeros((0, len(_SUMS)))
+        if players is not None:
+            keep = np.isin(uniques, np.fromiter(players, dtype=np.int64))
+            uniques, totals = uniques[keep], totals[keep]
+        span.rows = len(uniques)
+        span.labels["origin"] = "advanced"
+        t = dict(zip(_SUMS, totals.T))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns = {
+                "player": uniques, "level": np.zeros(len(uniques), np.int16),
+                "pa": t["pa"].astype(np.int64),
+                "woba": t["woba_value"] / t["woba_denom"],
+                "wraa": t["wraa"], "re24": t["re24"],
+                "park_factor": t["park_factor"] / t["pa"],
+                "wrc_plus": 100.0 * (t["wraa"] + t["league_runs"] + t["park_runs"])
+                / t["league_runs"],
+            }
+        return query.StatTable(columns, role=role, origin="advanced")
+
+
+def leaderboard(store: Store, stat: str = "wrc_plus", *, role: str = "batter",
+                seasons: Iterable[int] | int | None = None, min_pa: int = 0,
+                limit: int | None = 25) -> query.StatTable:
+    """Players ranked by one of :data:`STATS` (ascending for pitchers, who want them low)."""
+    if stat not in STATS:
+        raise query.QueryError(f"unknown stat {stat!r}; expected one of {list(STATS)}")
+    lines = player_lines(store, role=role, seasons=seasons)
+    lines = lines.where(lines["pa"] >= min_pa)
+    ranked = lines.sort(stat, ascending=role == "pitcher" and stat not in ("pa",))
+    return ranked.head(limit) if limit is not None else ranked
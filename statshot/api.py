@@ -0,0 +1,381 @@
+"""Asyncio HTTP API: player cards, leaderboards and split queries.
+
+Endpoints (all ``GET``, all JSON but ``/metrics``)::
+
+    /health
+    /player/<id>?role=batter&season=2024&split=count&stats=avg,obp,ev_p90
+    /leaderboard?stat=woba&role=batter&season=2024&split=stand&level=L&min_pa=100&limit=50
+    /splits?split=month&role=pitcher&season=2024&players=600101,600102&stats=k_pct
+    /metrics                    # Prometheus text; /metrics?format=json for JSON
+
+The event loop only parses requests, answers from the result cache and
+writes responses.  Cache misses are computed *and serialized* in a process
+pool, so a leaderboard that has to scan a decade of pitches never holds up
+the cheap cached lookups sharing the loop.  Identical misses that arrive
+while one is being computed wait on the same future instead of queueing
+duplicate work.  Responses carry ``X-Cache: hit|miss``.
+
+Every request's latency is recorded in :mod:`statshot.metrics` by endpoint,
+status and cache outcome, next to the query timings the workers record and
+send back with each answer; ``/metrics`` exports them all.
+
+Run with ``python -m statshot.api --store data/ --port 8080``; add
+``--profile-ms 250`` to keep cProfile output of queries slower than 250 ms.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from . import metrics, query
+from .cache import DEFAULT_MAX_BYTES, QueryKey, ResultCache, query_key
+from .store import Store
+
+MAX_HEADER_BYTES = 16 * 1024
+
+_ENDPOINTS = frozenset({"health", "player", "leaderboard", "splits"})
+
+_PROMETHEUS_TYPE = "text/plain; version=0.0.4"
+
+_DEFAULT_CARD_STATS = query.COUNTING_STATS + query.RATE_STATS
+
+
+class BadRequest(ValueError):
+    """Raised for malformed request parameters; answered with 400."""
+
+
+class NotFound(LookupError):
+    """Raised for unknown routes; answered with 404."""
+
+
+def _one(params: dict[str, list[str]], name: str, default: str | None = None) -> str | None:
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _int(params: dict[str, list[str]], name: str, default: int | None = None) -> int | None:
+    value = _one(params, name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer, got {value!r}") from None
+
+
+def _list(params: dict[str, list[str]], name: str) -> list[str] | None:
+    values = params.get(name)
+    if not values:
+        return None
+    return [item for value in values for item in value.split(",") if item]
+
+
+def parse_request(path: str) -> QueryKey:
+    """Turn a request target into a normalized query key."""
+    parts = urlsplit(path)
+    params = parse_qs(parts.query)
+    route = [p for p in parts.path.split("/") if p]
+    if not route:
+        raise NotFound(parts.path)
+    role = _one(params, "role", "batter")
+    split = _one(params, "split") or None
+    seasons = _list(params, "season")
+    try:
+        seasons = None if seasons is None else [int(s) for s in seasons]
+    except ValueError:
+        raise BadRequest("season must be a comma-separated list of years") from None
+    stats = _list(params, "stats")
+
+    if route[0] == "health" and len(route) == 1:
+        return query_key("health")
+    if route[0] == "player" and len(route) == 2:
+        try:
+            player = int(route[1])
+        except ValueError:
+            raise BadRequest(f"bad player id {route[1]!r}") from None
+        return query_key("player", role=role, player=player, seasons=seasons, split=split,
+                         stats=stats or _DEFAULT_CARD_STATS)
+    if route[0] == "leaderboard" and len(route) == 1:
+        return query_key("leaderboard", role=role, seasons=seasons, split=split,
+                         stats=(_one(params, "stat", "woba"),), level=_one(params, "level"),
+                         min_pa=_int(params, "min_pa", 0), limit=_int(params, "limit", 50))
+    if route[0] == "splits" and len(route) == 1:
+        if split is None:
+            raise BadRequest("split is required")
+        players = _list(params, "players")
+        try:
+            players = None if players is None else tuple(sorted({int(p) for p in players}))
+        except ValueError:
+            raise BadRequest("players must be a comma-separated list of ids") from None
+        return query_key("splits", role=role, seasons=seasons, split=split,
+                         stats=stats or _DEFAULT_CARD_STATS, players=players)
+    raise NotFound(parts.path)
+
+
+def _records(table: query.StatTable) -> list[dict]:
+    records = table.to_records()
+    for record in records:
+        for name, value in record.items():
+            if isinstance(value, float) and math.isnan(value):
+                record[name] = None
+    return records
+
+
+def execute(store: Store, key: QueryKey) -> bytes:
+    """Answer ``key`` against ``store`` and return the JSON response body."""
+    generation = store.refresh()
+    options = dict(key.options)
+    if key.kind == "health":
+        return json.dumps({"generation": generation, "seasons": store.seasons()}).encode()
+    ev_percentiles = query.parse_ev_percentiles(key.stats)
+    if key.kind == "player":
+        table = query.player_card(store, key.player, role=key.role, split=key.split,
+                                  seasons=key.seasons,
+                                  ev_percentiles=ev_percentiles).project(key.stats)
+    elif key.kind == "leaderboard":
+        table = query.leaderboard(store, key.stats[0], role=key.role, split=key.split,
+                                  seasons=key.seasons, level=options.get("level"),
+                                  min_pa=options["min_pa"], limit=options["limit"])
+    elif key.kind == "splits":
+        table = query.stat_lines(store, role=key.role, split=key.split, seasons=key.seasons,
+                                 players=options.get("players"),
+                                 ev_percentiles=ev_percentiles).project(key.stats)
+    else:
+        raise NotFound(key.kind)
+    body = {"generation": generation, "origin": table.origin, "role": table.role,
+            "split": table.split, "rows": _records(table)}
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+# Per-process state of pool workers.
+_worker_store: Store | None = None
+
+
+def _init_worker(root: str) -> None:
+    global _worker_store
+    _worker_store = Store(root)
+
+
+def _execute_in_worker(key: QueryKey) -> tuple[bytes, dict]:
+    # The worker's timings travel back with the answer.
+    return execute(_worker_store, key), metrics.REGISTRY.drain()
+
+
+class StatShotServer:
+    """The HTTP front end; ``workers=0`` computes misses in a thread instead."""
+
+    def __init__(self, root: str | os.PathLike, *, host: str = "127.0.0.1", port: int = 8080,
+                 workers: int | None = None, cache_bytes: int = DEFAULT_MAX_BYTES):
+        self.store = Store(root)
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.cache = ResultCache(cache_bytes)
+        self._inflight: dict[tuple[QueryKey, int], asyncio.Future] = {}
+        self._executor: Executor | None = None
+        self._run = None
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        if self.workers == 0:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+            self._run = lambda key: (execute(self.store, key), None)
+        else:
+            # Forked workers would inherit open client sockets and keep
+            # closed connections alive, so start them from a clean process.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                "forkserver" if "forkserver" in methods else "spawn")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                initargs=(str(self.store.root),))
+            self._run = _execute_in_worker
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def answer(self, target: str) -> tuple[HTTPStatus, bytes, bool]:
+        """Response status, body and whether it came from the cache."""
+        try:
+            key = parse_request(target)
+            if key.kind == "health":
+                return HTTPStatus.OK, execute(self.store, key), False
+            generation = self.store.refresh()
+            body = self.cache.get(key, generation)
+            if body is not None:
+                return HTTPStatus.OK, body, True
+            flight = (key, generation)
+            future = self._inflight.get(flight)
+            if future is None:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(self._executor, self._run, key)
+                self._inflight[flight] = future
+                future.add_done_callback(lambda done: self._finished(flight, done))
+            body, _ = await asyncio.shield(future)
+            self.cache.put(key, body, generation)
+            return HTTPStatus.OK, body, False
+        except NotFound as exc:
+            return HTTPStatus.NOT_FOUND, _error(f"no such endpoint: {exc}"), False
+        except (BadRequest, query.QueryError) as exc:
+            return HTTPStatus.BAD_REQUEST, _error(str(exc)), False
+
+    def _finished(self, flight: tuple[QueryKey, int], future: asyncio.Future) -> None:
+        self._inflight.pop(flight, None)
+        if not future.cancelled() and future.exception() is None:
+            recorded = future.result()[1]
+            if recorded is not None:
+                metrics.REGISTRY.merge(recorded)
+
+    def metrics(self, target: str) -> tuple[bytes, str]:
+        """The metrics registry as a response body and its content type."""
+        stats = self.cache.stats()
+        for name in ("entries", "bytes", "hits", "misses", "evictions"):
+            metrics.gauge(f"cache_{name}", getattr(stats, name))
+        if _one(parse_qs(urlsplit(target).query), "format") == "json":
+            return metrics.REGISTRY.to_json().encode(), "application/json"
+        return metrics.REGISTRY.to_prometheus().encode(), _PROMETHEUS_TYPE
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await _respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                   _error("headers too large"), keep_alive=False)
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ")
+                except ValueError:
+                    await _respond(writer, HTTPStatus.BAD_REQUEST, _error("bad request line"),
+                                   keep_alive=False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip().lower()
+                keep_alive = (headers.get("connection") != "close"
+                              if version == "HTTP/1.1" else
+                              headers.get("connection") == "keep-alive")
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await _respond(writer, HTTPStatus.BAD_REQUEST, _error("bad content-length"),
+                                   keep_alive=False)
+                    break
+                if length:
+                    await reader.readexactly(length)
+
+                start = time.perf_counter()
+                route = urlsplit(target).path.strip("/").split("/")[0]
+                content_type = "application/json"
+                if method != "GET":
+                    status, body, hit = HTTPStatus.METHOD_NOT_ALLOWED, _error("GET only"), False
+                elif route == "metrics":
+                    (body, content_type), status, hit = self.metrics(target), HTTPStatus.OK, False
+                else:
+                    try:
+                        status, body, hit = await self.answer(target)
+                    except Exception as exc:  # noqa: BLE001 - report, keep serving
+                        status, body, hit = (HTTPStatus.INTERNAL_SERVER_ERROR,
+                                             _error(f"{type(exc).__name__}: {exc}"), False)
+                    metrics.observe("request", time.perf_counter() - start,
+                                    endpoint=route if route in _ENDPOINTS else "other",
+                                    status=status.value, cache="hit" if hit else "miss")
+                await _respond(writer, status, body, keep_alive=keep_alive, hit=hit,
+                               content_type=content_type)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def _error(message: str) -> bytes:
+    return json.dumps({"error": message}).encode()
+
+
+async def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, body: bytes, *,
+                   keep_alive: bool, hit: bool = False,
+                   content_type: str = "application/json") -> None:
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"X-Cache: {'hit' if hit else 'miss'}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+def serve(root: str | os.PathLike, *, host: str = "127.0.0.1", port: int = 8080,
+          workers: int | None = None, cache_bytes: int = DEFAULT_MAX_BYTES,
+          profile_ms: float | None = None) -> None:
+    """Run the API until interrupted; ``profile_ms`` profiles slower queries."""
+    if profile_ms is not None:
+        # Through the environment so the worker processes profile too.
+        os.environ[metrics.PROFILE_ENV] = str(profile_ms)
+        metrics.REGISTRY.profile_slow(profile_ms / 1e3)
+
+    async def main() -> None:
+        server = StatShotServer(root, host=host, port=port, workers=workers,
+                                cache_bytes=cache_bytes)
+        await server.start()
+        print(f"statshot API listening on http://{server.host}:{server.port}", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the StatShot HTTP API.")
+    parser.add_argument("--store", required=True, help="store directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="query worker processes (default: CPU count; 0: in-process)")
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20)
+    parser.add_argument("--profile-ms", type=float,
+                        help="keep cProfile output of queries slower than this")
+    args = parser.parse_args(argv)
+    serve(args.store, host=args.host, port=args.port, workers=args.workers,
+          cache_bytes=int(args.cache_mb * 2**20), profile_ms=args.profile_ms)
+
+
+if __name__ == "__main__":
+    main()
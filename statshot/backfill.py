@@ -0,0 +1,325 @@
+"""Parallel, resumable backfill of many seasons of game feeds.
+
+:func:`backfill` splits the feed files into shards, one per season or per
+month (by the date their names start with), and builds each shard in its own
+worker process as a small store of its own under ``<root>/.backfill/``,
+rollups included.  Parsing is the expensive part and shards share nothing,
+so this stage scales with the number of cores.
+
+Staged shards are then merged into the season partitions without a second
+pass over the data: every season's column files are grown once to their
+final size, each staged column is copied to its offset by the kernel
+(``copy_file_range``) from a thread pool, and the season is committed with a
+single ``meta.json`` write.  The shards' rollups are summed into the
+season's, so nothing is re-aggregated either.
+
+Every staged shard leaves a manifest (``shard.json``) next to its data, and
+a season's ``meta.json`` lists the shards merged into it in the same write
+that commits their rows.  An interrupted backfill rerun over the same feeds
+therefore skips every shard that was staged or merged and picks up where it
+stopped.  Shards are named by their date range and a digest of their files'
+sizes and mtimes, so feeds that changed since are staged afresh.
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+import numpy as np
+
+from . import advanced, comps, heatmap, index, metrics, rollup
+from .ingest import (MANIFEST_NAME, FeedError, GameFeed, _file_stamp, _load_manifest, ingest,
+                     iter_feed_files, read_feed)
+from .store import Partition, Store, _read_json, _write_json, encode_block
+
+BACKFILL_DIR = ".backfill"
+SHARD_MANIFEST = "shard.json"
+SHARD_BY = ("season", "month")
+
+_DATE_PREFIX = re.compile(r"^(\d{4})-?(\d{2})-?(\d{2})")
+_COPY_CHUNK = 64 << 20
+
+
+class Shard(NamedTuple):
+    """A set of feed files staged together by one worker."""
+
+    key: str
+    files: tuple[str, ...]
+
+
+@dataclass
+class BackfillReport:
+    shards: int = 0
+    shards_staged: int = 0
+    shards_resumed: int = 0
+    shards_merged: int = 0
+    games_added: int = 0
+    games_skipped: int = 0
+    pitches: int = 0
+    workers: int = 0
+    stage_seconds: float = 0.0
+    merge_seconds: float = 0.0
+    seconds: float = 0.0
+    generation: int = 0
+
+    @property
+    def pitches_per_second(self) -> float:
+        return self.pitches / self.seconds if self.seconds else 0.0
+
+
+def file_date(path: Path) -> int:
+    """Game date of a feed file: from its name if it starts with one, else its first game."""
+    match = _DATE_PREFIX.match(path.name)
+    if match:
+        return int("".join(match.groups()))
+    for game in read_feed(path):
+        return game.game_date
+    raise FeedError(f"{path}: no games")
+
+
+def plan(source: str | os.PathLike, *, by: str = "season",
+         exclude: dict[str, list[int]] | None = None) -> list[Shard]:
+    """Group the feed files under ``source`` into shards, in date order.
+
+    Files listed in ``exclude`` (an ingest manifest) with an unchanged size
+    and mtime are left out.
+    """
+    if by not in SHARD_BY:
+        raise ValueError(f"by must be one of {SHARD_BY}, got {by!r}")
+    width = 4 if by == "season" else 6
+    groups: dict[str, list[Path]] = {}
+    for path in iter_feed_files(source):
+        if exclude and exclude.get(str(path.resolve())) == _file_stamp(path):
+            continue
+        groups.setdefault(str(file_date(path))[:width], []).append(path)
+    shards = []
+    for span, paths in sorted(groups.items()):
+        digest = hashlib.sha1()
+        files = []
+        for path in paths:
+            resolved = str(path.resolve())
+            digest.update(f"{resolved}:{_file_stamp(path)}\n".encode())
+            files.append(resolved)
+        name = span if by == "season" else f"{span[:4]}-{span[4:]}"
+        shards.append(Shard(f"{name}_{digest.hexdigest()[:12]}", tuple(files)))
+    return shards
+
+
+def _staging(root: Path, shard: Shard) -> Path:
+    return root / BACKFILL_DIR / shard.key
+
+
+def _staged_manifest(root: Path, shard: Shard) -> dict | None:
+    path = _staging(root, shard) / SHARD_MANIFEST
+    return _read_json(path) if path.exists() else None
+
+
+def stage(root: str | os.PathLike, shard: Shard, *, batch_pitches: int = 250_000) -> dict:
+    """Build ``shard`` into its staging store; returns its manifest.
+
+    Games the main store already holds are skipped.  Runs in a worker
+    process; anything a previous, interrupted attempt left is discarded.
+    """
+    start = time.perf_counter()
+    store = Store(root)
+    staging = _staging(store.root, shard)
+    shutil.rmtree(staging, ignore_errors=True)
+    known: dict[int, set[int]] = {}
+    skipped = 0
+
+    def new_games() -> Iterator[GameFeed]:
+        nonlocal skipped
+        for path in shard.files:
+            for game in read_feed(path):
+                seen = known.get(game.season)
+                if seen is None:
+                    seen = known[game.season] = set(
+                        store.partition(game.season).game_pks().tolist())
+                if game.game_pk in seen:
+                    skipped += 1
+                else:
+                    yield game
+
+    # The season's comps index is built once the shards are merged.
+    report = ingest(Store(staging, create=True), new_games(), batch_pitches=batch_pitches,
+                    knn=False)
+    manifest = {
+        "files": {path: _file_stamp(Path(path)) for path in shard.files},
+        "seasons": {str(p.season): p.rows for p in Store(staging).partitions() if p.rows},
+        "games_added": report.games_added,
+        "games_skipped": report.games_skipped + skipped,
+        "pitches": report.pitches,
+        "seconds": time.perf_counter() - start,
+    }
+    # Written last: its presence is what marks the shard as staged.
+    _write_json(staging / SHARD_MANIFEST, manifest)
+    return manifest
+
+
+def _copy_range(src: Path, dst: Path, nbytes: int, offset: int) -> None:
+    """Copy the first ``nbytes`` of ``src`` into ``dst`` at ``offset``."""
+    with open(src, "rb") as fin, open(dst, "r+b") as fout:
+        copy_file_range = getattr(os, "copy_file_range", None)
+        done = 0
+        while done < nbytes:
+            want = min(nbytes - done, _COPY_CHUNK)
+            if copy_file_range is not None:
+                try:
+                    n = copy_file_range(fin.fileno(), fout.fileno(), want, done, offset + done)
+                except OSError as exc:
+                    if exc.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP,
+                                         errno.EINVAL):
+                        raise
+                    copy_file_range = None
+                    continue
+            else:
+                n = os.pwrite(fout.fileno(), os.pread(fin.fileno(), want, done), offset + done)
+            if n <= 0:
+                raise OSError(f"short copy from {src} to {dst}")
+            done += n
+
+
+def _fsync(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def merge(store: Store, shards: Iterable[Shard], *, threads: int | None = None) -> int:
+    """Merge staged shards into ``store``'s seasons; returns the rows added.
+
+    Seasons are committed one by one; shards a season already lists as
+    merged are left out, so this is safe to repeat after an interruption.
+    """
+    seasons: dict[int, list[tuple[str, Partition]]] = {}
+    for shard in shards:
+        manifest = _staged_manifest(store.root, shard)
+        if manifest is None:
+            continue
+        for season in sorted(int(s) for s in manifest["seasons"]):
+            part = store.partition(season)
+            if shard.key not in part.meta.get("shards", ()):
+                staged = Partition(_staging(store.root, shard) / f"season={season}")
+                seasons.setdefault(season, []).append((shard.key, staged))
+
+    plans = []
+    for season, staged in sorted(seasons.items()):
+        part = store.partition(season)
+        offset = base = part.preallocate(sum(p.rows for _, p in staged))
+        copies, encodes = [], []
+        for _, src in staged:
+            for name, dtype in part.meta["columns"].items():
+                codec = part.codec(name)
+                if codec is not None:
+                    encodes.append((name, codec, src))
+                    continue
+                itemsize = np.dtype(dtype).itemsize
+                copies.append((src.column_path(name), part.column_path(name),
+                               src.rows * itemsize, offset * itemsize))
+            offset += src.rows
+        plans.append((part, base, offset, staged, copies, encodes))
+
+    with ThreadPoolExecutor(threads or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        copies = [c for plan in plans for c in plan[4]]
+        list(pool.map(lambda c: _copy_range(*c), copies))
+        list(pool.map(_fsync, {dst for _, dst, _, _ in copies}))
+        # Compressed columns cannot be copied in place: compress the staged
+        # columns in parallel, then append the blocks in shard order.
+        payloads = [pool.map(lambda e: (e[2].rows, encode_block(e[1], e[2].column(e[0]))),
+                             plan[5]) for plan in plans]
+
+        added = 0
+        for (part, base, rows, staged, _, encodes), encoded in zip(plans, payloads):
+            blocks: dict[str, list] = {}
+            for (name, _, _), block in zip(encodes, encoded):
+                blocks.setdefault(name, []).append(block)
+            blocks = {name: part.write_blocks(name, new) for name, new in blocks.items()}
+            merged = list(part.meta.get("shards", ())) + [key for key, _ in staged]
+            part.commit(rows, blocks=blocks, shards=merged)
+            rollup.extend(part, base, [rollup.load(src) for _, src in staged])
+            index.update(part)
+            heatmap.update(part)
+            advanced.update(part)
+            comps.update(part)
+            added += rows - base
+    return added
+
+
+def backfill(store: Store, source: str | os.PathLike, *, by: str = "season",
+             workers: int | None = None, batch_pitches: int = 250_000,
+             rescan: bool = False) -> BackfillReport:
+    """Load every game under ``source`` into ``store`` using ``workers`` processes.
+
+    ``by`` picks the shard size: ``"season"`` or ``"month"`` (more, smaller
+    shards: better balance across many cores and finer-grained resume).
+    The store's generation is bumped once at the end if any game was added,
+    and the feed files are recorded in the ingest manifest, so a later
+    :func:`~statshot.ingest.ingest` of the same directory skips them, as
+    does the next backfill unless ``rescan`` is set.
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    shards = plan(source, by=by, exclude=None if rescan else _load_manifest(store))
+    report = BackfillReport(shards=len(shards), workers=workers)
+    merged = {key for part in store.partitions() for key in part.meta.get("shards", ())}
+
+    todo = []
+    for shard in shards:
+        if shard.key in merged and not _staging(store.root, shard).exists():
+            continue
+        if _staged_manifest(store.root, shard) is not None:
+            report.shards_resumed += 1
+        else:
+            todo.append(shard)
+    # Biggest shards first, so the last worker to finish is not stuck with one.
+    todo.sort(key=lambda shard: len(shard.files), reverse=True)
+    if workers == 1 or len(todo) <= 1:
+        for shard in todo:
+            stage(store.root, shard, batch_pitches=batch_pitches)
+    elif todo:
+        with ProcessPoolExecutor(min(workers, len(todo))) as pool:
+            futures = [pool.submit(stage, store.root, shard, batch_pitches=batch_pitches)
+                       for shard in todo]
+            for future in futures:
+                future.result()
+    report.shards_staged = len(todo)
+    report.stage_seconds = time.perf_counter() - start
+
+    merge_start = time.perf_counter()
+    pending = [shard for shard in shards if _staged_manifest(store.root, shard) is not None]
+    merge(store, pending)
+    stamps = {}
+    for shard in pending:
+        manifest = _staged_manifest(store.root, shard)
+        report.shards_merged += 1
+        report.games_added += manifest["games_added"]
+        report.games_skipped += manifest["games_skipped"]
+        report.pitches += manifest["pitches"]
+        stamps.update(manifest["files"])
+        shutil.rmtree(_staging(store.root, shard))
+    if stamps:
+        manifest = _load_manifest(store)
+        manifest.update(stamps)
+        _write_json(store.root / MANIFEST_NAME, manifest)
+    try:
+        (store.root / BACKFILL_DIR).rmdir()
+    except OSError:
+        pass
+    report.merge_seconds = time.perf_counter() - merge_start
+    metrics.observe("backfill", report.stage_seconds, rows=report.pitches, stage="stage")
+    metrics.observe("backfill", report.merge_seconds, rows=report.pitches, stage="merge")
+
+    report.generation = store.bump_generation() if report.games_added else store.generation
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,220 @@
+"""Bounded LRU/TTL cache for query results.
+
+Results are keyed by a normalized :class:`QueryKey` (what was asked, for
+whom, over which seasons, split and stat set) and tagged with the store
+generation they were computed from.  The first lookup made with a newer
+generation drops every entry at once, so cached answers never outlive the
+ingest that made them stale, and nothing has to track which entries a given
+batch of games touched.
+
+The cache is bounded by the bytes its values hold (NumPy arrays are counted
+by ``nbytes``) and evicts least-recently-used entries first.  Entries can
+also carry a time-to-live for callers that want answers refreshed even when
+no ingest happened.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Iterable, NamedTuple
+
+import numpy as np
+
+from . import query
+from .store import Store
+
+DEFAULT_MAX_BYTES = 64 << 20
+
+_MISSING = object()
+
+
+class QueryKey(NamedTuple):
+    kind: str
+    role: str
+    player: int | None
+    seasons: tuple[int, ...] | None
+    split: str | None
+    stats: tuple[str, ...]
+    options: tuple[tuple[str, Any], ...]
+
+
+def query_key(kind: str, *, role: str = "batter", player: int | None = None,
+              seasons: Iterable[int] | int | None = None, split: str | None = None,
+              stats: Iterable[str] = (), **options) -> QueryKey:
+    """Normalize query parameters so equivalent queries share one key.
+
+    Seasons and stats are order-insensitive sets, and options left at
+    ``None`` are dropped.
+    """
+    if isinstance(seasons, int):
+        seasons = (seasons,)
+    elif seasons is not None:
+        seasons = tuple(sorted(set(int(s) for s in seasons)))
+    return QueryKey(
+        kind, role, None if player is None else int(player), seasons, split,
+        tuple(sorted(set(stats))),
+        tuple(sorted((k, v) for k, v in options.items() if v is not None)),
+    )
+
+
+def sizeof(value: Any) -> int:
+    """Approximate bytes held by a cached value."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+    if isinstance(value, query.StatTable):
+        return value.nbytes + 112 * len(value.columns) + 256
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    expirations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class _Entry(NamedTuple):
+    value: Any
+    nbytes: int
+    expires: float
+
+
+class ResultCache:
+    """Memory-bounded LRU cache invalidated by store generation."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, *, ttl: float | None = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._generation = -1
+        self._bytes = 0
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**{**vars(self._stats), "entries": len(self._entries),
+                                 "bytes": self._bytes})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _sync(self, generation: int) -> bool:
+        """Advance to ``generation`` if it is newer; False if it is older."""
+        if generation > self._generation:
+            if self._generation >= 0:
+                self._stats.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self._generation = generation
+        return generation == self._generation
+
+    def get(self, key: Hashable, generation: int, default: Any = None) -> Any:
+        with self._lock:
+            current = self._sync(generation)
+            entry = self._entries.get(key) if current else None
+            if entry is not None and entry.expires <= self._clock():
+                self._drop(key)
+                self._stats.expirations += 1
+                entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        nbytes = sizeof(value)
+        with self._lock:
+            # A result computed from an older generation is already stale.
+            if not self._sync(generation) or nbytes > self.max_bytes:
+                return
+            if key in self._entries:
+                self._drop(key)
+            expires = self._clock() + self.ttl if self.ttl is not None else float("inf")
+            self._entries[key] = _Entry(value, nbytes, expires)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats.evictions += 1
+
+    def get_or_compute(self, key: Hashable, generation: int, compute: Callable[[], Any]) -> Any:
+        value = self.get(key, generation, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value, generation)
+        return value
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+
+class CachedQueries:
+    """Player cards and leaderboards over a store, through a :class:`ResultCache`.
+
+    Every call re-reads the store generation, so results cached before an
+    ingest (by this or any other process) are never served after it.
+    """
+
+    def __init__(self, store: Store, cache: ResultCache | None = None):
+        self.store = store
+        self.cache = cache if cache is not None else ResultCache()
+
+    def player_card(self, player: int, *, role: str = "batter",
+                    seasons: Iterable[int] | int | None = None, split: str | None = None,
+                    stats: Iterable[str] | None = None) -> query.StatTable:
+        stats = tuple(stats) if stats is not None else query.COUNTING_STATS + query.RATE_STATS
+        ev_percentiles = query.parse_ev_percentiles(stats)
+        key = query_key("player", role=role, player=player, seasons=seasons, split=split,
+                        stats=stats)
+
+        def compute():
+            card = query.player_card(self.store, player, role=role, split=split,
+                                     seasons=key.seasons, ev_percentiles=ev_percentiles)
+            return card.project(key.stats)
+
+        return self.cache.get_or_compute(key, self.store.refresh(), compute)
+
+    def leaderboard(self, stat: str = "woba", *, role: str = "batter",
+                    seasons: Iterable[int] | int | None = None, split: str | None = None,
+                    level: str | int | None = None, min_pa: int = 0,
+                    limit: int | None = None) -> query.StatTable:
+        key = query_key("leaderboard", role=role, seasons=seasons, split=split, stats=(stat,),
+                        level=level, min_pa=min_pa, limit=limit)
+        return self.cache.get_or_compute(key, self.store.refresh(), lambda: query.leaderboard(
+            self.store, stat, role=role, split=split, level=level, min_pa=min_pa,
+            limit=limit, seasons=key.seasons))
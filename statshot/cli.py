@@ -0,0 +1,317 @@
+"""The ``statshot`` command line.
+
+::
+
+    statshot leaderboard woba --season 2024 --split stand --level L --min-pa 100
+    statshot player 660271 --role pitcher --split pitch_type
+    statshot splits count --players 660271,592450 --stats avg,obp,slg
+    statshot comps 543037 --role pitcher --pitch-type SL --season 2024
+    statshot advanced wrc_plus --season 2024 --min-pa 300
+    statshot ingest feeds/2024/            # or --workers 8 for a parallel backfill
+    statshot synth 2015,2016 --seed 7      # seeded synthetic seasons, fully offline
+    statshot export events.parquet --season 2015,2016 --columns batter,event
+
+The store comes from ``--store`` or ``$STATSHOT_STORE`` (default ``data``).
+Scripts call this hundreds of times a day, mostly with the same questions,
+so query output is kept under ``<store>/.cache/cli/`` keyed by the exact
+query and the store generation.  A repeated query is answered from there
+before NumPy or any of the query machinery is imported; only a miss opens
+the store (memory-mapped, not parsed) and computes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+CACHE_DIR = Path(".cache", "cli")
+
+_FORMATS = ("table", "csv", "json")
+
+
+def _csv(value: str) -> list[str]:
+    return [item for item in value.split(",") if item]
+
+
+def _seasons(value: str) -> list[int]:
+    try:
+        return sorted({int(item) for item in _csv(value)})
+    except ValueError:
+        raise argparse.ArgumentTypeError("seasons are comma-separated years") from None
+
+
+def _players(value: str) -> list[int]:
+    try:
+        return sorted({int(item) for item in _csv(value)})
+    except ValueError:
+        raise argparse.ArgumentTypeError("players are comma-separated ids") from None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="statshot",
+                                     description="Pitch-level MLB stats from a StatShot store.")
+    parser.add_argument("--store", default=os.environ.get("STATSHOT_STORE", "data"),
+                        help="store directory (default: $STATSHOT_STORE or ./data)")
+    parser.add_argument("--metrics", choices=("json", "prometheus"),
+                        help="write query and ingest timings to stderr when done")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def query_command(name: str, help: str) -> argparse.ArgumentParser:
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument("--role", choices=("batter", "pitcher"), default="batter")
+        sub.add_argument("--season", type=_seasons, help="comma-separated seasons (default: all)")
+        sub.add_argument("--format", choices=_FORMATS, default="table")
+        sub.add_argument("--no-cache", action="store_true", help="always recompute")
+        return sub
+
+    sub = query_command("leaderboard", "players ranked by one stat")
+    sub.add_argument("stat", nargs="?", default="woba")
+    sub.add_argument("--split")
+    sub.add_argument("--level", help="split level to rank within, e.g. L or 3-2")
+    sub.add_argument("--min-pa", type=int, default=0)
+    sub.add_argument("--limit", type=int, default=25)
+
+    sub = query_command("player", "one player's line, by split level")
+    sub.add_argument("player", type=int)
+    sub.add_argument("--split")
+    sub.add_argument("--stats", type=_csv, help="comma-separated stats to show")
+
+    sub = query_command("splits", "every player's line by split level")
+    sub.add_argument("split")
+    sub.add_argument("--players", type=_players, help="comma-separated player ids")
+    sub.add_argument("--stats", type=_csv, help="comma-separated stats to show")
+
+    sub = query_command("comps", "the players most like one, or pitches like one of theirs")
+    sub.add_argument("player", type=int)
+    sub.add_argument("--pitch-type", help="compare this pitch of a pitcher's (latest season)")
+    sub.add_argument("--min-pa", type=int, default=100)
+    sub.add_argument("--limit", type=int, default=10)
+
+    sub = query_command("advanced", "players ranked by wRC+, wRAA or RE24")
+    sub.add_argument("stat", nargs="?", default="wrc_plus")
+    sub.add_argument("--min-pa", type=int, default=0)
+    sub.add_argument("--limit", type=int, default=25)
+
+    sub = commands.add_parser("ingest", help="load game feeds into the store")
+    sub.add_argument("source", help="feed file or directory")
+    sub.add_argument("--rescan", action="store_true", help="parse files even if unchanged")
+    sub.add_argument("--workers", type=int, default=1,
+                     help="more than 1 runs a parallel backfill")
+    sub.add_argument("--by", choices=("season", "month"), default="season",
+                     help="backfill shard size")
+
+    sub = commands.add_parser("synth", help="write seeded synthetic seasons")
+    sub.add_argument("seasons", type=_seasons, help="comma-separated seasons")
+    sub.add_argument("--seed", type=int, default=0)
+    sub.add_argument("--games", type=int, help="games per season (default: a full season)")
+    sub.add_argument("--feeds", help="write feed files to this directory instead of the store")
+    sub.add_argument("--feed-format", choices=("json", "csv"), default="json")
+
+    sub = commands.add_parser("export", help="stream events to a Parquet file (needs pyarrow)")
+    sub.add_argument("path", help="Parquet file to write")
+    sub.add_argument("--season", type=_seasons, help="comma-separated seasons (default: all)")
+    sub.add_argument("--columns", type=_csv, help="comma-separated columns (default: all)")
+    sub.add_argument("--row-group-rows", type=int, default=1 << 20)
+    sub.add_argument("--compression", default="zstd")
+    return parser
+
+
+def _generation(root: Path) -> int:
+    try:
+        with open(root / "store.json") as fh:
+            return int(json.load(fh).get("generation", 0))
+    except FileNotFoundError:
+        return 0
+
+
+def _cache_path(root: Path, args: argparse.Namespace, generation: int) -> Path:
+    query = {k: v for k, v in sorted(vars(args).items()) if k not in ("store", "no_cache", "metrics")}
+    digest = hashlib.sha1(json.dumps(query, sort_keys=True).encode()).hexdigest()[:20]
+    return root / CACHE_DIR / f"g{generation}-{digest}.out"
+
+
+def _save(path: Path, output: str) -> None:
+    """Keep ``output`` for the next identical query; drop other generations' files."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        prefix = path.name.split("-", 1)[0] + "-"
+        for stale in path.parent.iterdir():
+            if not stale.name.startswith(prefix):
+                stale.unlink(missing_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(output)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # a read-only store still answers, just without the cache
+
+
+def run_query(args: argparse.Namespace):
+    """Compute the :class:`~statshot.query.StatTable` a query subcommand asks for."""
+    from . import query
+    from .store import Store
+
+    store = Store(args.store)
+    if args.command == "leaderboard":
+        return query.leaderboard(store, args.stat, role=args.role, split=args.split,
+                                 level=args.level, min_pa=args.min_pa, limit=args.limit,
+                                 seasons=args.season)
+    if args.command == "comps":
+        from . import comps
+
+        if args.pitch_type:
+            season = (args.season or store.seasons() or [0])[-1]
+            return comps.similar_pitches(store, args.player, args.pitch_type, season=season,
+                                         k=args.limit)
+        return comps.similar_players(store, args.player, role=args.role, seasons=args.season,
+                                     k=args.limit, min_pa=args.min_pa)
+    if args.command == "advanced":
+        from . import advanced
+
+        return advanced.leaderboard(store, args.stat, role=args.role, seasons=args.season,
+                                    min_pa=args.min_pa, limit=args.limit)
+    stats = args.stats
+    ev = query.parse_ev_percentiles(stats or ())
+    if args.command == "player":
+        table = query.player_card(store, args.player, role=args.role, split=args.split,
+                                  seasons=args.season, ev_percentiles=ev)
+    else:
+        table = query.stat_lines(store, role=args.role, split=args.split, players=args.players,
+                                 seasons=args.season, ev_percentiles=ev)
+    return table.project(stats) if stats else table
+
+
+def _cell(value) -> str:
+    if isinstance(value, float):
+        return "-" if value != value else f"{value:.3f}"
+    return str(value)
+
+
+def render(table, fmt: str) -> str:
+    records = table.to_records()
+    if fmt == "json":
+        return json.dumps([{k: None if isinstance(v, float) and v != v else v
+                            for k, v in r.items()} for r in records]) + "\n"
+    names = list(records[0]) if records else list(table.columns)
+    rows = [[_cell(r[name]) for name in names] for r in records]
+    if fmt == "csv":
+        return "".join(",".join(row) + "\n" for row in [names, *rows])
+    widths = [max([len(name), *(len(row[i]) for row in rows)]) for i, name in enumerate(names)]
+    lines = ["  ".join(cell.rjust(width) for cell, width in zip(row, widths))
+             for row in [names, *rows]]
+    return "\n".join(lines) + "\n"
+
+
+def ingest_command(args: argparse.Namespace) -> str:
+    from .store import Store
+
+    store = Store(args.store, create=True)
+    if args.workers > 1:
+        from .backfill import backfill
+
+        report = backfill(store, args.source, by=args.by, workers=args.workers,
+                          rescan=args.rescan)
+    else:
+        from .ingest import ingest
+
+        report = ingest(store, args.source, rescan=args.rescan)
+    return (f"{report.games_added} games added, {report.games_skipped} skipped, "
+            f"{report.pitches} pitches in {report.seconds:.1f}s "
+            f"(generation {report.generation})\n")
+
+
+def synth_command(args: argparse.Namespace) -> str:
+    from . import synth
+    from .ingest import append_columns
+    from .store import Store
+
+    n_games = args.games or synth.GAMES_PER_SEASON
+    if args.feeds:
+        files = sum(len(synth.write_feeds(synth.generate_season(season, seed=args.seed,
+                                                                n_games=n_games),
+                                          Path(args.feeds), fmt=args.feed_format))
+                    for season in args.seasons)
+        return f"{files} feed files written to {args.feeds}\n"
+    store = Store(args.store, create=True)
+    existing = sorted(set(args.seasons) & set(store.seasons()))
+    if existing:
+        raise ValueError(f"seasons {existing} are already in the store")
+    pitches = sum(append_columns(store, season, synth.generate_season(
+        season, seed=args.seed, n_games=n_games)) for season in args.seasons)
+    generation = store.bump_generation()
+    return (f"{len(args.seasons)} season(s), {pitches} pitches written "
+            f"(generation {generation})\n")
+
+
+def export_command(args: argparse.Namespace) -> str:
+    from . import export
+    from .store import Store
+
+    rows = export.write_parquet(Store(args.store), args.path, seasons=args.season,
+                                columns=args.columns, row_group_rows=args.row_group_rows,
+                                compression=args.compression)
+    return f"{rows} pitches written to {args.path}\n"
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return _main(args)
+    finally:
+        if args.metrics:
+            from . import metrics
+
+            registry = metrics.REGISTRY
+            sys.stderr.write(registry.to_json(indent=1) + "\n" if args.metrics == "json"
+                             else registry.to_prometheus())
+
+
+def _main(args: argparse.Namespace) -> int:
+    if args.command == "ingest":
+        sys.stdout.write(ingest_command(args))
+        return 0
+    if args.command == "synth":
+        try:
+            sys.stdout.write(synth_command(args))
+        except ValueError as exc:
+            print(f"statshot: {exc}", file=sys.stderr)
+            return 2
+        return 0
+
+    root = Path(args.store)
+    if not root.is_dir():
+        print(f"statshot: no store at {root}", file=sys.stderr)
+        return 2
+    if args.command == "export":
+        try:
+            sys.stdout.write(export_command(args))
+        except (ImportError, ValueError) as exc:
+            print(f"statshot: {exc}", file=sys.stderr)
+            return 2
+        return 0
+    cache = None if args.no_cache else _cache_path(root, args, _generation(root))
+    if cache is not None:
+        try:
+            sys.stdout.write(cache.read_text())
+            return 0
+        except FileNotFoundError:
+            pass
+
+    from .query import QueryError
+
+    try:
+        output = render(run_query(args), args.format)
+    except (QueryError, KeyError) as exc:
+        print(f"statshot: {exc}", file=sys.stderr)
+        return 2
+    if cache is not None:
+        _save(cache, output)
+    sys.stdout.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""Comparable pitches and players: k-nearest neighbours over feature vectors.
+
+Features are z-scored, so a mph of velocity and a hundred rpm of spin count
+about as much as each other does across the league.  A :class:`KnnIndex`
+clusters the normalized vectors into cells with a few rounds of k-means and
+stores them grouped by cell, the way :mod:`statshot.index` groups rows by
+key: ``vectors[offsets[c]:offsets[c + 1]]`` are cell ``c``'s points and
+``rows`` their row numbers.  A search scores every centroid, then only the
+``nprobe`` nearest cells' points, which is a few thousand distance
+computations instead of one per pitch of the season.  It is approximate:
+a true neighbour sitting across a cell boundary can be missed, which
+``nprobe`` trades off against speed (``bench_comps.py`` measures recall).
+
+Every pitch of a season is indexed on :data:`PITCH_FEATURES`; the index is
+built at ingest, once the last batch is in, and kept in ``comps.npz`` next
+to the season's columns with the row count it covers, so it is ignored when
+stale.  A query that finds it stale (a store appended to directly) builds
+one in memory and keeps it if the store is writable::
+
+    comps.similar_pitches(store, 543037, "SL", season=2024)   # sliders like this one
+    comps.similar_players(store, 660271, seasons=[2024], min_pa=200)
+
+Season lines are few enough that player comps search them exhaustively.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from . import metrics, query, schema
+from .store import EventTable, Partition, Store
+
+COMPS_FILE = "comps.npz"
+
+#: What makes two pitches alike: how hard, how much spin, how it moves and
+#: where it comes from.  Pitches missing any of them are not indexed.
+PITCH_FEATURES: tuple[str, ...] = ("release_speed", "release_spin_rate", "pfx_x", "pfx_z",
+                                   "release_pos_x", "release_pos_z")
+
+#: Rate stats that make two players' season lines alike, by role.
+PLAYER_FEATURES: dict[str, tuple[str, ...]] = {
+    "batter": ("avg", "obp", "iso", "k_pct", "bb_pct"),
+    "pitcher": ("avg", "obp", "iso", "k_pct", "bb_pct"),
+}
+
+DEFAULT_NPROBE = 8
+
+_KMEANS_SAMPLE = 50_000
+_KMEANS_ROUNDS = 8
+_ROW_DTYPE = np.int32
+
+
+class KnnIndex(NamedTuple):
+    """Normalized vectors grouped by their nearest k-means centroid."""
+
+    center: np.ndarray
+    scale: np.ndarray
+    centroids: np.ndarray
+    offsets: np.ndarray
+    rows: np.ndarray
+    vectors: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def normalize(self, values: np.ndarray) -> np.ndarray:
+        return ((np.asarray(values, dtype=np.float64) - self.center) / self.scale
+                ).astype(np.float32)
+
+    def search(self, point: np.ndarray, k: int = 10, *, nprobe: int = DEFAULT_NPROBE,
+               normalized: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """``(rows, distances)`` of the ``k`` indexed points nearest ``point``, nearest first.
+
+        ``point`` is in feature units unless ``normalized``.  Only the
+        ``nprobe`` cells with the nearest centroids are scanned.
+        """
+        point = point if normalized else self.normalize(point)
+        cells = len(self.centroids)
+        gap = ((self.centroids - point) ** 2).sum(axis=1)
+        probe = np.argsort(gap)[:nprobe] if nprobe < cells else np.arange(cells)
+        spans = [slice(self.offsets[c], self.offsets[c + 1]) for c in probe.tolist()]
+        vectors = np.concatenate([self.vectors[s] for s in spans])
+        rows = np.concatenate([self.rows[s] for s in spans])
+        return _nearest(vectors, rows, point, k)
+
+    def exact(self, point: np.ndarray, k: int = 10, *,
+              normalized: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """Like :meth:`search`, but over every indexed point."""
+        point = point if normalized else self.normalize(point)
+        return _nearest(self.vectors, self.rows, point, k)
+
+
+def _nearest(vectors: np.ndarray, rows: np.ndarray, point: np.ndarray, k: int):
+    d2 = ((vectors - point) ** 2).sum(axis=1)
+    if k < len(d2):
+        top = np.argpartition(d2, k)[:k]
+        top = top[np.lexsort((rows[top], d2[top]))]
+    else:
+        top = np.lexsort((rows, d2))
+    return rows[top], np.sqrt(d2[top])
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 4096) -> np.ndarray:
+    """Nearest centroid of each vector: ``argmin |c|^2 - 2 v.c``, a cache-sized chunk at a time."""
+    norms = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        scores = vectors[start:start + chunk] @ centroids.T
+        scores *= -2.0
+        scores += norms
+        out[start:start + chunk] = scores.argmin(axis=1)
+    return out
+
+
+def build(features: np.ndarray, rows: np.ndarray | None = None, *,
+          n_lists: int | None = None, seed: int = 0) -> KnnIndex:
+    """Index the rows of ``features`` (one vector each); rows with NaNs are left out.
+
+    ``rows`` labels the vectors (default: their positions).  ``n_lists``
+    defaults to about the square root of the number of vectors; 1 makes
+    every search exhaustive.
+    """
+    features = np.asarray(features, dtype=np.float64)
+    rows = np.arange(len(features)) if rows is None else np.asarray(rows)
+    keep = np.isfinite(features).all(axis=1)
+    features, rows = features[keep], rows[keep].astype(_ROW_DTYPE)
+    n, dims = features.shape
+    center = features.mean(axis=0) if n else np.zeros(dims)
+    scale = features.std(axis=0) if n else np.ones(dims)
+    scale[~(scale > 0)] = 1.0
+    vectors = ((features - center) / scale).astype(np.float32)
+    if n_lists is None:
+        n_lists = int(np.sqrt(n))
+    n_lists = max(1, min(n_lists, n))
+
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(n, min(n, _KMEANS_SAMPLE), replace=False)] if n else vectors
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)] if n else \
+        np.zeros((1, dims), np.float32)
+    if n_lists > 1:
+        for _ in range(_KMEANS_ROUNDS):
+            labels = _assign(sample, centroids)
+            sizes = np.bincount(labels, minlength=n_lists)
+            sums = np.column_stack([np.bincount(labels, sample[:, j], n_lists)
+                                    for j in range(dims)])
+            filled = sizes > 0  # an empty cell keeps its old centroid
+            centroids[filled] = (sums[filled] / sizes[filled, None]).astype(np.float32)
+        cells = _assign(vectors, centroids)
+    else:
+        cells = np.zeros(n, dtype=np.int64)
+    order = np.argsort(cells, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=len(centroids)))])
+    return KnnIndex(center, scale, centroids, offsets.astype(np.int64), rows[order],
+                    vectors[order])
+
+
+def pitch_features(table: EventTable) -> np.ndarray:
+    """``table``'s pitches as rows of :data:`PITCH_FEATURES`."""
+    return np.column_stack([table[name] for name in PITCH_FEATURES])
+
+
+_loaded: dict[str, tuple[int, tuple[int, KnnIndex]]] = {}
+
+
+def load(partition: Partition) -> KnnIndex | None:
+    """The partition's pitch index, or ``None`` if it has none or it is stale."""
+    stored = _read(partition)
+    if stored is None or stored[0] != partition.rows:
+        return None
+    return stored[1]
+
+
+def _read(partition: Partition):
+    path = partition.path / COMPS_FILE
+    cache_key = str(path)
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(cache_key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with np.load(path) as npz:
+        if tuple(npz["features"].tolist()) != PITCH_FEATURES:
+            return None
+        stored = int(npz["rows"]), KnnIndex(*(npz[f"knn.{field}"]
+                                                for field in KnnIndex._fields))
+    _loaded[cache_key] = (stamp, stored)
+    return stored
+
+
+def _write(partition: Partition, rows: int, knn: KnnIndex) -> None:
+    path = partition.path / COMPS_FILE
+    # Per process: queries in several processes may each build a stale index.
+    tmp = path.with_name(f"comps.{os.getpid()}.tmp.npz")
+    np.savez(tmp, rows=np.array(rows), features=np.array(PITCH_FEATURES),
+             **{f"knn.{field}": array for field, array in knn._asdict().items()})
+    os.replace(tmp, path)
+    _loaded[str(path)] = (os.stat(path).st_mtime_ns, (rows, knn))
+
+
+def update(partition: Partition) -> int:
+    """(Re)build the partition's pitch index if stale; returns the rows indexed (0 if current).
+
+    Normalization and cells depend on every pitch, so unlike rollups the
+    index is rebuilt whole rather than extended.
+    """
+    if load(partition) is not None:
+        return 0
+    rows = partition.rows
+    _write(partition, rows, _build_partition(partition, rows))
+    return rows
+
+
+def _build_partition(partition: Partition, rows: int) -> KnnIndex:
+    return build(pitch_features(partition.table().slice(0, rows)))
+
+
+def pitch_index(store: Store, season: int) -> KnnIndex:
+    """``season``'s pitch index, built first if it is missing or stale."""
+    if season not in store.seasons():
+        raise query.QueryError(f"no season {season} in the store")
+    partition = store.partition(season)
+    knn = load(partition)
+    if knn is None:
+        rows = partition.rows
+        knn = _build_partition(partition, rows)
+        try:
+            _write(partition, rows, knn)
+        except OSError:
+            pass  # a read-only store still answers, building the index each time
+    return knn
+
+
+def _pitch_type_code(pitch_type: str) -> int:
+    code = schema.code_of("pitch_type", pitch_type)
+    if not code:
+        raise query.QueryError(f"unknown pitch type {pitch_type!r}")
+    return code
+
+
+def similar_pitches(store: Store, pitcher: int, pitch_type: str, *, season: int,
+                    k: int = 10, neighbours: int = 500,
+                    nprobe: int = DEFAULT_NPROBE) -> query.StatTable:
+    """Other pitchers' pitches most like ``pitcher``'s ``pitch_type`` in ``season``.
+
+    The ``neighbours`` pitches nearest the pitcher's average one (leaving
+    out the pitcher's own) vote for the (pitcher, pitch type) that threw
+    them; the ``k`` with the most votes come back nearest first, with
+    ``pitches`` (votes), ``distance`` (their mean, in standard deviations)
+    and the mean features.
+    """
+    code = _pitch_type_code(pitch_type)
+    with metrics.span("query", kind="comps", role="pitcher", split="pitch_type") as span:
+        knn = pitch_index(store, season)
+        table = store.partition(season).table()
+        own = np.flatnonzero((table["pitcher"] == pitcher) & (table["pitch_type"] == code))
+        features = pitch_features(table.take(own))
+        features = features[np.isfinite(features).all(axis=1)]
+        if not len(features):
+            raise query.QueryError(f"pitcher {pitcher} threw no {pitch_type} in {season}")
+        target = knn.normalize(features.mean(axis=0))
+        rows, distances = knn.search(target, neighbours + len(features), nprobe=nprobe,
+                                     normalized=True)
+        other = table["pitcher"][rows] != pitcher
+        rows, distances = rows[other][:neighbours], distances[other][:neighbours]
+        span.rows = len(rows)
+        span.labels["origin"] = "index"
+
+        keys = table["pitcher"][rows].astype(np.int64) * len(schema.PITCH_TYPES) \
+            + table["pitch_type"][rows]
+        groups, codes = query.factorize(keys)
+        votes = np.bincount(codes, minlength=len(groups))
+        columns = {"player": groups // len(schema.PITCH_TYPES),
+                   "level": (groups % len(schema.PITCH_TYPES)).astype(np.int64),
+                   "pitches": votes,
+                   "distance": np.bincount(codes, distances, len(groups)) / votes}
+        shapes = pitch_features(table.take(rows))
+        for j, name in enumerate(PITCH_FEATURES):
+            columns[name] = np.bincount(codes, shapes[:, j], len(groups)) / votes
+        order = np.lexsort((columns["distance"], -votes))[:k]
+        return query.StatTable({name: values[order] for name, values in columns.items()},
+                               role="pitcher", split="pitch_type", labels=schema.PITCH_TYPES,
+                               origin="index")
+
+
+def similar_players(store: EventTable | Store, player: int, *, role: str = "batter",
+                    seasons: Iterable[int] | int | None = None, k: int = 10,
+                    min_pa: int = 100) -> query.StatTable:
+    """The ``k`` players whose lines over ``seasons`` are most like ``player``'s.
+
+    Candidates need ``min_pa`` plate appearances; ``player`` is not a
+    candidate and needs none.  Rows are nearest first, with ``distance`` in
+    standard deviations of :data:`PLAYER_FEATURES`.
+    """
+    if isinstance(seasons, int):
+        seasons = [seasons]
+    with metrics.span("query", kind="comps", role=role, split=None) as span:
+        lines = query.stat_lines(store, role=role, seasons=seasons, ev_percentiles=())
+        names = PLAYER_FEATURES[role]
+        features = np.column_stack([lines[name] for name in names])
+        at = np.flatnonzero(lines["player"] == player)
+        if not len(at) or not np.isfinite(features[at[0]]).all():
+            raise query.QueryError(f"no {role} line for player {player}")
+        pool = np.flatnonzero((lines["pa"] >= min_pa) & (lines["player"] != player))
+        knn = build(features[pool], pool, n_lists=1)
+        rows, distances = knn.exact(features[at[0]], k)
+        span.rows = len(pool)
+        span.labels["origin"] = lines.origin
+        columns = {"player": lines["player"][rows], "level": lines["level"][rows],
+                   "distance": distances, "pa": lines["pa"][rows]}
+        columns.update((name, lines[name][rows]) for name in names)
+        return query.StatTable(columns, role=role, origin=lines.origin)
@@ -0,0 +1,162 @@
+"""Hand events and query results to Arrow, NumPy and Parquet without copies.
+
+Uncompressed store columns are memory maps, and Arrow can wrap a NumPy
+buffer as it is, so :func:`event_arrays` and :func:`to_arrow` hand over the
+mapped pages themselves: a notebook gets a season's events in microseconds,
+and nothing is read from disk until it is touched.  Categorical columns
+become Arrow dictionary arrays over their stored one-byte codes, with the
+:mod:`~statshot.schema` vocabulary as the dictionary, so labels cost no copy
+either.  NaN stays NaN (Arrow would need a validity bitmap, i.e. a copy,
+to turn it into null).
+
+:func:`write_parquet` streams seasons one row group at a time: each group
+is a slice of views into one season's maps, written and dropped before the
+next, and a season's maps are closed when it is done.  Memory stays at
+about one row group plus the season being read, however many seasons go
+out::
+
+    export.to_arrow(store.table(2024), ["batter", "pitch_type", "launch_speed"])
+    export.to_arrow(query.leaderboard(store, "woba", seasons=[2024]))
+    export.write_parquet(store, "events.parquet", seasons=range(2015, 2025))
+
+Arrow and Parquet need ``pyarrow`` (``pip install statshot[arrow]``),
+imported on first use; :func:`event_arrays` is plain NumPy.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+from typing import Iterable, Iterator, Mapping
+
+import numpy as np
+
+from . import metrics, query, schema
+from .store import EventTable, Partition, Store
+
+#: Rows per Parquet row group (and per record batch) unless told otherwise.
+ROW_GROUP_ROWS = 1 << 20
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Arrow and Parquet export need pyarrow: "
+                          "pip install statshot[arrow]") from None
+    return pyarrow
+
+
+def _columns(names: Iterable[str], columns: Iterable[str] | None) -> list[str]:
+    names = list(names)
+    if columns is None:
+        return names
+    columns = list(columns)
+    missing = [c for c in columns if c not in names]
+    if missing:
+        raise ValueError(f"unknown columns {missing}")
+    return columns
+
+
+def event_arrays(store: Store, season: int, columns: Iterable[str] | None = None, *,
+                 start: int = 0, stop: int | None = None) -> dict[str, np.ndarray]:
+    """Rows ``start:stop`` of one season as read-only views of its column maps.
+
+    Only compressed columns are materialized (decoded once per partition).
+    """
+    table = store.partition(season).table()
+    table = table.slice(start, len(table) if stop is None else stop)
+    return {name: table[name] for name in _columns(table.columns, columns)}
+
+
+@functools.lru_cache(maxsize=None)
+def _dictionary(vocabulary: tuple[str, ...]):
+    return _pyarrow().array(vocabulary)
+
+
+def _array(pa, values: np.ndarray, vocabulary: Iterable[str] | None):
+    if vocabulary is None:
+        return pa.array(values)
+    # Codes come from the vocabulary (0 for anything unknown), so skip
+    # Arrow's bounds check, a pass over every code.
+    return pa.DictionaryArray.from_arrays(pa.array(values), _dictionary(tuple(vocabulary)),
+                                          safe=False)
+
+
+def to_arrow(source: EventTable | query.StatTable | Mapping[str, np.ndarray],
+             columns: Iterable[str] | None = None, *, labels: bool = True):
+    """A ``pyarrow.Table`` over the source's arrays, sharing their memory.
+
+    ``source`` is an event table (or a slice of one), a query result or a
+    plain ``{name: array}`` mapping.  With ``labels``, coded columns become
+    dictionary arrays: event columns over their vocabularies, a query's
+    ``level`` over its split labels.  A query result's role, split and
+    origin go into the schema metadata.
+    """
+    pa = _pyarrow()
+    metadata = None
+    vocabularies: Mapping[str, Iterable[str]] = schema.VOCABULARIES if labels else {}
+    if isinstance(source, query.StatTable):
+        if labels and source.split:
+            vocabularies = {"level": source.labels}
+        metadata = {"role": source.role, "split": source.split or "",
+                    "origin": source.origin}
+        source = source.columns
+    names = _columns(source.columns if isinstance(source, EventTable) else source, columns)
+    arrays = [_array(pa, source[name], vocabularies.get(name)) for name in names]
+    return pa.Table.from_arrays(arrays, names=names, metadata=metadata)
+
+
+def record_batches(store: Store, seasons: Iterable[int] | None = None,
+                   columns: Iterable[str] | None = None, *, rows: int = ROW_GROUP_ROWS,
+                   labels: bool = True) -> Iterator:
+    """Events of ``seasons`` as Arrow record batches of at most ``rows`` rows.
+
+    Every batch wraps views into one season's maps; the season is opened on
+    its own, so its maps go away once its last batch does.
+    """
+    if rows < 1:
+        raise ValueError(f"rows must be positive, got {rows}")
+    pa = _pyarrow()
+    names = _columns(schema.COLUMN_NAMES, columns)
+    vocabularies = schema.VOCABULARIES if labels else {}
+    for season in store.seasons() if seasons is None else seasons:
+        partition = Partition(store.root / f"season={season}")
+        table = partition.table()
+        for start in range(0, len(table), rows):
+            chunk = table.slice(start, start + rows)
+            yield pa.RecordBatch.from_arrays(
+                [_array(pa, chunk[name], vocabularies.get(name)) for name in names],
+                names=names)
+
+
+def write_parquet(store: Store, path: str | os.PathLike,
+                  seasons: Iterable[int] | None = None, columns: Iterable[str] | None = None,
+                  *, row_group_rows: int = ROW_GROUP_ROWS, compression: str = "zstd",
+                  labels: bool = True) -> int:
+    """Stream events to a Parquet file one row group at a time; returns the rows written.
+
+    The file is written next to ``path`` and renamed into place when
+    complete, so a failed export never leaves a truncated file behind.
+    """
+    _pyarrow()
+    import pyarrow.parquet as pq
+
+    names = _columns(schema.COLUMN_NAMES, columns)
+    empty = to_arrow({name: np.empty(0, schema.DTYPES[name]) for name in names}, labels=labels)
+    path = os.fspath(path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with metrics.span("export", format="parquet") as span:
+        span.rows = 0
+        try:
+            with pq.ParquetWriter(tmp, empty.schema, compression=compression) as writer:
+                for batch in record_batches(store, seasons, names, rows=row_group_rows,
+                                            labels=labels):
+                    writer.write_batch(batch, row_group_size=row_group_rows)
+                    span.rows += batch.num_rows
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+    return span.rows
@@ -0,0 +1,271 @@
+"""Spray charts and strike-zone heatmaps: 2D histograms per player-season.
+
+A :class:`Grid` bins one kind of point into equal rectangular cells:
+``spray`` puts batted balls' landing spots in 20 ft cells of the field
+(home plate at the origin, ``y`` toward center field), ``zone`` puts
+pitches' plate locations in 0.2 ft cells around the strike zone.  Binning
+is arithmetic on whole columns, and one ``bincount`` over
+``player * cells + cell`` histograms every player at once.
+
+Counts are additive, so like rollups the histograms of every grid and role
+are kept per season in ``heatmaps.npz`` next to its columns, extended at
+ingest with the appended rows and ignored when stale::
+
+    league = heatmap.heatmaps(store, "zone", role="pitcher", seasons=[2024])
+    league.density()                              # every pitcher's share per cell
+    heatmap.player_heatmap(store, 660271, "spray", seasons=[2024])
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Callable, Iterable, NamedTuple
+
+import numpy as np
+
+from . import index, query, schema
+from .store import EventTable, Partition, Store
+
+HEATMAP_FILE = "heatmaps.npz"
+
+_COUNT_DTYPE = np.int32
+
+
+class Grid(NamedTuple):
+    """Equal cells over ``x_range`` by ``y_range``; points outside are dropped."""
+
+    x_range: tuple[float, float]
+    y_range: tuple[float, float]
+    shape: tuple[int, int]
+    points: Callable[[EventTable], tuple[np.ndarray, np.ndarray, np.ndarray]]
+    doc: str
+
+    @property
+    def cells(self) -> int:
+        return self.shape[0] * self.shape[1]
+
+    @property
+    def x_edges(self) -> np.ndarray:
+        return np.linspace(*self.x_range, self.shape[0] + 1)
+
+    @property
+    def y_edges(self) -> np.ndarray:
+        return np.linspace(*self.y_range, self.shape[1] + 1)
+
+    def cell_of(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """``(cells, inside)``: the flat cell of each point that falls in the grid."""
+        (x0, x1), (y0, y1), (nx, ny) = self.x_range, self.y_range, self.shape
+        ix = np.floor((x - x0) * (nx / (x1 - x0)))
+        iy = np.floor((y - y0) * (ny / (y1 - y0)))
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        return (ix[inside] * ny + iy[inside]).astype(np.int64), inside
+
+
+def _spray_points(table: EventTable):
+    hc_x, hc_y = table["hc_x"], table["hc_y"]
+    rows = np.flatnonzero(np.isfinite(hc_x) & np.isfinite(hc_y))
+    home_x, home_y = schema.HIT_HOME
+    x = (hc_x[rows] - home_x) * schema.HIT_FEET_PER_UNIT
+    y = (home_y - hc_y[rows]) * schema.HIT_FEET_PER_UNIT
+    return rows, x, y
+
+
+def _zone_points(table: EventTable):
+    plate_x, plate_z = table["plate_x"], table["plate_z"]
+    rows = np.flatnonzero(np.isfinite(plate_x) & np.isfinite(plate_z))
+    return rows, plate_x[rows], plate_z[rows]
+
+
+GRIDS: dict[str, Grid] = {
+    "spray": Grid((-360.0, 360.0), (0.0, 480.0), (36, 24), _spray_points,
+                  "balls in play by landing spot, ft from home plate"),
+    "zone": Grid((-2.0, 2.0), (0.0, 5.0), (20, 25), _zone_points,
+                 "pitches by plate location, ft (plate_x, plate_z)"),
+}
+
+#: Every (grid, role) combination kept per season.
+MAPS: tuple[tuple[str, str], ...] = tuple(
+    (grid, role) for grid in GRIDS for role in query.ROLES)
+
+
+class Heatmaps(NamedTuple):
+    """One grid of counts per player: ``counts[i]`` is ``players[i]``'s, shaped like the grid."""
+
+    players: np.ndarray
+    counts: np.ndarray
+
+    def get(self, player: int) -> np.ndarray:
+        """``player``'s counts; all zero if they have none."""
+        i = np.searchsorted(self.players, player)
+        if i < len(self.players) and self.players[i] == player:
+            return self.counts[i]
+        return np.zeros(self.counts.shape[1:], dtype=self.counts.dtype)
+
+    def totals(self) -> np.ndarray:
+        return self.counts.sum(axis=(1, 2))
+
+    def density(self) -> np.ndarray:
+        """Each player's counts as a share of their total (NaN for players with none)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.counts / self.totals()[:, None, None]
+
+    def league(self) -> np.ndarray:
+        """All players' counts summed into one grid."""
+        return self.counts.sum(axis=0)
+
+
+def _grid(name: str) -> Grid:
+    try:
+        return GRIDS[name]
+    except KeyError:
+        raise query.QueryError(f"unknown grid {name!r}; expected one of {sorted(GRIDS)}") from None
+
+
+def compute(table: EventTable, grids: Iterable[str] = tuple(GRIDS),
+            roles: Iterable[str] = query.ROLES) -> dict[tuple[str, str], Heatmaps]:
+    """Histogram every player of ``roles`` on ``grids`` over ``table``."""
+    maps = {}
+    roles = tuple(roles)
+    for name in grids:
+        grid = _grid(name)
+        rows, x, y = grid.points(table)
+        cells, inside = grid.cell_of(x, y)
+        rows = rows[inside]
+        for role in roles:
+            players, codes = query.factorize(table[role][rows])
+            counts = np.bincount(codes * grid.cells + cells, minlength=len(players) * grid.cells)
+            maps[name, role] = Heatmaps(players, counts.reshape(len(players), *grid.shape)
+                                        .astype(_COUNT_DTYPE))
+    return maps
+
+
+def merge(maps: Iterable[Heatmaps]) -> Heatmaps:
+    """Sum heatmaps player by player."""
+    given = list(maps)
+    maps = [m for m in given if len(m.players)]
+    if len(maps) == 1:
+        return maps[0]
+    if not maps:
+        if not given:
+            raise ValueError("nothing to merge")
+        return given[0]
+    players = np.unique(np.concatenate([m.players for m in maps]))
+    counts = np.zeros((len(players), *maps[0].counts.shape[1:]), dtype=np.int64)
+    for m in maps:
+        # Players are distinct within one map, so plain fancy-index adds are safe.
+        counts[np.searchsorted(players, m.players)] += m.counts
+    return Heatmaps(players, counts)
+
+
+def _empty(grid: str) -> Heatmaps:
+    return Heatmaps(np.empty(0, np.int32), np.zeros((0, *GRIDS[grid].shape), _COUNT_DTYPE))
+
+
+_loaded: dict[str, tuple[int, tuple[int, dict[tuple[str, str], Heatmaps]]]] = {}
+
+
+def load(partition: Partition) -> dict[tuple[str, str], Heatmaps] | None:
+    """The partition's heatmaps, or ``None`` if it has none or they are stale."""
+    maps = _read(partition)
+    if maps is None or maps[0] != partition.rows:
+        return None
+    return maps[1]
+
+
+def _read(partition: Partition):
+    path = partition.path / HEATMAP_FILE
+    cache_key = str(path)
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(cache_key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with np.load(path) as npz:
+        rows = int(npz["rows"])
+        maps = {(grid, role): Heatmaps(*(npz[f"{grid}.{role}.{field}"]
+                                         for field in Heatmaps._fields))
+                for grid, role in MAPS}
+    _loaded[cache_key] = (stamp, (rows, maps))
+    return rows, maps
+
+
+def _write(partition: Partition, rows: int, maps: dict[tuple[str, str], Heatmaps]) -> None:
+    arrays = {"rows": np.array(rows)}
+    for (grid, role), heatmaps in maps.items():
+        for field, array in zip(Heatmaps._fields, heatmaps):
+            arrays[f"{grid}.{role}.{field}"] = array
+    path = partition.path / HEATMAP_FILE
+    tmp = path.with_name("heatmaps.tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    _loaded[str(path)] = (os.stat(path).st_mtime_ns, (rows, maps))
+
+
+def update(partition: Partition) -> int:
+    """Bin rows appended since the last update; returns how many (0 if current)."""
+    existing = _read(partition)
+    covered = existing[0] if existing is not None else 0
+    if covered > partition.rows:
+        existing, covered = None, 0
+    if covered == partition.rows and existing is not None:
+        return 0
+    fresh = compute(partition.table().slice(covered, partition.rows))
+    if existing is not None:
+        fresh = {key: merge([existing[1][key], fresh[key]]) for key in MAPS}
+    _write(partition, partition.rows,
+           {key: Heatmaps(m.players, m.counts.astype(_COUNT_DTYPE)) if len(m.players)
+            else _empty(key[0]) for key, m in fresh.items()})
+    return partition.rows - covered
+
+
+def heatmaps(source: EventTable | Store, grid: str, *, role: str = "batter",
+             seasons: Iterable[int] | int | None = None) -> Heatmaps:
+    """Every player's counts on ``grid``, summed over ``seasons``.
+
+    From a store the per-season heatmaps are used; seasons without current
+    ones are binned from their pitches.
+    """
+    query._resolve(role, None)
+    _grid(grid)
+    if isinstance(source, EventTable):
+        return compute(source, [grid], [role])[grid, role]
+    if isinstance(seasons, int):
+        seasons = [seasons]
+    maps = []
+    for part in source.partitions(seasons):
+        if not part.rows:
+            continue
+        loaded = load(part)
+        maps.append(loaded[grid, role] if loaded is not None
+                    else compute(part.table(), [grid], [role])[grid, role])
+    return merge(maps) if maps else _empty(grid)
+
+
+def player_heatmap(source: EventTable | Store, player: int, grid: str, *,
+                   role: str = "batter", seasons: Iterable[int] | int | None = None
+                   ) -> np.ndarray:
+    """One player's counts on ``grid``, summed over ``seasons``.
+
+    A season without current heatmaps is binned from just the player's rows,
+    found through its index.
+    """
+    query._resolve(role, None)
+    _grid(grid)
+    if isinstance(source, EventTable):
+        rows = np.flatnonzero(source[role] == player)
+        return compute(source.take(rows), [grid], [role])[grid, role].get(player)
+    if isinstance(seasons, int):
+        seasons = [seasons]
+    total = np.zeros(GRIDS[grid].shape, dtype=np.int64)
+    for part in source.partitions(seasons):
+        if not part.rows:
+            continue
+        loaded = load(part)
+        if loaded is None:
+            picked = index.select(source, role, [player], [part.season])
+            table = picked if picked is not None else part.table()
+            loaded = compute(table, [grid], [role])
+        total += loaded[grid, role].get(player)
+    return total
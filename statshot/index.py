@@ -0,0 +1,174 @@
+"""Sorted offset indexes over a partition's batter, pitcher, game and date columns.
+
+Pitches are stored in game order, so one batter's pitches are spread over
+the whole season.  An index groups row numbers by key: ``keys`` holds the
+distinct values in sorted order, ``rows`` every row number ordered by key
+(and by row within a key), and ``offsets`` where each key's run starts, so
+a player's rows are the contiguous slice ``rows[offsets[i]:offsets[i + 1]]``
+found with one binary search instead of a pass over the whole column.
+
+Like rollups, the indexes of a partition live in one file (``indexes.npz``)
+next to its columns with the row count they cover, are extended at ingest
+by merging in the appended rows, and are ignored when stale.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from . import schema
+from .store import EventTable, Partition, Store
+
+INDEX_FILE = "indexes.npz"
+
+#: Columns that get an index.
+INDEXED: tuple[str, ...] = ("batter", "pitcher", "game_pk", "game_date")
+
+_ROW_DTYPE = np.int32
+
+
+class Index(NamedTuple):
+    """Row numbers grouped by the sorted distinct values of one column."""
+
+    keys: np.ndarray
+    offsets: np.ndarray
+    rows: np.ndarray
+
+    def lookup(self, value: int) -> np.ndarray:
+        """Ascending rows where the column equals ``value``."""
+        i = np.searchsorted(self.keys, value)
+        if i == len(self.keys) or self.keys[i] != value:
+            return self.rows[:0]
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def lookup_range(self, low: int, high: int) -> np.ndarray:
+        """Rows where ``low <= value <= high``, grouped by value."""
+        lo = np.searchsorted(self.keys, low, side="left")
+        hi = np.searchsorted(self.keys, high, side="right")
+        return self.rows[self.offsets[lo]:self.offsets[hi]]
+
+    def lookup_many(self, values: Iterable[int]) -> np.ndarray:
+        """Ascending rows where the column takes any of ``values``."""
+        values = np.unique(np.fromiter(values, dtype=np.int64))
+        at = np.searchsorted(self.keys, values)
+        found = at < len(self.keys)
+        found[found] = self.keys[at[found]] == values[found]
+        runs = [self.rows[self.offsets[i]:self.offsets[i + 1]] for i in at[found].tolist()]
+        if len(runs) == 1:
+            return runs[0]
+        return np.sort(np.concatenate(runs)) if runs else self.rows[:0]
+
+
+def build(values: np.ndarray, start: int = 0) -> Index:
+    """Index ``values``, whose first element is row ``start``."""
+    order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    if not len(values):
+        return Index(ordered, np.zeros(1, np.int64), order.astype(_ROW_DTYPE))
+    bounds = np.flatnonzero(ordered[1:] != ordered[:-1]) + 1
+    offsets = np.concatenate([[0], bounds, [len(values)]]).astype(np.int64)
+    return Index(ordered[offsets[:-1]], offsets, (order + start).astype(_ROW_DTYPE))
+
+
+def merge(index: Index, appended: Index) -> Index:
+    """Combine an index with one over rows that all come after it."""
+    if not len(appended.rows):
+        return index
+    if not len(index.rows):
+        return appended
+    old = np.repeat(index.keys, np.diff(index.offsets))
+    new = np.repeat(appended.keys, np.diff(appended.offsets))
+    # Appended rows go after every existing row with the same key.
+    at = np.searchsorted(old, new, side="right")
+    rows = np.insert(index.rows, at, appended.rows)
+    keys = np.insert(old, at, new)
+    bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    offsets = np.concatenate([[0], bounds, [len(keys)]]).astype(np.int64)
+    return Index(keys[offsets[:-1]], offsets, rows)
+
+
+_loaded: dict[str, tuple[int, tuple[int, dict[str, Index]]]] = {}
+
+
+def load(partition: Partition) -> dict[str, Index] | None:
+    """The partition's indexes, or ``None`` if it has none or they are stale."""
+    indexes = _read(partition)
+    if indexes is None or indexes[0] != partition.rows:
+        return None
+    return indexes[1]
+
+
+def _read(partition: Partition):
+    path = partition.path / INDEX_FILE
+    cache_key = str(path)
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(cache_key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with np.load(path) as npz:
+        rows = int(npz["rows"])
+        indexes = {column: Index(*(npz[f"{column}.{field}"] for field in Index._fields))
+                   for column in INDEXED}
+    _loaded[cache_key] = (stamp, (rows, indexes))
+    return rows, indexes
+
+
+def _write(partition: Partition, rows: int, indexes: dict[str, Index]) -> None:
+    arrays = {"rows": np.array(rows)}
+    for column, index in indexes.items():
+        for field, array in zip(Index._fields, index):
+            arrays[f"{column}.{field}"] = array
+    path = partition.path / INDEX_FILE
+    tmp = path.with_name("indexes.tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    _loaded[str(path)] = (os.stat(path).st_mtime_ns, (rows, indexes))
+
+
+def update(partition: Partition) -> int:
+    """Index rows appended since the last update; returns how many (0 if current)."""
+    existing = _read(partition)
+    covered = existing[0] if existing is not None else 0
+    if covered > partition.rows:
+        existing, covered = None, 0
+    if covered == partition.rows and existing is not None:
+        return 0
+    indexes = {}
+    for column in INDEXED:
+        appended = build(np.asarray(partition.column(column)[covered:]), covered)
+        indexes[column] = merge(existing[1][column], appended) if existing else appended
+    _write(partition, partition.rows, indexes)
+    return partition.rows - covered
+
+
+def select(store: Store, column: str, values: Iterable[int] | int,
+           seasons: Iterable[int] | int | None = None) -> EventTable | None:
+    """The events of ``seasons`` whose ``column`` takes one of ``values``.
+
+    Columns are gathered from each season's memory maps on first access.
+    Returns ``None`` when any of the seasons lacks a current index.
+    """
+    if isinstance(seasons, int):
+        seasons = [seasons]
+    values = [values] if isinstance(values, (int, np.integer)) else list(values)
+    picks = []
+    for part in store.partitions(seasons):
+        if not part.rows:
+            continue
+        indexes = load(part)
+        if indexes is None:
+            return None
+        rows = indexes[column].lookup_many(values)
+        if len(rows):
+            picks.append((part, rows))
+    if len(picks) == 1:
+        return picks[0][0].table().take(picks[0][1])
+    return EventTable(sum(len(rows) for _, rows in picks), schema.COLUMN_NAMES,
+                      lambda name: np.concatenate([p.column(name)[rows] for p, rows in picks])
+                      if picks else np.empty(0, dtype=schema.DTYPES[name]))
@@ -0,0 +1,358 @@
+"""Streaming, incremental ingest of pitch-by-pitch game feeds.
+
+A feed source is a file or a directory tree of files in either layout:
+
+``*.json`` / ``*.json.gz``
+    One game per file::
+
+        {"game_pk": 746001, "game_date": "2024-04-01",
+         "pitches": [{"at_bat_number": 1, "pitch_number": 1, ...}, ...]}
+
+``*.csv`` / ``*.csv.gz``
+    One pitch per row with a header, any number of games per file; the rows
+    of one game must be contiguous.
+
+Pitch fields use Statcast names (see :data:`FEED_FIELDS`); a pitch without
+a ``park`` is taken to be in the home team's park.  Files are read
+lazily, one game at a time, and games whose ``game_pk`` is already in the
+store are skipped, so re-pulling a whole season's feeds every day only costs
+the parse of the files and appends just the new games.  Better still, the
+store remembers the size and modification time of every feed file it has
+fully ingested (``ingest-manifest.json``), and unchanged files are not even
+opened on the next pull.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import itertools
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Sequence
+
+import numpy as np
+
+from . import advanced, comps, heatmap, index, metrics, rollup, schema
+from .store import Store, _read_json, _write_json
+
+#: Store column -> field name in a feed record.  ``on_base`` is the one
+#: exception: it is assembled from :data:`BASE_FIELDS`.
+FEED_FIELDS: dict[str, str] = {
+    "game_pk": "game_pk",
+    "game_date": "game_date",
+    "home_team": "home_team",
+    "away_team": "away_team",
+    "park": "park",
+    "at_bat_number": "at_bat_number",
+    "pitch_number": "pitch_number",
+    "inning": "inning",
+    "inning_topbot": "inning_topbot",
+    "outs_when_up": "outs_when_up",
+    "bat_score": "bat_score",
+    "post_bat_score": "post_bat_score",
+    "batter": "batter",
+    "pitcher": "pitcher",
+    "stand": "stand",
+    "p_throws": "p_throws",
+    "balls": "balls",
+    "strikes": "strikes",
+    "pitch_type": "pitch_type",
+    "release_speed": "release_speed",
+    "release_spin_rate": "release_spin_rate",
+    "release_pos_x": "release_pos_x",
+    "release_pos_z": "release_pos_z",
+    "pfx_x": "pfx_x",
+    "pfx_z": "pfx_z",
+    "plate_x": "plate_x",
+    "plate_z": "plate_z",
+    "launch_speed": "launch_speed",
+    "launch_angle": "launch_angle",
+    "hc_x": "hc_x",
+    "hc_y": "hc_y",
+    "outcome": "description",
+    "event": "events",
+}
+
+#: Feed fields naming the runner on first, second and third (empty if none).
+BASE_FIELDS: tuple[str, ...] = ("on_1b", "on_2b", "on_3b")
+
+FEED_SUFFIXES = (".json", ".json.gz", ".csv", ".csv.gz")
+
+MANIFEST_NAME = "ingest-manifest.json"
+
+_GAME_FIELDS = ("game_pk", "game_date")
+_TOPBOT = {"top": 0, "bot": 1, "bottom": 1, "0": 0, "1": 1, 0: 0, 1: 1}
+
+
+class FeedError(ValueError):
+    """Raised when a feed file cannot be parsed."""
+
+
+class GameFeed(NamedTuple):
+    """The raw pitch records of one game, as read from a feed file."""
+
+    game_pk: int
+    game_date: int
+    pitches: list[dict]
+    source: str
+
+    @property
+    def season(self) -> int:
+        return self.game_date // 10000
+
+
+@dataclass
+class IngestReport:
+    files: int = 0
+    files_unchanged: int = 0
+    games_added: int = 0
+    games_skipped: int = 0
+    pitches: int = 0
+    seconds: float = 0.0
+    generation: int = 0
+
+    @property
+    def pitches_per_second(self) -> float:
+        return self.pitches / self.seconds if self.seconds else 0.0
+
+
+def parse_date(value) -> int:
+    """``"2024-04-01"``, ``"20240401"`` or ``20240401`` -> ``20240401``."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    text = str(value).strip()
+    return int(text[:10].replace("-", ""))
+
+
+def iter_feed_files(source: str | os.PathLike) -> Iterator[Path]:
+    """Feed files under ``source`` in sorted (date-prefixed names: chronological) order."""
+    source = Path(source)
+    if source.is_file():
+        yield source
+        return
+    if not source.is_dir():
+        raise FileNotFoundError(source)
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(FEED_SUFFIXES):
+                yield Path(dirpath, name)
+
+
+def _open_text(path: Path):
+    if path.suffix == ".gz":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_feed(path: str | os.PathLike) -> Iterator[GameFeed]:
+    """Yield the games in one feed file."""
+    path = Path(path)
+    with _open_text(path) as fh:
+        if path.name.endswith((".json", ".json.gz")):
+            try:
+                doc = json.load(fh)
+                yield GameFeed(int(doc["game_pk"]), parse_date(doc["game_date"]),
+                               doc["pitches"], str(path))
+            except (KeyError, TypeError, ValueError) as exc:
+                raise FeedError(f"{path}: {exc}") from exc
+            return
+        reader = csv.DictReader(fh)
+        missing = [f for f in _GAME_FIELDS if f not in (reader.fieldnames or ())]
+        if missing:
+            raise FeedError(f"{path}: missing columns {missing}")
+        for game_pk, rows in itertools.groupby(reader, key=lambda row: row["game_pk"]):
+            rows = list(rows)
+            yield GameFeed(int(game_pk), parse_date(rows[0]["game_date"]), rows, str(path))
+
+
+def iter_games(source: str | os.PathLike) -> Iterator[GameFeed]:
+    """Stream every game under ``source``, file by file."""
+    for path in iter_feed_files(source):
+        yield from read_feed(path)
+
+
+def _floats(values: list) -> list:
+    return [np.nan if v is None or v == "" else v for v in values]
+
+
+def _on_base(pitches: list[dict]) -> np.ndarray:
+    """Bitmask of occupied bases from the runner fields (1 = first, 2 = second, 4 = third)."""
+    mask = np.zeros(len(pitches), dtype=schema.DTYPES["on_base"])
+    for bit, field in enumerate(BASE_FIELDS):
+        occupied = [p.get(field) not in (None, "", 0, "0") for p in pitches]
+        mask |= np.array(occupied, dtype=mask.dtype) << bit
+    return mask
+
+
+def to_columns(games: Sequence[GameFeed]) -> dict[str, np.ndarray]:
+    """Convert games' raw pitch records into store column arrays."""
+    pitches = [p for game in games for p in game.pitches]
+    counts = [len(game.pitches) for game in games]
+    columns: dict[str, np.ndarray] = {
+        "game_pk": np.repeat(np.array([g.game_pk for g in games], dtype=np.int64), counts),
+        "game_date": np.repeat(np.array([g.game_date for g in games], dtype=np.int64), counts),
+    }
+    for column in schema.COLUMNS:
+        name = column.name
+        if name in columns:
+            columns[name] = columns[name].astype(column.dtype)
+            continue
+        if name == "on_base":
+            columns[name] = _on_base(pitches)
+            continue
+        field = FEED_FIELDS[name]
+        values = [p.get(field) for p in pitches]
+        try:
+            if name in schema.VOCABULARIES:
+                columns[name] = schema.codes_for(name, values)
+            elif name == "inning_topbot":
+                columns[name] = np.array(
+                    [_TOPBOT[v.lower() if isinstance(v, str) else v] for v in values],
+                    dtype=column.dtype)
+            elif column.dtype.kind == "f":
+                columns[name] = np.array(_floats(values), dtype=column.dtype)
+            else:
+                columns[name] = np.array(values, dtype=column.dtype)
+        except (KeyError, TypeError, ValueError) as exc:
+            sources = sorted({g.source for g in games})
+            raise FeedError(f"bad {field!r} values in {sources}: {exc}") from exc
+    unnamed = columns["park"] == 0
+    if unnamed.any():
+        columns["park"][unnamed] = schema.HOME_PARKS[columns["home_team"][unnamed]]
+    return columns
+
+
+def refresh(store: Store, seasons: Iterable[int] | None = None, *,
+            knn: bool = True) -> None:
+    """Bring the derived data (rollups, indexes, heatmaps, advanced, comps) of ``seasons`` current.
+
+    The comps index is rebuilt whole rather than extended, so ``knn=False``
+    leaves it for a later refresh, after the last of several appends.
+    """
+    stages = [("rollup", rollup.update), ("index", index.update),
+              ("heatmap", heatmap.update), ("advanced", advanced.update)]
+    if knn:
+        stages.append(("comps", comps.update))
+    for partition in store.partitions(seasons):
+        for stage, update in stages:
+            with metrics.span("ingest", stage=stage) as span:
+                span.rows = update(partition)
+
+
+def append_columns(store: Store, season: int, columns: dict[str, np.ndarray], *,
+                   knn: bool = True) -> int:
+    """Append rows to a season and bring its derived data up to date (see :func:`refresh`)."""
+    with metrics.span("ingest", stage="append") as span:
+        added = span.rows = store.append(season, columns)
+    if added:
+        refresh(store, [season], knn=knn)
+    return added
+
+
+def _file_stamp(path: Path) -> list[int]:
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _load_manifest(store: Store) -> dict[str, list[int]]:
+    path = store.root / MANIFEST_NAME
+    return _read_json(path) if path.exists() else {}
+
+
+def _timed(games: Iterable[GameFeed]) -> Iterator[GameFeed]:
+    """Pass ``games`` through, recording the time spent reading them as one observation."""
+    games = iter(games)
+    seconds, pitches = 0.0, 0
+    while True:
+        start = time.perf_counter()
+        game = next(games, None)
+        seconds += time.perf_counter() - start
+        if game is None:
+            break
+        pitches += len(game.pitches)
+        yield game
+    metrics.observe("ingest", seconds, rows=pitches, stage="parse")
+
+
+def ingest(store: Store, source: str | os.PathLike | Iterable[GameFeed], *,
+           batch_pitches: int = 250_000, rescan: bool = False,
+           knn: bool = True) -> IngestReport:
+    """Append the games in ``source`` that ``store`` does not have yet.
+
+    ``source`` is a feed file, a directory of feeds, or an iterable of
+    :class:`GameFeed`.  Games are buffered and appended in batches of about
+    ``batch_pitches`` pitches, always on game boundaries, and each batch is
+    folded into the season rollups right after it is committed.  The store's
+    generation is bumped once at the end if any game was added.
+
+    Feed files listed in the store's ingest manifest with the same size and
+    mtime are skipped unopened; pass ``rescan=True`` to parse them anyway.
+    The comps index of every season that grew is rebuilt once, after the
+    last batch, unless ``knn`` is false.
+    """
+    start = time.perf_counter()
+    report = IngestReport()
+    manifest: dict[str, list[int]] | None = None
+    if isinstance(source, (str, os.PathLike)):
+        manifest = _load_manifest(store)
+        files, stamps = [], {}
+        for path in iter_feed_files(source):
+            key = str(path.resolve())
+            stamps[key] = _file_stamp(path)
+            if not rescan and manifest.get(key) == stamps[key]:
+                report.files_unchanged += 1
+            else:
+                files.append(path)
+        report.files = len(files) + report.files_unchanged
+        games: Iterable[GameFeed] = itertools.chain.from_iterable(map(read_feed, files))
+    else:
+        games = source
+
+    known: dict[int, set[int]] = {}
+    pending: dict[int, list[GameFeed]] = {}
+    grown: set[int] = set()
+    buffered = 0
+
+    def flush() -> None:
+        nonlocal buffered
+        for season, batch in sorted(pending.items()):
+            with metrics.span("ingest", stage="convert") as span:
+                columns = to_columns(batch)
+                span.rows = len(columns["game_pk"])
+            append_columns(store, season, columns, knn=False)
+            grown.add(season)
+        pending.clear()
+        buffered = 0
+
+    for game in _timed(games):
+        season = game.season
+        seen = known.get(season)
+        if seen is None:
+            seen = known[season] = set(store.partition(season).game_pks().tolist())
+        if game.game_pk in seen:
+            report.games_skipped += 1
+            continue
+        seen.add(game.game_pk)
+        pending.setdefault(season, []).append(game)
+        buffered += len(game.pitches)
+        report.games_added += 1
+        report.pitches += len(game.pitches)
+        if buffered >= batch_pitches:
+            flush()
+    flush()
+    if knn and grown:
+        refresh(store, sorted(grown))
+    if manifest is not None:
+        # Only after every game of these files is committed to the store.
+        manifest.update(stamps)
+        _write_json(store.root / MANIFEST_NAME, manifest)
+
+    report.generation = store.bump_generation() if report.games_added else store.generation
+    report.seconds = time.perf_counter() - start
+    return report
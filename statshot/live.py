@@ -0,0 +1,386 @@
+"""Live, pitch-by-pitch stat lines and leaderboards while games are on.
+
+Events are feed pitch records (the fields of :data:`~statshot.ingest.FEED_FIELDS`
+plus ``game_pk`` and ``game_date``), one JSON object per line, and a
+``{"game_pk": ..., "final": true}`` record once a game is over, from any of:
+
+* :func:`tail` - a file another process appends to, followed like ``tail -f``;
+* :func:`listen` - a TCP socket a feed client connects to and writes lines on;
+* :func:`stand_in` - a synthetic slate of concurrent games for tests and
+  benchmarks, written out by :func:`replay`.
+
+A :class:`LiveBoard` starts from the season-to-date lines in the store and
+applies each event to just the batter and pitcher it involves: their counting
+stats are bumped by the event's :data:`~statshot.query.EVENT_STATS` row and
+each tracked :class:`Leaderboard` re-slots the two players in its sorted
+order.  The cost of an event depends on the players it changes, never on the
+size of the league.  Repeated or out-of-order pitches (a reconnecting feed
+resending what it already sent) are skipped.
+
+The pitches themselves are kept, and :meth:`LiveBoard.commit` ingests the
+games that are final into the store, after which the regular query paths
+see them too.  Games still in progress are never committed: the store skips
+a game it already has, so committing one early would lose the rest of it::
+
+    board = live.LiveBoard(store, 2024)
+    for record in live.tail("today.ndjson", stop=done):
+        board.apply(record)
+        board.leaderboard("woba", min_pa=100, limit=10)
+    board.commit(store)                     # the games whose final record came
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import math
+import os
+import socket
+import threading
+import time
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from . import query, schema
+from .ingest import FEED_FIELDS, GameFeed, IngestReport, ingest, parse_date
+from .store import Store
+
+_EVENT_FIELD = FEED_FIELDS["event"]
+
+#: Field of the record that ends a game: ``{"game_pk": ..., "final": true}``.
+FINAL_FIELD = "final"
+
+
+def _parse(line: str | bytes) -> dict | None:
+    line = line.strip()
+    return json.loads(line) if line else None
+
+
+def tail(path: str | os.PathLike, *, poll: float = 0.01,
+         stop: threading.Event | None = None) -> Iterator[dict]:
+    """Follow ``path`` from its start, yielding records as lines are completed.
+
+    Waits for the file to appear, polls for more every ``poll`` seconds and
+    returns once ``stop`` is set and everything written so far is read.
+    """
+    while not os.path.exists(path):
+        if stop is not None and stop.is_set():
+            return
+        time.sleep(poll)
+    with open(path, "rb") as fh:
+        partial = b""
+        while True:
+            chunk = fh.readline()
+            if chunk:
+                partial += chunk
+                if partial.endswith(b"\n"):
+                    record = _parse(partial)
+                    partial = b""
+                    if record is not None:
+                        yield record
+                continue
+            if stop is not None and stop.is_set():
+                return
+            time.sleep(poll)
+
+
+def listen(host: str = "127.0.0.1", port: int = 0, *,
+           ready: threading.Event | None = None, bound: list | None = None,
+           connections: int | None = None) -> Iterator[dict]:
+    """Accept feed connections on ``host:port`` and yield the records they send.
+
+    Connections are served one after another; a client that drops is
+    replaced by the next one.  ``bound`` (if given) receives the listening
+    address and ``ready`` is set once clients can connect.  Stops after
+    ``connections`` clients when that is given.
+    """
+    with socket.create_server((host, port)) as server:
+        if bound is not None:
+            bound.append(server.getsockname()[:2])
+        if ready is not None:
+            ready.set()
+        served = 0
+        while connections is None or served < connections:
+            conn, _ = server.accept()
+            served += 1
+            with conn, conn.makefile("rb") as stream:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                for line in stream:
+                    record = _parse(line)
+                    if record is not None:
+                        yield record
+
+
+def stand_in(season: int, *, n_games: int = 15, seed: int = 0,
+             first_game_pk: int | None = None) -> list[dict]:
+    """A synthetic slate: ``n_games`` games played at once, in arrival order.
+
+    Games start together and their pitches interleave as they would on a
+    real feed, each followed by its final record.  ``first_game_pk``
+    defaults past any regular synthetic game so the slate can be applied on
+    top of a synthetic season.
+    """
+    from . import synth
+
+    columns = synth.generate_season(season, seed=seed, n_games=n_games)
+    values = synth._feed_values(columns)
+    fields = [f for f in values if f not in ("game_pk", "game_date")]
+    offset = (season * 10000 + 5000 if first_game_pk is None else first_game_pk) - (
+        season * 10000 + 1)
+    game_pk = columns["game_pk"].astype(np.int64) + offset
+    # Each game throws a pitch about every 20 s from a common first pitch,
+    # give or take a few seconds, so the games stay interleaved throughout.
+    rng = np.random.default_rng([seed, season, n_games])
+    starts = np.flatnonzero(np.r_[True, game_pk[1:] != game_pk[:-1]])
+    nth = np.arange(len(game_pk)) - np.repeat(starts, np.diff(np.r_[starts, len(game_pk)]))
+    arrival = nth * 20.0 + rng.uniform(0.0, 5.0, len(game_pk))
+    last = set(np.r_[starts[1:] - 1, len(game_pk) - 1].tolist())
+    records = []
+    for i in np.argsort(arrival, kind="stable").tolist():
+        record = {f: values[f][i] for f in fields}
+        record["game_pk"] = int(game_pk[i])
+        record["game_date"] = values["game_date"][i]
+        records.append(record)
+        if i in last:
+            records.append({"game_pk": int(game_pk[i]), FINAL_FIELD: True})
+    return records
+
+
+def replay(records: Iterable[dict], target, *, rate: float | None = None,
+           stamp: bool = False) -> int:
+    """Write ``records`` as NDJSON to a path or a ``(host, port)`` socket.
+
+    ``rate`` paces the writes (events per second); ``stamp`` adds each
+    record's send time (``time.perf_counter``) as ``sent`` so a reader can
+    measure its latency.  Returns how many records were written.
+    """
+    if isinstance(target, tuple):
+        conn = socket.create_connection(target)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        write, close = conn.sendall, conn.close
+    else:
+        fh = open(target, "ab", buffering=0)
+        write, close = fh.write, fh.close
+    start = time.perf_counter()
+    n = 0
+    try:
+        for n, record in enumerate(records, 1):
+            if rate:
+                delay = start + (n - 1) / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if stamp:
+                record = {**record, "sent": time.perf_counter()}
+            write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+    finally:
+        close()
+    return n
+
+
+def _rate_stats(counts: np.ndarray) -> dict[str, float]:
+    rates = query.rate_stats({name: counts[i:i + 1]
+                              for i, name in enumerate(query.COUNTING_STATS)})
+    return {name: float(value[0]) for name, value in rates.items()}
+
+
+class Leaderboard:
+    """Players ordered by one stat, re-slotted one player at a time."""
+
+    def __init__(self, stat: str, role: str = "batter", *, min_pa: int = 0,
+                 ascending: bool | None = None):
+        if stat not in query.COUNTING_STATS + query.RATE_STATS:
+            raise query.QueryError(f"unknown stat {stat!r}")
+        query._resolve(role, None)
+        self.stat = stat
+        self.role = role
+        self.min_pa = min_pa
+        if ascending is None:
+            ascending = role == "pitcher" and stat not in ("so", "k_pct")
+        self._sign = 1.0 if ascending else -1.0
+        self._order: list[tuple[float, int]] = []
+        self._keys: dict[int, tuple[float, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def update(self, player: int, line: dict[str, float]) -> None:
+        """Move ``player`` to where their current ``line`` ranks them."""
+        old = self._keys.pop(player, None)
+        if old is not None:
+            del self._order[bisect.bisect_left(self._order, old)]
+        value = line[self.stat]
+        if line["pa"] < self.min_pa or math.isnan(value):
+            return
+        key = (self._sign * value, player)
+        bisect.insort(self._order, key)
+        self._keys[player] = key
+
+    def top(self, limit: int | None = None) -> list[tuple[int, float]]:
+        """``(player, value)`` pairs, best first."""
+        return [(player, self._sign * key) for key, player in self._order[:limit]]
+
+
+class LiveBoard:
+    """Running stat lines and leaderboards for one season, updated per pitch."""
+
+    def __init__(self, store: Store | None = None, season: int | None = None):
+        self.season = season
+        self._counts: dict[str, dict[int, np.ndarray]] = {role: {} for role in query.ROLES}
+        self._boards: dict[tuple[str, str, int], Leaderboard] = {}
+        self._last: dict[int, tuple[int, int]] = {}
+        self._games: dict[int, tuple[int, list[dict]]] = {}
+        self._final: set[int] = set()
+        self._known: set[int] = set()
+        self.events = 0
+        if store is not None and season is not None:
+            self._load(store, season)
+
+    def _load(self, store: Store, season: int) -> None:
+        if season not in store.seasons():
+            return
+        self._known = set(store.partition(season).game_pks().tolist())
+        for role in query.ROLES:
+            lines = query.stat_lines(store, role=role, seasons=[season], ev_percentiles=())
+            counts = np.column_stack([lines[name] for name in query.COUNTING_STATS])
+            self._counts[role] = dict(zip(lines["player"].tolist(), counts.astype(np.int64)))
+
+    def apply(self, record: dict) -> bool:
+        """Apply one pitch; False if it was already seen or its game is in the store.
+
+        A final record marks its game final and is not a pitch (False).
+        """
+        game_pk = int(record["game_pk"])
+        if game_pk in self._known:
+            return False
+        if record.get(FINAL_FIELD):
+            self.finish([game_pk])
+            return False
+        at = (int(record[FEED_FIELDS["at_bat_number"]]),
+              int(record[FEED_FIELDS["pitch_number"]]))
+        last = self._last.get(game_pk)
+        if last is not None and at <= last:
+            return False
+        self._last[game_pk] = at
+        game = self._games.get(game_pk)
+        if game is None:
+            game = self._games[game_pk] = (parse_date(record["game_date"]), [])
+        game[1].append({k: v for k, v in record.items() if k != "sent"})
+        self.events += 1
+        event = schema.code_of("event", record.get(_EVENT_FIELD))
+        if event:
+            for role in query.ROLES:
+                self._add(role, int(record[FEED_FIELDS[role]]), query.EVENT_STATS[event])
+        return True
+
+    def _add(self, role: str, player: int, delta: np.ndarray) -> None:
+        counts = self._counts[role].get(player)
+        if counts is None:
+            counts = self._counts[role][player] = np.zeros(len(query.COUNTING_STATS), np.int64)
+        counts += delta
+        boards = [b for (_, r, _), b in self._boards.items() if r == role]
+        if boards:
+            line = self._line(counts)
+            for board in boards:
+                board.update(player, line)
+
+    @staticmethod
+    def _line(counts: np.ndarray) -> dict[str, float]:
+        line = dict(zip(query.COUNTING_STATS, counts.tolist()))
+        line.update(_rate_stats(counts))
+        return line
+
+    def line(self, player: int, role: str = "batter") -> dict[str, float] | None:
+        """``player``'s season line including today's games, or ``None``."""
+        counts = self._counts[role].get(player)
+        return None if counts is None else {"player": player, **self._line(counts)}
+
+    def leaderboard(self, stat: str = "woba", role: str = "batter", *, min_pa: int = 0,
+                    limit: int | None = 10) -> list[dict]:
+        """The top ``limit`` players by ``stat``.
+
+        The first call for a (stat, role, min_pa) ranks every player once;
+        from then on the board is kept up to date event by event.
+        """
+        key = (stat, role, min_pa)
+        board = self._boards.get(key)
+        if board is None:
+            board = self._boards[key] = Leaderboard(stat, role, min_pa=min_pa)
+            for player, counts in self._counts[role].items():
+                board.update(player, self._line(counts))
+        return [{"player": player, stat: value} for player, value in board.top(limit)]
+
+    def games(self) -> list[int]:
+        """Games with pitches applied since the last commit."""
+        return sorted(self._games)
+
+    def finish(self, games: Iterable[int]) -> None:
+        """Mark ``games`` final, as their final records do."""
+        self._final.update(int(pk) for pk in games)
+
+    def final_games(self) -> list[int]:
+        """Games with uncommitted pitches that are final."""
+        return sorted(self._final.intersection(self._games))
+
+    def commit(self, store: Store, games: Iterable[int] | None = None) -> IngestReport:
+        """Ingest the pitches of final ``games`` (default: every final game) into ``store``.
+
+        Their pitches stay counted in the running lines; later events for
+        committed games are ignored.  Raises ``ValueError`` for a game that
+        is not final, since the rest of its pitches could never be added.
+        """
+        games = self.final_games() if games is None else sorted(games)
+        unfinished = [pk for pk in games if pk not in self._final]
+        if unfinished:
+            raise ValueError(f"games {unfinished} are not final")
+        feeds = [GameFeed(pk, self._games[pk][0], self._games[pk][1], "live")
+                 for pk in games if pk in self._games]
+        report = ingest(store, feeds)
+        for feed in feeds:
+            del self._games[feed.game_pk]
+            self._last.pop(feed.game_pk, None)
+            self._final.discard(feed.game_pk)
+            self._known.add(feed.game_pk)
+        return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply a live pitch feed to a StatShot store.")
+    parser.add_argument("--store", required=True, help="store directory")
+    parser.add_argument("--season", type=int, required=True)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--tail", help="NDJSON file to follow")
+    source.add_argument("--listen", type=int, metavar="PORT", help="accept feeds on PORT")
+    parser.add_argument("--host", default="127.0.0.1", help="interface --listen binds to")
+    parser.add_argument("--stat", default="woba", help="leaderboard to print")
+    parser.add_argument("--min-pa", type=int, default=0)
+    parser.add_argument("--every", type=float, default=10.0,
+                        help="seconds between leaderboard prints")
+    args = parser.parse_args(argv)
+
+    store = Store(args.store)
+    board = LiveBoard(store, args.season)
+    events = tail(args.tail) if args.tail else listen(args.host, args.listen)
+    printed = time.monotonic()
+    try:
+        for record in events:
+            board.apply(record)
+            if time.monotonic() - printed >= args.every:
+                printed = time.monotonic()
+                top = board.leaderboard(args.stat, min_pa=args.min_pa)
+                print(f"{board.events} events: " + ", ".join(
+                    f"{row['player']} {row[args.stat]:.3f}" for row in top), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if board.final_games():
+            report = board.commit(store)
+            print(f"committed {report.games_added} games, {report.pitches} pitches", flush=True)
+        unfinished = len(board.games())
+        if unfinished:
+            print(f"{unfinished} unfinished games left out of the store", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""In-process timings and row counts for queries and ingest stages.
+
+Instrumented code wraps its work in a span::
+
+    with metrics.span("query", kind="leaderboard", split="stand") as span:
+        ...
+        span.rows = len(rows)
+        span.labels["origin"] = "rollup"
+
+Every distinct (name, labels) gets a timer: a count, total and maximum
+seconds, a latency histogram and the rows processed.  The registry renders as
+JSON (:meth:`Registry.to_json`) or in the Prometheus text format
+(:meth:`Registry.to_prometheus`), where ``query`` becomes
+``statshot_query_seconds`` (a histogram) and ``statshot_query_rows_total``.
+
+Profiling is opt-in: after :meth:`Registry.profile_slow` (or with
+``$STATSHOT_PROFILE_MS`` set) the outermost span on each thread runs under
+:mod:`cProfile`, and the profiles of spans slower than the threshold are kept
+(the ``keep`` most recent, and optionally as ``.prof`` files) for
+:meth:`Registry.to_json` and :func:`pstats` to show where the time went.
+
+Process-pool workers record into their own registry; :meth:`Registry.drain`
+hands what they recorded to the parent, which folds it in with
+:meth:`Registry.merge`.  This module imports nothing heavy, so the command
+line can use it on its fast path.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+#: Upper bounds, in seconds, of the latency histogram buckets.
+BUCKETS: tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                              0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROFILE_ENV = "STATSHOT_PROFILE_MS"
+
+_PROFILE_LINES = 30
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Timer:
+    """Accumulated observations of one (name, labels)."""
+
+    __slots__ = ("count", "seconds", "max_seconds", "rows", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds: float, rows: int) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.rows += rows
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def add(self, other: dict) -> None:
+        self.count += other["count"]
+        self.seconds += other["seconds"]
+        self.max_seconds = max(self.max_seconds, other["max_seconds"])
+        self.rows += other["rows"]
+        self.buckets = [a + b for a, b in zip(self.buckets, other["buckets"])]
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "seconds": self.seconds, "max_seconds": self.max_seconds,
+                "rows": self.rows, "buckets": list(self.buckets)}
+
+
+class Span:
+    """What a ``with registry.span(...)`` block reports; set ``rows`` and ``labels``."""
+
+    __slots__ = ("name", "labels", "rows", "seconds")
+
+    def __init__(self, name: str, labels: dict[str, str]):
+        self.name = name
+        self.labels = labels
+        self.rows = 0
+        self.seconds = 0.0
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, "none" if v is None else str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    """Thread-safe store of timers, counters and slow-span profiles."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers: dict[tuple[str, Labels], Timer] = {}
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._gauges: dict[tuple[str, Labels], float] = {}
+        self._profiles: deque[dict] = deque(maxlen=20)
+        self._slow_seconds: float | None = None
+        self._profile_dir: Path | None = None
+        self._local = threading.local()
+        threshold = os.environ.get(PROFILE_ENV)
+        if threshold:
+            self.profile_slow(float(threshold) / 1e3)
+
+    # -- recording ---------------------------------------------------------
+
+    def observe(self, name: str, seconds: float, /, *, rows: int = 0, **labels) -> None:
+        """Record one timing of ``name`` directly (for code that cannot use a span)."""
+        key = (name, _labels(labels))
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                timer = self._timers[key] = Timer()
+            timer.observe(seconds, rows)
+
+    def count(self, name: str, value: float = 1, /, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, /, **labels) -> None:
+        with self._lock:
+            self._gauges[name, _labels(labels)] = value
+
+    @contextmanager
+    def span(self, name: str, /, **labels) -> Iterator[Span]:
+        """Time the block; profile it when profiling is on and it is the outermost span."""
+        span = Span(name, labels)
+        depth = getattr(self._local, "depth", 0)
+        profiler = None
+        if self._slow_seconds is not None and depth == 0:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler is already running
+                profiler = None
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - start
+            self._local.depth = depth
+            if profiler is not None:
+                profiler.disable()
+                if span.seconds >= self._slow_seconds:
+                    self._keep_profile(span, profiler)
+            self.observe(name, span.seconds, rows=span.rows, **span.labels)
+
+    # -- profiling ---------------------------------------------------------
+
+    def profile_slow(self, threshold_seconds: float | None, *, keep: int = 20,
+                     directory: str | os.PathLike | None = None) -> None:
+        """Profile spans and keep those slower than ``threshold_seconds``; ``None`` stops."""
+        with self._lock:
+            self._slow_seconds = threshold_seconds
+            self._profiles = deque(self._profiles, maxlen=keep)
+            self._profile_dir = Path(directory) if directory is not None else None
+        if self._profile_dir is not None:
+            self._profile_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def profiling(self) -> bool:
+        return self._slow_seconds is not None
+
+    def _keep_profile(self, span: Span, profiler: cProfile.Profile) -> None:
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(_PROFILE_LINES)
+        record = {"name": span.name, "labels": dict(_labels(span.labels)),
+                  "seconds": span.seconds, "time": time.time(), "stats": out.getvalue()}
+        if self._profile_dir is not None:
+            path = self._profile_dir / f"{span.name}-{time.time_ns()}.prof"
+            stats.dump_stats(path)
+            record["path"] = str(path)
+        with self._lock:
+            self._profiles.append(record)
+        self.count("slow_profiles", name=span.name)
+
+    def profiles(self) -> list[dict]:
+        with self._lock:
+            return list(self._profiles)
+
+    # -- export ------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """Everything recorded, as plain JSON-ready data."""
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> dict:
+        # Callers hold the lock.
+        def entries(items, value):
+            return [{"name": name, "labels": dict(labels), **value(v)}
+                    for (name, labels), v in sorted(items)]
+
+        return {
+            "timers": entries(self._timers.items(), Timer.to_dict),
+            "counters": entries(self._counters.items(), lambda v: {"value": v}),
+            "gauges": entries(self._gauges.items(), lambda v: {"value": v}),
+            "slow_profiles": list(self._profiles),
+        }
+
+    def to_json(self, **dump_options) -> str:
+        return json.dumps(self.snapshot(), **dump_options)
+
+    def to_prometheus(self, prefix: str = "statshot") -> str:
+        snap = self.snapshot()
+        lines: list[str] = []
+        typed: set[str] = set()
+
+        def emit(family: str, kind: str, labels: dict, value, suffix: str = "") -> None:
+            if family not in typed:
+                typed.add(family)
+                lines.append(f"# TYPE {family} {kind}")
+            lines.append(_sample(family + suffix, labels, value))
+
+        for timer in snap["timers"]:
+            family = f"{prefix}_{timer['name']}_seconds"
+            labels = timer["labels"]
+            running = 0
+            for bound, n in zip((*BUCKETS, "+Inf"), timer["buckets"]):
+                running += n
+                emit(family, "histogram", {**labels, "le": str(bound)}, running, "_bucket")
+            emit(family, "histogram", labels, timer["seconds"], "_sum")
+            emit(family, "histogram", labels, timer["count"], "_count")
+        for timer in snap["timers"]:
+            emit(f"{prefix}_{timer['name']}_rows_total", "counter", timer["labels"],
+                 timer["rows"])
+        for counter in snap["counters"]:
+            emit(f"{prefix}_{counter['name']}_total", "counter", counter["labels"],
+                 counter["value"])
+        for gauge in snap["gauges"]:
+            emit(f"{prefix}_{gauge['name']}", "gauge", gauge["labels"], gauge["value"])
+        return "\n".join(lines) + "\n"
+
+    # -- moving between processes -------------------------------------------
+
+    def drain(self) -> dict:
+        """Return everything recorded since the last drain and forget it."""
+        # One acquisition, so nothing recorded in between is dropped.
+        with self._lock:
+            snap = self._snapshot()
+            self._clear()
+        return snap
+
+    def merge(self, snap: dict) -> None:
+        """Fold in another registry's :meth:`snapshot` or :meth:`drain`."""
+        with self._lock:
+            for entry in snap["timers"]:
+                key = (entry["name"], _labels(entry["labels"]))
+                timer = self._timers.get(key)
+                if timer is None:
+                    timer = self._timers[key] = Timer()
+                timer.add(entry)
+            for entry in snap["counters"]:
+                key = (entry["name"], _labels(entry["labels"]))
+                self._counters[key] = self._counters.get(key, 0) + entry["value"]
+            for entry in snap["gauges"]:
+                self._gauges[entry["name"], _labels(entry["labels"])] = entry["value"]
+            self._profiles.extend(snap["slow_profiles"])
+
+    def reset(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        self._timers.clear()
+        self._counters.clear()
+        self._gauges.clear()
+        self._profiles.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(metric: str, labels: dict, value) -> str:
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return f"{metric}{{{body}}} {value!r}" if body else f"{metric} {value!r}"
+
+
+#: The process-wide registry the instrumented code records into.
+REGISTRY = Registry()
+
+span = REGISTRY.span
+observe = REGISTRY.observe
+count = REGISTRY.count
+gauge = REGISTRY.gauge
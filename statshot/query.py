@@ -0,0 +1,464 @@
+"""Vectorized batting/pitching lines, splits and leaderboards.
+
+Every query is a handful of whole-array passes over the plate-appearance rows
+of an :class:`~statshot.store.EventTable`:
+
+1. pick the PA-ending pitches (``event != 0``);
+2. turn (player, split level, event) into one flat integer key;
+3. ``np.bincount`` the keys into a ``groups x events`` histogram;
+4. multiply by :data:`EVENT_STATS` to get counting stats per group.
+
+Rate stats are then plain array arithmetic on the counting stats, and
+exit-velocity percentiles come from one sort of the batted balls.  There are
+no per-event Python loops anywhere on the path.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Callable, Iterable, NamedTuple, Sequence
+
+import numpy as np
+
+from . import metrics, schema
+from .store import EventTable, Store
+
+ROLES = ("batter", "pitcher")
+
+#: Counting stats, in the column order of :data:`EVENT_STATS`.
+COUNTING_STATS: tuple[str, ...] = (
+    "pa", "ab", "h", "singles", "doubles", "triples", "hr", "tb",
+    "bb", "ibb", "hbp", "so", "sf", "sh",
+)
+
+RATE_STATS: tuple[str, ...] = ("avg", "obp", "slg", "ops", "iso", "woba", "k_pct", "bb_pct")
+
+#: Linear weights for wOBA (unintentional BB, HBP, 1B, 2B, 3B, HR).
+WOBA_WEIGHTS: dict[str, float] = {
+    "bb": 0.696, "hbp": 0.726, "singles": 0.883, "doubles": 1.244, "triples": 1.569, "hr": 2.004,
+}
+
+DEFAULT_EV_PERCENTILES: tuple[int, ...] = (50, 90)
+
+# Counting-stat contribution of each PA event; AB is PA minus the non-AB results.
+_EVENT_GROUPS: dict[str, tuple[str, ...]] = {
+    "singles": ("single",),
+    "doubles": ("double",),
+    "triples": ("triple",),
+    "hr": ("home_run",),
+    "bb": ("walk",),
+    "ibb": ("intent_walk",),
+    "hbp": ("hit_by_pitch",),
+    "so": ("strikeout", "strikeout_double_play"),
+    "sf": ("sac_fly", "sac_fly_double_play"),
+    "sh": ("sac_bunt", "sac_bunt_double_play"),
+}
+_NOT_AT_BATS = ("walk", "intent_walk", "hit_by_pitch", "sac_fly", "sac_fly_double_play",
+                "sac_bunt", "sac_bunt_double_play", "catcher_interf")
+
+
+def _event_stats() -> np.ndarray:
+    matrix = np.zeros((len(schema.EVENTS), len(COUNTING_STATS)), dtype=np.int64)
+    col = {name: i for i, name in enumerate(COUNTING_STATS)}
+    for stat, events in _EVENT_GROUPS.items():
+        for event in events:
+            matrix[schema.code_of("event", event), col[stat]] = 1
+    matrix[1:, col["pa"]] = 1
+    matrix[1:, col["ab"]] = 1
+    for event in _NOT_AT_BATS:
+        matrix[schema.code_of("event", event), col["ab"]] = 0
+    hits = matrix[:, [col[s] for s in ("singles", "doubles", "triples", "hr")]]
+    matrix[:, col["h"]] = hits.sum(axis=1)
+    matrix[:, col["tb"]] = hits @ np.array([1, 2, 3, 4])
+    return matrix
+
+
+#: ``EVENT_STATS[event_code]`` is that event's row of counting-stat increments.
+EVENT_STATS: np.ndarray = _event_stats()
+
+
+class QueryError(ValueError):
+    """Raised for unknown roles, splits, stats or levels."""
+
+
+class Split(NamedTuple):
+    """A way of bucketing plate appearances.
+
+    ``levels(table, rows, role)`` returns the level code of each PA row;
+    codes index into ``labels``.
+    """
+
+    name: str
+    labels: tuple[str, ...]
+    levels: Callable[[EventTable, np.ndarray, str], np.ndarray]
+
+
+def _column_split(column: str) -> Callable[[EventTable, np.ndarray, str], np.ndarray]:
+    return lambda table, rows, role: table[column][rows]
+
+
+def _count_levels(table: EventTable, rows: np.ndarray, role: str) -> np.ndarray:
+    return table["balls"][rows].astype(np.intp) * 3 + table["strikes"][rows]
+
+
+def _home_away_levels(table: EventTable, rows: np.ndarray, role: str) -> np.ndarray:
+    # The home team bats in the bottom half and pitches in the top half.
+    bottom = table["inning_topbot"][rows]
+    return bottom if role == "batter" else 1 - bottom
+
+
+def _month_levels(table: EventTable, rows: np.ndarray, role: str) -> np.ndarray:
+    return table["game_date"][rows] // 100 % 100
+
+
+SPLITS: dict[str, Split] = {
+    split.name: split for split in (
+        Split("stand", schema.HANDS, _column_split("stand")),
+        Split("p_throws", schema.HANDS, _column_split("p_throws")),
+        Split("count", tuple(f"{b}-{s}" for b in range(4) for s in range(3)), _count_levels),
+        Split("home_away", ("away", "home"), _home_away_levels),
+        Split("month", ("", "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep",
+                        "Oct", "Nov", "Dec"), _month_levels),
+        Split("pitch_type", schema.PITCH_TYPES, _column_split("pitch_type")),
+    )
+}
+
+
+class StatTable:
+    """Columnar query result: one row per (player, split level).
+
+    Columns are ``player``, ``level`` (split level code, all zero when there
+    is no split), every counting and rate stat, and ``ev_p<N>`` exit-velocity
+    percentiles.  ``labels`` maps level codes to display strings, and
+    ``origin`` is ``"scan"`` or ``"rollup"`` depending on what answered.
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray], *, role: str,
+                 split: str | None = None, labels: Sequence[str] = ("",),
+                 origin: str = "scan"):
+        self.columns = columns
+        self.role = role
+        self.split = split
+        self.labels = tuple(labels)
+        self.origin = origin
+
+    def __len__(self) -> int:
+        return len(self.columns["player"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __repr__(self) -> str:
+        return f"StatTable(role={self.role!r}, split={self.split!r}, rows={len(self)})"
+
+    def _select(self, rows) -> "StatTable":
+        return StatTable({k: v[rows] for k, v in self.columns.items()},
+                         role=self.role, split=self.split, labels=self.labels,
+                         origin=self.origin)
+
+    def where(self, mask: np.ndarray) -> "StatTable":
+        return self._select(np.asarray(mask, dtype=bool))
+
+    def sort(self, by: str, *, ascending: bool = False) -> "StatTable":
+        """Rows ordered by ``by``; NaNs always last, ties broken by player id."""
+        values = self.columns[by].astype(np.float64)
+        key = np.where(np.isnan(values), np.inf, values if ascending else -values)
+        return self._select(np.lexsort((self.columns["player"], key)))
+
+    def head(self, n: int) -> "StatTable":
+        return self._select(slice(0, n))
+
+    def project(self, stats: Iterable[str]) -> "StatTable":
+        """Only ``player``, ``level`` and the given stat columns."""
+        names = ["player", "level", *(s for s in stats if s not in ("player", "level"))]
+        missing = [n for n in names if n not in self.columns]
+        if missing:
+            raise QueryError(f"unknown stats {missing}")
+        return StatTable({n: self.columns[n] for n in names}, role=self.role,
+                         split=self.split, labels=self.labels, origin=self.origin)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def level_labels(self) -> list[str]:
+        labels = np.asarray(self.labels, dtype=object)
+        return labels[self.columns["level"]].tolist()
+
+    def to_records(self) -> list[dict]:
+        """Rows as plain dicts, with the split level as its label."""
+        names = [n for n in self.columns if n != "level"]
+        values = [self.columns[n].tolist() for n in names]
+        records = [dict(zip(names, row)) for row in zip(*values)]
+        if self.split is not None:
+            for record, label in zip(records, self.level_labels()):
+                record[self.split] = label
+        return records
+
+
+def factorize(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return ``(uniques, codes)`` with ``uniques[codes] == values``.
+
+    Player ids are dense enough that a lookup table beats sorting, so that is
+    used whenever the id range is within a small multiple of the row count.
+    """
+    if len(values) == 0:
+        return values[:0].copy(), np.empty(0, dtype=np.intp)
+    lo, hi = int(values.min()), int(values.max())
+    if lo >= 0 and hi - lo <= max(4 * len(values), 1 << 20):
+        offset = values - lo
+        present = np.zeros(hi - lo + 1, dtype=bool)
+        present[offset] = True
+        uniques = np.flatnonzero(present)
+        lookup = np.cumsum(present) - 1
+        return (uniques + lo).astype(values.dtype), lookup[offset]
+    uniques, codes = np.unique(values, return_inverse=True)
+    return uniques, codes
+
+
+def _resolve(role: str, split: str | None) -> Split | None:
+    if role not in ROLES:
+        raise QueryError(f"unknown role {role!r}; expected one of {ROLES}")
+    if split is None:
+        return None
+    try:
+        return SPLITS[split]
+    except KeyError:
+        raise QueryError(f"unknown split {split!r}; expected one of {sorted(SPLITS)}") from None
+
+
+def pa_rows(table: EventTable, players: Iterable[int] | None = None,
+            role: str = "batter") -> np.ndarray:
+    """Indices of PA-ending pitches, optionally only for ``players``."""
+    mask = table["event"] != 0
+    if players is not None:
+        mask &= np.isin(table[role], np.fromiter(players, dtype=np.int64))
+    return np.flatnonzero(mask)
+
+
+def count_stats(table: EventTable, *, role: str = "batter", split: str | None = None,
+                rows: np.ndarray | None = None):
+    """Counting stats per (player, level).
+
+    Returns ``(players, levels, counts)`` where ``counts[i]`` is the
+    :data:`COUNTING_STATS` vector of ``players[i]`` at split level
+    ``levels[i]``; only groups with at least one PA are returned.
+    """
+    spec = _resolve(role, split)
+    if rows is None:
+        rows = pa_rows(table)
+    n_levels = len(spec.labels) if spec else 1
+    n_events = len(schema.EVENTS)
+    uniques, player_codes = factorize(table[role][rows])
+    group = player_codes * n_levels
+    if spec is not None:
+        group = group + spec.levels(table, rows, role)
+    hist = np.bincount(group * n_events + table["event"][rows],
+                       minlength=len(uniques) * n_levels * n_events)
+    hist = hist.reshape(-1, n_events)
+    present = np.flatnonzero(hist[:, 1:].any(axis=1))
+    counts = hist[present] @ EVENT_STATS
+    return uniques[present // n_levels], (present % n_levels).astype(np.int16), counts
+
+
+def rate_stats(counts: dict[str, np.ndarray],
+               weights: dict[str, float] | None = None) -> dict[str, np.ndarray]:
+    """AVG/OBP/SLG/OPS/ISO/wOBA/K%/BB% from counting-stat arrays."""
+    weights = WOBA_WEIGHTS if weights is None else weights
+    c = {k: v.astype(np.float64) for k, v in counts.items()}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = c["h"] / c["ab"]
+        obp = (c["h"] + c["bb"] + c["ibb"] + c["hbp"]) / (
+            c["ab"] + c["bb"] + c["ibb"] + c["hbp"] + c["sf"])
+        slg = c["tb"] / c["ab"]
+        woba = sum(w * c[k] for k, w in weights.items()) / (
+            c["ab"] + c["bb"] + c["sf"] + c["hbp"])
+        return {
+            "avg": avg, "obp": obp, "slg": slg, "ops": obp + slg, "iso": slg - avg,
+            "woba": woba, "k_pct": c["so"] / c["pa"], "bb_pct": (c["bb"] + c["ibb"]) / c["pa"],
+        }
+
+
+def parse_ev_percentiles(stats: Iterable[str]) -> tuple[float, ...]:
+    """The exit-velocity percentiles named by ``ev_p<N>`` stats, e.g. 90 for ``ev_p90``."""
+    out = []
+    for stat in stats:
+        if not stat.startswith("ev_p"):
+            continue
+        try:
+            q = float(stat[4:])
+        except ValueError:
+            q = math.nan
+        if not 0 <= q <= 100:
+            raise QueryError(f"unknown stat {stat!r}; exit-velocity percentiles are "
+                             f"ev_p0 to ev_p100")
+        out.append(q)
+    return tuple(out)
+
+
+def group_percentiles(group: np.ndarray, values: np.ndarray, n_groups: int,
+                      percentiles: Sequence[float]) -> tuple[np.ndarray, np.ndarray]:
+    """Per-group percentiles (linear interpolation) of finite ``values``.
+
+    Returns ``(sizes, table)`` where ``table[i, j]`` is percentile ``j`` of
+    group ``i`` (NaN for empty groups).
+    """
+    if not all(0 <= q <= 100 for q in percentiles):
+        raise ValueError(f"percentiles must be within [0, 100], got {list(percentiles)}")
+    keep = np.isfinite(values)
+    group, values = group[keep], values[keep].astype(np.float64)
+    # One float sort of group-offset values is several times cheaper than a
+    # two-key lexsort; values are shifted into [0, span) so groups never mix.
+    if len(values):
+        lo = values.min()
+        span = values.max() - lo + 1.0
+        ordered = np.sort(group * span + (values - lo))
+        ordered -= np.sort(group) * span - lo
+    else:
+        ordered = values
+    sizes = np.bincount(group, minlength=n_groups)
+    starts = np.cumsum(sizes) - sizes
+    out = np.full((n_groups, len(percentiles)), np.nan)
+    has = sizes > 0
+    for j, q in enumerate(percentiles):
+        pos = starts[has] + (sizes[has] - 1) * (q / 100.0)
+        lo = np.floor(pos).astype(np.intp)
+        hi = np.minimum(lo + 1, starts[has] + sizes[has] - 1)
+        frac = pos - lo
+        out[has, j] = ordered[lo] * (1 - frac) + ordered[hi] * frac
+    return sizes, out
+
+
+def _ev_columns(table: EventTable, rows: np.ndarray, role: str, spec: Split | None,
+                players: np.ndarray, levels: np.ndarray,
+                percentiles: Sequence[float]) -> dict[str, np.ndarray]:
+    speed = table["launch_speed"][rows]
+    bip = np.isfinite(speed)
+    rows, speed = rows[bip], speed[bip]
+    n_levels = len(spec.labels) if spec else 1
+    # Map each batted ball onto its row of the result table.
+    result_key = players.astype(np.int64) * n_levels + levels
+    ball_key = table[role][rows].astype(np.int64) * n_levels
+    if spec is not None:
+        ball_key += spec.levels(table, rows, role)
+    group = np.searchsorted(result_key, ball_key)
+    sizes, pct = group_percentiles(group, speed, len(players), percentiles)
+    out = {"bbe": sizes}
+    for j, q in enumerate(percentiles):
+        out[f"ev_p{q:g}"] = pct[:, j]
+    return out
+
+
+def _from_counts(players: np.ndarray, levels: np.ndarray, counts: np.ndarray
+                 ) -> dict[str, np.ndarray]:
+    columns: dict[str, np.ndarray] = {"player": players, "level": levels}
+    columns.update({name: counts[:, i] for i, name in enumerate(COUNTING_STATS)})
+    columns.update(rate_stats(columns))
+    return columns
+
+
+def stat_lines(source: EventTable | Store, *, role: str = "batter", split: str | None = None,
+               players: Iterable[int] | None = None,
+               seasons: Iterable[int] | int | None = None,
+               ev_percentiles: Sequence[float] = DEFAULT_EV_PERCENTILES) -> StatTable:
+    """Full stat lines per player (and split level) for every PA in ``source``.
+
+    ``source`` is an :class:`EventTable`, or a :class:`Store` together with
+    the ``seasons`` to cover (all by default).  For a store, counting and
+    rate stats are served from the season rollups when every selected season
+    has a current one and no exit-velocity percentiles are requested; any
+    other query scans the raw pitches, and only the rows of ``players``
+    (found through the season indexes) when players are given.
+    ``StatTable.origin`` says which path answered.
+    """
+    with metrics.span("query", kind="lines", role=role, split=split) as span:
+        return _lines(span, source, role, split, players, seasons, ev_percentiles)
+
+
+def _lines(span: metrics.Span, source: EventTable | Store, role: str, split: str | None,
+           players: Iterable[int] | None, seasons: Iterable[int] | int | None,
+           ev_percentiles: Sequence[float]) -> StatTable:
+    """:func:`stat_lines`, reporting to ``span`` which path answered and how many rows it read."""
+    spec = _resolve(role, split)
+    labels = spec.labels if spec else ("",)
+    subset = None
+    if isinstance(source, Store):
+        if isinstance(seasons, int):
+            seasons = [seasons]
+        if not ev_percentiles:
+            from . import rollup
+
+            cube = rollup.lines(source, seasons, role=role, split=split)
+            if cube is not None:
+                if players is not None:
+                    keep = np.isin(cube.players, np.fromiter(players, dtype=np.int64))
+                    cube = rollup.Cube(*(array[keep] for array in cube))
+                span.rows = len(cube.players)
+                span.labels["origin"] = "rollup"
+                return StatTable(_from_counts(*cube), role=role, split=split,
+                                 labels=labels, origin="rollup")
+        if players is not None:
+            from . import index
+
+            players = list(players)
+            subset = index.select(source, role, players, seasons)
+        source = subset if subset is not None else source.table(seasons)
+    elif seasons is not None:
+        raise QueryError("seasons can only be selected when querying a Store")
+
+    rows = pa_rows(source, players, role)
+    span.rows = len(source)
+    span.labels["origin"] = "scan" if subset is None else "index"
+    uniques, levels, counts = count_stats(source, role=role, split=split, rows=rows)
+    columns = _from_counts(uniques, levels, counts)
+    if ev_percentiles:
+        columns.update(_ev_columns(source, rows, role, spec, uniques, levels, ev_percentiles))
+    return StatTable(columns, role=role, split=split, labels=labels)
+
+
+def player_card(source: EventTable | Store, player: int, *, role: str = "batter",
+                split: str | None = None, seasons: Iterable[int] | int | None = None,
+                ev_percentiles: Sequence[float] = DEFAULT_EV_PERCENTILES) -> StatTable:
+    """One player's line, one row per split level (a single row without a split)."""
+    with metrics.span("query", kind="card", role=role, split=split) as span:
+        return _lines(span, source, role, split, [player], seasons, ev_percentiles)
+
+
+def _level_code(split: str | None, level: str | int | None) -> int | None:
+    if level is None or split is None:
+        return None
+    if isinstance(level, (int, np.integer)):
+        return int(level)
+    try:
+        return SPLITS[split].labels.index(level)
+    except ValueError:
+        raise QueryError(f"unknown {split} level {level!r}") from None
+
+
+def leaderboard(source: EventTable | Store, stat: str = "woba", *, role: str = "batter",
+                split: str | None = None, level: str | int | None = None,
+                min_pa: int = 0, limit: int | None = None,
+                ascending: bool | None = None,
+                seasons: Iterable[int] | int | None = None,
+                ev_percentiles: Sequence[float] | None = None) -> StatTable:
+    """Players ranked by ``stat``, optionally within one split level.
+
+    ``ascending`` defaults to "best first": descending for batters, and for
+    pitchers ascending on everything except strikeout stats.  Exit-velocity
+    percentiles are only computed when ranking by one (``"ev_p90"``) unless
+    ``ev_percentiles`` asks for them, which lets store queries use rollups.
+    """
+    if ev_percentiles is None:
+        ev_percentiles = parse_ev_percentiles([stat])
+    with metrics.span("query", kind="leaderboard", role=role, split=split) as span:
+        lines = _lines(span, source, role, split, None, seasons, ev_percentiles)
+    if stat not in lines.columns:
+        raise QueryError(f"unknown stat {stat!r}")
+    mask = lines["pa"] >= min_pa
+    code = _level_code(split, level)
+    if code is not None:
+        mask &= lines["level"] == code
+    if ascending is None:
+        ascending = role == "pitcher" and stat not in ("so", "k_pct")
+    ranked = lines.where(mask).sort(stat, ascending=ascending)
+    return ranked.head(limit) if limit is not None else ranked
@@ -0,0 +1,251 @@
+"""Rolling windows and streaks over per-player game logs.
+
+Both start from a game log: one row per (player, game) holding what the
+player did in that game, grouped by player and in date order within a
+player.  A window over a player's last N games is then the difference of two
+rows of the log's running totals, and a streak's length is the distance back
+to the last game that broke it (a running maximum).  Every window, or every
+streak, of every player in the log costs a few whole-array passes whatever
+the window size, instead of re-summing N games per row.
+
+::
+
+    log = rolling.game_log(store.table(2024))
+    last_30 = rolling.rolling(log, 30)          # wOBA etc. over each 30-game window
+    velo = rolling.rolling(rolling.pitch_log(table, starts_only=True), 5)
+    rolling.hitting_streaks(log, min_length=10)
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from . import query, schema
+from .store import EventTable
+
+
+class GameLog(NamedTuple):
+    """Per-(player, game) sums; player ``players[i]`` owns rows ``offsets[i]:offsets[i + 1]``."""
+
+    role: str
+    players: np.ndarray
+    offsets: np.ndarray
+    game_pk: np.ndarray
+    game_date: np.ndarray
+    stats: tuple[str, ...]
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.game_pk)
+
+    def player_of_row(self) -> np.ndarray:
+        """Index into ``players`` of every row."""
+        return np.repeat(np.arange(len(self.players)), np.diff(self.offsets))
+
+    def column(self, stat: str) -> np.ndarray:
+        return self.values[:, self.stats.index(stat)]
+
+
+def _group(table: EventTable, rows: np.ndarray, role: str,
+           extra: np.ndarray | None = None, extra_size: int = 1):
+    """Group ``rows`` by (player, game[, extra]) in player, date, game order.
+
+    Returns ``(players, offsets, group_rows, inverse)``: the distinct
+    players, each player's span of groups, one representative row per group
+    and the group of every input row.
+    """
+    uniques, player_code = query.factorize(table[role][rows])
+    # Games in date order: the date in the high bits, game_pk (< 2**31) below.
+    game_key = (table["game_date"][rows].astype(np.int64) << 31) | table["game_pk"][rows]
+    _, game_code = np.unique(game_key, return_inverse=True)
+    n_games = int(game_code.max()) + 1 if len(rows) else 1
+    key = (player_code.astype(np.int64) * n_games + game_code) * extra_size
+    if extra is not None:
+        key += extra
+    keys, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    group_player = keys // (n_games * extra_size)
+    offsets = np.searchsorted(group_player, np.arange(len(uniques) + 1))
+    return uniques, offsets, rows[first], inverse.ravel()
+
+
+def game_log(table: EventTable, *, role: str = "batter") -> GameLog:
+    """Counting stats (:data:`~statshot.query.COUNTING_STATS`) of every player in every game."""
+    query._resolve(role, None)
+    rows = query.pa_rows(table)
+    players, offsets, first, group = _group(table, rows, role)
+    n_events = len(schema.EVENTS)
+    hist = np.bincount(group * n_events + table["event"][rows],
+                       minlength=len(first) * n_events).reshape(-1, n_events)
+    return GameLog(role, players, offsets, table["game_pk"][first], table["game_date"][first],
+                   query.COUNTING_STATS, hist @ query.EVENT_STATS)
+
+
+def _starts(table: EventTable) -> np.ndarray:
+    """Per pitch: whether its pitcher started the game for their team.
+
+    The starter is whoever threw the first pitch of the team's half of the
+    game (its lowest at-bat and pitch number), so a reliever who came in
+    during the 1st inning does not count.
+    """
+    if not len(table):
+        return np.zeros(0, dtype=bool)
+    # One key per (game, half); pitches sorted by it, then in the order thrown.
+    half = table["game_pk"].astype(np.int64) << 1 | table["inning_topbot"]
+    order = np.lexsort((table["pitch_number"], table["at_bat_number"], half))
+    halves, first = np.unique(half[order], return_index=True)
+    starter = table["pitcher"][order[first]]
+    return starter[np.searchsorted(halves, half)] == table["pitcher"]
+
+
+def pitch_log(table: EventTable, column: str = "release_speed", *, role: str = "pitcher",
+              pitch_types: Sequence[str] | None = ("FF",),
+              starts_only: bool = False) -> GameLog:
+    """Per-game pitch count and total of ``column`` (NaNs skipped) for every player.
+
+    By default: each pitcher's four-seam fastball velocity, game by game.
+    ``pitch_types=None`` keeps every pitch; ``starts_only`` keeps only games
+    a pitcher started, so windows count starts rather than appearances.
+    """
+    query._resolve(role, None)
+    values = table[column]
+    mask = np.isfinite(values)
+    if pitch_types is not None:
+        mask &= np.isin(table["pitch_type"], schema.codes_for("pitch_type", pitch_types))
+    if starts_only:
+        mask &= _starts(table)
+    rows = np.flatnonzero(mask)
+    players, offsets, first, group = _group(table, rows, role)
+    counts = np.bincount(group, minlength=len(first))
+    totals = np.bincount(group, weights=values[rows].astype(np.float64), minlength=len(first))
+    return GameLog(role, players, offsets, table["game_pk"][first], table["game_date"][first],
+                   ("pitches", column), np.column_stack([counts, totals]))
+
+
+def window_sums(values: np.ndarray, offsets: np.ndarray, window: int
+                ) -> tuple[np.ndarray, np.ndarray]:
+    """Sum of every row and the up to ``window - 1`` rows before it in its segment.
+
+    Segments are ``offsets[i]:offsets[i + 1]``.  Returns ``(sums, sizes)``,
+    ``sizes`` being how many rows each window actually covers.
+    """
+    if window < 1:
+        raise ValueError(f"window must be at least 1, got {window}")
+    n = len(values)
+    prefix = np.zeros((n + 1,) + values.shape[1:], dtype=np.result_type(values, np.int64))
+    np.cumsum(values, axis=0, out=prefix[1:])
+    stop = np.arange(1, n + 1)
+    segment_start = np.repeat(offsets[:-1], np.diff(offsets))
+    start = np.maximum(segment_start, stop - window)
+    return prefix[stop] - prefix[start], stop - start
+
+
+def rolling(log: GameLog, window: int) -> query.StatTable:
+    """Every player's stats over the ``window`` games ending at each game.
+
+    One row per game in the log, with ``game_pk``, ``game_date``, ``games``
+    (fewer than ``window`` early in a player's log) and, for a
+    :func:`game_log`, the counting and rate stats of the window; for a
+    :func:`pitch_log`, ``pitches`` and the window's mean of the column.
+    """
+    sums, sizes = window_sums(log.values, log.offsets, window)
+    columns = {
+        "player": log.players[log.player_of_row()],
+        "level": np.zeros(len(log), dtype=np.int16),
+        "game_pk": log.game_pk,
+        "game_date": log.game_date,
+        "games": sizes,
+    }
+    if log.stats == query.COUNTING_STATS:
+        columns.update({name: sums[:, i] for i, name in enumerate(log.stats)})
+        columns.update(query.rate_stats(columns))
+    else:
+        pitches, column = log.stats
+        columns[pitches] = sums[:, 0].astype(np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns[column] = sums[:, 1] / sums[:, 0]
+    return query.StatTable(columns, role=log.role)
+
+
+def runs(flags: np.ndarray, offsets: np.ndarray, neutral: np.ndarray | None = None):
+    """Maximal runs of consecutive true ``flags`` within each segment.
+
+    Rows marked ``neutral`` neither extend nor break a run.  Returns
+    ``(start_rows, end_rows, lengths)``, one entry per run, in row order.
+    """
+    keep = np.arange(len(flags)) if neutral is None else np.flatnonzero(~neutral)
+    flag = flags[keep]
+    segment = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))[keep]
+    n = len(flag)
+    i = np.arange(n)
+    first = np.ones(n, dtype=bool)
+    first[1:] = segment[1:] != segment[:-1]
+    # Position of the last row that broke the run (a segment start counts
+    # as a break just before it); a run's length is the distance back to it.
+    breaks = np.where(~flag, i, np.where(first, i - 1, -1))
+    current = i - np.maximum.accumulate(breaks) if n else i
+    last = np.ones(n, dtype=bool)
+    last[:-1] = ~flag[1:] | first[1:]
+    end = flag & last
+    lengths = current[end]
+    return keep[i[end] - lengths + 1], keep[end], lengths
+
+
+def _streak_table(log: GameLog, start: np.ndarray, end: np.ndarray, lengths: np.ndarray,
+                  min_length: int, unit: str, active_after: np.ndarray) -> query.StatTable:
+    keep = lengths >= min_length
+    start, end, lengths = start[keep], end[keep], lengths[keep]
+    player = log.player_of_row()[end]
+    columns = {
+        "player": log.players[player],
+        "level": np.zeros(len(end), dtype=np.int16),
+        unit: lengths,
+        "first_date": log.game_date[start],
+        "last_date": log.game_date[end],
+        "first_game": log.game_pk[start],
+        "last_game": log.game_pk[end],
+        # Still going: nothing after it in the player's log can have broken it.
+        "active": end >= active_after[player],
+    }
+    return query.StatTable(columns, role=log.role).sort(unit)
+
+
+def hitting_streaks(log: GameLog, *, min_length: int = 1) -> query.StatTable:
+    """Runs of consecutive games with a hit, longest first.
+
+    As in the official rule, a game without an at-bat (only walks, HBP or
+    sacrifices) neither extends nor ends a streak.
+    """
+    hits, at_bats = log.column("h"), log.column("ab")
+    neutral = at_bats == 0
+    start, end, lengths = runs(hits > 0, log.offsets, neutral)
+    # Index of each player's last game that counts.
+    counted = np.flatnonzero(~neutral)
+    owner = log.player_of_row()[counted]
+    last = np.full(len(log.players), len(log), dtype=np.int64)
+    last[owner] = counted
+    return _streak_table(log, start, end, lengths, min_length, "games", last)
+
+
+def inning_log(table: EventTable) -> GameLog:
+    """Runs scored while each pitcher was on the mound, per (pitcher, game, inning)."""
+    rows = np.arange(len(table))
+    innings = table["inning"].astype(np.int64)
+    size = int(innings.max()) + 1 if len(table) else 1
+    players, offsets, first, group = _group(table, rows, "pitcher", innings, size)
+    scored = (table["post_bat_score"].astype(np.int64) - table["bat_score"]).astype(np.float64)
+    allowed = np.bincount(group, weights=scored, minlength=len(first)).astype(np.int64)
+    return GameLog("pitcher", players, offsets, table["game_pk"][first],
+                   table["game_date"][first], ("runs",), allowed[:, None])
+
+
+def scoreless_streaks(log: GameLog, *, min_length: int = 1) -> query.StatTable:
+    """Runs of consecutive innings a pitcher worked without a run scoring, longest first.
+
+    ``log`` is an :func:`inning_log`.  Any inning they appeared in counts as
+    one, however many outs they recorded.
+    """
+    start, end, lengths = runs(log.column("runs") == 0, log.offsets)
+    return _streak_table(log, start, end, lengths, min_length, "innings",
+                         log.offsets[1:] - 1)
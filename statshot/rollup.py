@@ -0,0 +1,174 @@
+"""Pre-aggregated counting-stat cubes, maintained incrementally at ingest.
+
+For every season partition and every (role, split) combination the rollup
+holds the :data:`~statshot.query.COUNTING_STATS` vector of each
+(player, split level) that has at least one plate appearance.  Counting stats
+are additive, so new games are folded in by computing a cube over just the
+appended rows and summing it into the stored one; rate stats are derived from
+the sums at query time exactly as a raw scan derives them.
+
+A partition's cubes live in ``rollups.npz`` next to its columns, together
+with the row count they cover.  A rollup whose row count does not match the
+partition is stale: :func:`load` ignores it (queries fall back to scanning
+the raw pitches) and :func:`update` catches it up from where it left off.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from . import query
+from .store import EventTable, Partition, Store
+
+ROLLUP_FILE = "rollups.npz"
+
+#: Every (role, split) combination that is rolled up; ``None`` is "no split".
+CUBES: tuple[tuple[str, str | None], ...] = tuple(
+    (role, split) for role in query.ROLES for split in (None, *query.SPLITS))
+
+_COUNT_DTYPE = np.int32
+
+
+class Cube(NamedTuple):
+    """Counting stats per (player, level), sorted by player then level."""
+
+    players: np.ndarray
+    levels: np.ndarray
+    counts: np.ndarray
+
+
+def _n_levels(split: str | None) -> int:
+    return len(query.SPLITS[split].labels) if split else 1
+
+
+def _key(role: str, split: str | None) -> str:
+    return f"{role}.{split or 'all'}"
+
+
+def compute(table: EventTable) -> dict[tuple[str, str | None], Cube]:
+    """Build every cube from scratch over ``table``."""
+    rows = query.pa_rows(table)
+    cubes = {}
+    for role, split in CUBES:
+        players, levels, counts = query.count_stats(table, role=role, split=split, rows=rows)
+        cubes[role, split] = Cube(players, levels, counts.astype(_COUNT_DTYPE))
+    return cubes
+
+
+def merge(cubes: Iterable[Cube], n_levels: int) -> Cube:
+    """Sum cubes group by group."""
+    cubes = [c for c in cubes if len(c.players)]
+    if not cubes:
+        return Cube(np.empty(0, np.int32), np.empty(0, np.int16),
+                    np.empty((0, len(query.COUNTING_STATS)), _COUNT_DTYPE))
+    if len(cubes) == 1:
+        return cubes[0]
+    keys = np.concatenate([c.players.astype(np.int64) * n_levels + c.levels for c in cubes])
+    uniques, inverse = np.unique(keys, return_inverse=True)
+    counts = np.zeros((len(uniques), cubes[0].counts.shape[1]), dtype=_COUNT_DTYPE)
+    np.add.at(counts, inverse, np.concatenate([c.counts for c in cubes]))
+    return Cube((uniques // n_levels).astype(cubes[0].players.dtype),
+                (uniques % n_levels).astype(np.int16), counts)
+
+
+_loaded: dict[str, tuple[int, dict[tuple[str, str | None], Cube]]] = {}
+
+
+def load(partition: Partition) -> dict[tuple[str, str | None], Cube] | None:
+    """The partition's cubes, or ``None`` if it has none or they are stale."""
+    cubes = _read(partition)
+    if cubes is None or cubes[0] != partition.rows:
+        return None
+    return cubes[1]
+
+
+def _read(partition: Partition):
+    path = partition.path / ROLLUP_FILE
+    cache_key = str(path)
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(cache_key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with np.load(path) as npz:
+        rows = int(npz["rows"])
+        cubes = {(role, split): Cube(*(npz[f"{_key(role, split)}.{field}"]
+                                       for field in Cube._fields))
+                 for role, split in CUBES}
+    _loaded[cache_key] = (stamp, (rows, cubes))
+    return rows, cubes
+
+
+def _write(partition: Partition, rows: int, cubes: dict) -> None:
+    arrays = {"rows": np.array(rows)}
+    for (role, split), cube in cubes.items():
+        for field, array in zip(Cube._fields, cube):
+            arrays[f"{_key(role, split)}.{field}"] = array
+    path = partition.path / ROLLUP_FILE
+    tmp = path.with_name("rollups.tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    _loaded[str(path)] = (os.stat(path).st_mtime_ns, (rows, cubes))
+
+
+def update(partition: Partition) -> int:
+    """Fold rows appended since the last update into the partition's cubes.
+
+    Returns the number of rows that were rolled up (0 if already current).
+    """
+    existing = _read(partition)
+    covered = existing[0] if existing is not None else 0
+    if covered > partition.rows:
+        # The partition was rebuilt underneath the rollup; start over.
+        existing, covered = None, 0
+    if covered == partition.rows and existing is not None:
+        return 0
+    fresh = compute(partition.table().slice(covered, partition.rows))
+    if existing is not None:
+        fresh = {cube: merge([existing[1][cube], fresh[cube]], _n_levels(cube[1]))
+                 for cube in CUBES}
+    _write(partition, partition.rows, fresh)
+    return partition.rows - covered
+
+
+def extend(partition: Partition, rows_before: int,
+           cubes: Iterable[dict[tuple[str, str | None], Cube] | None]) -> None:
+    """Fold cubes computed elsewhere over the rows a writer placed after ``rows_before``.
+
+    Used when rows arrive with their cubes already built (a backfill rolls
+    up each shard in its own worker).  Falls back to :func:`update` when the
+    partition's rollup does not end exactly at ``rows_before`` or a cube is
+    missing.
+    """
+    cubes = list(cubes)
+    existing = _read(partition)
+    covered = existing[0] if existing is not None else 0
+    if covered != rows_before or any(c is None for c in cubes):
+        update(partition)
+        return
+    if existing is not None:
+        cubes.insert(0, existing[1])
+    _write(partition, partition.rows,
+           {cube: merge([c[cube] for c in cubes], _n_levels(cube[1])) for cube in CUBES})
+
+
+def lines(store: Store, seasons: Iterable[int] | None = None, *, role: str = "batter",
+          split: str | None = None) -> Cube | None:
+    """Counting stats summed over ``seasons`` from rollups alone.
+
+    Returns ``None`` when any of the seasons lacks a current rollup, in
+    which case the caller has to scan the raw pitches.
+    """
+    parts = [p for p in store.partitions(seasons) if p.rows]
+    cubes = []
+    for part in parts:
+        loaded = load(part)
+        if loaded is None:
+            return None
+        cubes.append(loaded[role, split])
+    return merge(cubes, _n_levels(split))
@@ -0,0 +1,141 @@
+"""Column layout of the pitch-event store.
+
+Every row of the store is one pitch.  Plate-appearance results live on the
+pitch that ended the plate appearance (``event != 0``), so the same arrays
+serve both pitch-level and PA-level questions.
+
+Categorical values (teams, park, handedness, pitch type, pitch outcome, PA
+event) are stored as one-byte codes into the vocabularies defined here, and
+counters use the narrowest integer type that holds them.  Code ``0`` is
+reserved for "unknown / not applicable" in every vocabulary.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Column(NamedTuple):
+    name: str
+    dtype: np.dtype
+    doc: str
+
+
+def _col(name: str, dtype: str, doc: str) -> Column:
+    return Column(name, np.dtype(dtype), doc)
+
+
+COLUMNS: tuple[Column, ...] = (
+    _col("game_pk", "<i4", "unique game id"),
+    _col("game_date", "<i4", "game date as YYYYMMDD"),
+    _col("home_team", "<i1", "code into TEAMS: the home team"),
+    _col("away_team", "<i1", "code into TEAMS: the visiting team"),
+    _col("park", "<i1", "code into PARKS: where the game was played"),
+    _col("at_bat_number", "<i2", "plate appearance index within the game, from 1"),
+    _col("pitch_number", "<i1", "pitch index within the plate appearance, from 1"),
+    _col("inning", "<i1", "inning number"),
+    _col("inning_topbot", "<i1", "0 for the top half, 1 for the bottom half"),
+    _col("outs_when_up", "<i1", "outs in the half-inning before this pitch"),
+    _col("on_base", "<i1", "runners on before this pitch: 1 = first, 2 = second, 4 = third"),
+    _col("bat_score", "<i1", "batting team's runs before this pitch"),
+    _col("post_bat_score", "<i1", "batting team's runs after this pitch"),
+    _col("batter", "<i4", "batter player id"),
+    _col("pitcher", "<i4", "pitcher player id"),
+    _col("stand", "<i1", "code into HANDS: side of the plate the batter hit from"),
+    _col("p_throws", "<i1", "code into HANDS: the pitcher's throwing hand"),
+    _col("balls", "<i1", "balls in the count before this pitch"),
+    _col("strikes", "<i1", "strikes in the count before this pitch"),
+    _col("pitch_type", "<i1", "code into PITCH_TYPES"),
+    _col("release_speed", "<f4", "pitch velocity out of the hand, mph"),
+    _col("release_spin_rate", "<f4", "spin out of the hand, rpm"),
+    _col("release_pos_x", "<f4", "release point, ft from the middle of the rubber, catcher's view"),
+    _col("release_pos_z", "<f4", "release point, ft above the ground"),
+    _col("pfx_x", "<f4", "horizontal movement vs. a spinless pitch, ft, catcher's view"),
+    _col("pfx_z", "<f4", "vertical movement vs. a spinless pitch, ft (gravity removed)"),
+    _col("plate_x", "<f4", "horizontal location at the plate, ft from its middle, catcher's view"),
+    _col("plate_z", "<f4", "height at the plate, ft above the ground"),
+    _col("launch_speed", "<f4", "exit velocity, mph; NaN unless the ball was put in play"),
+    _col("launch_angle", "<f4", "launch angle, degrees; NaN unless the ball was put in play"),
+    _col("hc_x", "<f4", "batted-ball landing spot, Statcast hit-coordinate x; NaN if not in play"),
+    _col("hc_y", "<f4", "batted-ball landing spot, Statcast hit-coordinate y; NaN if not in play"),
+    _col("outcome", "<i1", "code into OUTCOMES: what happened on this pitch"),
+    _col("event", "<i1", "code into EVENTS: PA result on the final pitch, 0 otherwise"),
+)
+
+COLUMN_NAMES: tuple[str, ...] = tuple(c.name for c in COLUMNS)
+DTYPES: dict[str, np.dtype] = {c.name: c.dtype for c in COLUMNS}
+
+HANDS: tuple[str, ...] = ("", "L", "R")
+
+TEAMS: tuple[str, ...] = (
+    "", "AZ", "ATL", "BAL", "BOS", "CHC", "CWS", "CIN", "CLE", "COL", "DET", "HOU", "KC",
+    "LAA", "LAD", "MIA", "MIL", "MIN", "NYM", "NYY", "OAK", "PHI", "PIT", "SD", "SF", "SEA",
+    "STL", "TB", "TEX", "TOR", "WSH",
+)
+
+PARKS: tuple[str, ...] = (
+    "", "Chase Field", "Truist Park", "Oriole Park at Camden Yards", "Fenway Park",
+    "Wrigley Field", "Guaranteed Rate Field", "Great American Ball Park", "Progressive Field",
+    "Coors Field", "Comerica Park", "Minute Maid Park", "Kauffman Stadium", "Angel Stadium",
+    "Dodger Stadium", "loanDepot park", "American Family Field", "Target Field", "Citi Field",
+    "Yankee Stadium", "Oakland Coliseum", "Citizens Bank Park", "PNC Park", "Petco Park",
+    "Oracle Park", "T-Mobile Park", "Busch Stadium", "Tropicana Field", "Globe Life Field",
+    "Rogers Centre", "Nationals Park",
+)
+
+#: Team code -> code of its home park, for feeds that do not name the park
+#: (``PARKS`` lists the home parks in ``TEAMS`` order).
+HOME_PARKS: np.ndarray = np.arange(len(TEAMS), dtype=np.int8)
+
+#: Where home plate is in Statcast hit coordinates (``hc_x``, ``hc_y``), and
+#: about how many feet one coordinate unit spans.  ``hc_y`` grows toward home.
+HIT_HOME: tuple[float, float] = (125.42, 198.27)
+HIT_FEET_PER_UNIT = 2.5
+
+PITCH_TYPES: tuple[str, ...] = (
+    "", "FF", "SI", "FC", "SL", "ST", "CU", "KC", "SV", "CH", "FS", "FO", "SC", "KN", "EP",
+)
+
+OUTCOMES: tuple[str, ...] = (
+    "", "ball", "called_strike", "swinging_strike", "foul", "foul_tip", "hit_into_play",
+    "hit_by_pitch", "blocked_ball", "foul_bunt", "missed_bunt", "pitchout",
+)
+
+EVENTS: tuple[str, ...] = (
+    "", "single", "double", "triple", "home_run", "walk", "intent_walk", "hit_by_pitch",
+    "strikeout", "strikeout_double_play", "field_out", "force_out", "grounded_into_double_play",
+    "double_play", "triple_play", "fielders_choice", "fielders_choice_out", "field_error",
+    "sac_fly", "sac_fly_double_play", "sac_bunt", "sac_bunt_double_play", "catcher_interf",
+)
+
+VOCABULARIES: dict[str, tuple[str, ...]] = {
+    "home_team": TEAMS,
+    "away_team": TEAMS,
+    "park": PARKS,
+    "stand": HANDS,
+    "p_throws": HANDS,
+    "pitch_type": PITCH_TYPES,
+    "outcome": OUTCOMES,
+    "event": EVENTS,
+}
+
+
+def code_of(column: str, value: str | None) -> int:
+    """Return the code of ``value`` in ``column``'s vocabulary (0 if unknown)."""
+    if not value:
+        return 0
+    return _CODES[column].get(value, 0)
+
+
+def codes_for(column: str, values) -> np.ndarray:
+    """Vectorized :func:`code_of` for an iterable of strings."""
+    lookup = _CODES[column]
+    return np.fromiter((lookup.get(v, 0) if v else 0 for v in values),
+                       dtype=DTYPES[column])
+
+
+_CODES: dict[str, dict[str, int]] = {
+    name: {label: i for i, label in enumerate(vocab)} for name, vocab in VOCABULARIES.items()
+}
@@ -0,0 +1,428 @@
+"""Columnar, memory-mapped pitch-event store.
+
+On disk a store is a directory with one partition per season::
+
+    <root>/
+        store.json             {"generation": G, "codecs": {name: codec}}
+        season=2024/
+            meta.json          {"format": 1, "rows": N, "columns": {name: dtype}}
+            game_pk.bin        raw little-endian array, N items
+            game_date.bin
+            ...
+
+Each column is a flat binary file that is opened with :class:`numpy.memmap`,
+so opening a season costs a handful of ``open``/``mmap`` calls regardless of
+its size, and pages are only read from disk when a query touches them.
+
+``meta.json`` is the commit point: the row count recorded there is the only
+thing readers trust, so a crash halfway through an append leaves trailing
+bytes that are ignored and truncated by the next writer.
+
+``store.json`` carries the ingest *generation*, a counter bumped once per
+completed ingest so that derived data and caches can tell when the events
+underneath them have changed.
+
+Columns can optionally be compressed (``Store(root, create=True,
+codecs={"launch_speed": "zlib"})``, or ``codecs="zlib"`` for every column).
+A compressed column file is a sequence of blocks, one per append, each
+holding its rows byte-shuffled (all first bytes, then all second bytes, ...)
+and compressed; ``meta.json`` lists the rows and length of every committed
+block.  Compressed columns are decoded into memory on first access instead
+of being mapped, trading load time for disk space and I/O.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Mapping, Sequence
+
+import numpy as np
+
+from . import schema
+
+FORMAT_VERSION = 1
+
+_PARTITION_RE = re.compile(r"^season=(\d{4})$")
+
+
+class StoreError(Exception):
+    """Raised for malformed or inconsistent store directories."""
+
+
+#: Codec name -> (compress, decompress) over bytes.
+CODECS: dict[str, tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (lambda data: zlib.compress(data, 1), zlib.decompress),
+}
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install statshot[zstd]
+    pass
+else:
+    CODECS["zstd"] = (zstandard.ZstdCompressor(level=3).compress,
+                      zstandard.ZstdDecompressor().decompress)
+
+
+def _codec(name: str) -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise StoreError(f"unknown or unavailable codec {name!r}") from None
+
+
+def encode_block(codec: str, values: np.ndarray) -> bytes:
+    """Byte-shuffle and compress one block of a column."""
+    values = np.ascontiguousarray(values)
+    shuffled = values.view(np.uint8).reshape(-1, values.dtype.itemsize).T
+    return _codec(codec)[0](np.ascontiguousarray(shuffled).tobytes())
+
+
+def decode_block(codec: str, payload: bytes, dtype: np.dtype, rows: int) -> np.ndarray:
+    """Inverse of :func:`encode_block`."""
+    raw = np.frombuffer(_codec(codec)[1](payload), dtype=np.uint8)
+    return np.ascontiguousarray(raw.reshape(dtype.itemsize, rows).T).view(dtype).ravel()
+
+
+def _write_json(path: Path, payload: dict) -> None:
+    """Atomically replace ``path`` with ``payload`` serialized as JSON."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(payload, fh, indent=1, sort_keys=True)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> dict:
+    with open(path) as fh:
+        return json.load(fh)
+
+
+class EventTable:
+    """Equal-length column arrays, materialized on first access.
+
+    ``len(table)`` is the number of rows.  Columns are fetched through
+    ``loader`` the first time they are indexed and then kept, so a query that
+    only reads three columns never maps the rest.
+    """
+
+    __slots__ = ("_n_rows", "_names", "_loader", "_cache")
+
+    def __init__(self, n_rows: int, names: Sequence[str],
+                 loader: Callable[[str], np.ndarray]):
+        self._n_rows = int(n_rows)
+        self._names = tuple(names)
+        self._loader = loader
+        self._cache: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "EventTable":
+        lengths = {len(a) for a in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"columns have different lengths: {sorted(lengths)}")
+        return cls(lengths.pop() if lengths else 0, list(arrays), arrays.__getitem__)
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        return self._names
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        if name not in self._names:
+            raise KeyError(name)
+        array = self._cache[name] = self._loader(name)
+        return array
+
+    def __repr__(self) -> str:
+        return f"EventTable(rows={self._n_rows}, columns={len(self._names)})"
+
+    def slice(self, start: int, stop: int) -> "EventTable":
+        """Rows ``start:stop`` as views into this table's arrays."""
+        start, stop, _ = slice(start, stop).indices(self._n_rows)
+        return EventTable(max(stop - start, 0), self._names,
+                          lambda name: self[name][start:stop])
+
+    def take(self, rows: np.ndarray) -> "EventTable":
+        """Rows selected by an index array or boolean mask."""
+        rows = np.asarray(rows)
+        n = int(rows.sum()) if rows.dtype == np.bool_ else len(rows)
+        return EventTable(n, self._names, lambda name: self[name][rows])
+
+    def to_dict(self) -> dict[str, np.ndarray]:
+        return {name: self[name] for name in self._names}
+
+
+class Partition:
+    """One season of events stored as memory-mapped column files."""
+
+    def __init__(self, path: str | os.PathLike, *, codecs: Mapping[str, str] | None = None):
+        self.path = Path(path)
+        match = _PARTITION_RE.match(self.path.name)
+        if match is None:
+            raise StoreError(f"not a partition directory: {self.path}")
+        self.season = int(match.group(1))
+        self._maps: dict[str, np.ndarray] = {}
+        self._meta = self._load_meta(codecs or {})
+
+    def _load_meta(self, codecs: Mapping[str, str]) -> dict:
+        """Committed metadata; ``codecs`` only apply to a partition not yet written."""
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            meta = {"format": FORMAT_VERSION, "rows": 0,
+                    "columns": {c.name: c.dtype.str for c in schema.COLUMNS}}
+            if codecs:
+                for name, codec in codecs.items():
+                    _codec(codec)
+                    if name not in meta["columns"]:
+                        raise StoreError(f"cannot compress unknown column {name!r}")
+                meta["codecs"] = dict(codecs)
+                meta["blocks"] = {name: [] for name in codecs}
+            return meta
+        meta = _read_json(meta_path)
+        if meta.get("format") != FORMAT_VERSION:
+            raise StoreError(f"{meta_path}: unsupported format {meta.get('format')!r}")
+        return meta
+
+    @property
+    def rows(self) -> int:
+        return self._meta["rows"]
+
+    @property
+    def meta(self) -> dict:
+        """A copy of the committed ``meta.json`` contents."""
+        return dict(self._meta)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __repr__(self) -> str:
+        return f"Partition(season={self.season}, rows={self.rows})"
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memory map of one column."""
+        try:
+            return self._maps[name]
+        except KeyError:
+            pass
+        try:
+            dtype = np.dtype(self._meta["columns"][name])
+        except KeyError:
+            raise KeyError(name) from None
+        n = self.rows
+        codec = self.codec(name)
+        if n == 0:
+            array = np.empty(0, dtype=dtype)
+        elif codec is None:
+            array = np.memmap(self.column_path(name), dtype=dtype, mode="r", shape=(n,))
+        else:
+            blocks = self._meta["blocks"][name]
+            with open(self.column_path(name), "rb") as fh:
+                array = np.concatenate([decode_block(codec, fh.read(nbytes), dtype, rows)
+                                        for rows, nbytes in blocks])
+            array.flags.writeable = False
+        self._maps[name] = array
+        return array
+
+    def codec(self, name: str) -> str | None:
+        """How column ``name`` is compressed, ``None`` for a raw column."""
+        return self._meta.get("codecs", {}).get(name)
+
+    def table(self) -> EventTable:
+        return EventTable(self.rows, list(self._meta["columns"]), self.column)
+
+    def game_pks(self) -> np.ndarray:
+        """Sorted unique game ids present in this partition."""
+        return np.unique(self.column("game_pk"))
+
+    def append(self, columns: Mapping[str, np.ndarray]) -> int:
+        """Append rows to every column and commit them; returns rows added."""
+        names = list(self._meta["columns"])
+        missing = set(names) - set(columns)
+        if missing:
+            raise StoreError(f"append is missing columns: {sorted(missing)}")
+        lengths = {len(columns[name]) for name in names}
+        if len(lengths) != 1:
+            raise StoreError(f"append columns have different lengths: {sorted(lengths)}")
+        added = lengths.pop()
+        if added == 0:
+            return 0
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        old_rows = self.rows
+        blocks = {}
+        for name in names:
+            dtype = np.dtype(self._meta["columns"][name])
+            data = np.ascontiguousarray(columns[name], dtype=dtype)
+            codec = self.codec(name)
+            if codec is not None:
+                blocks[name] = self.write_blocks(name, [(added, encode_block(codec, data))])
+                continue
+            with open(self.column_path(name), "ab") as fh:
+                # Drop bytes left behind by an append that never committed.
+                fh.truncate(old_rows * dtype.itemsize)
+                fh.write(data.tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+
+        self.commit(old_rows + added, blocks=blocks)
+        return added
+
+    def write_blocks(self, name: str, blocks: Sequence[tuple[int, bytes]]) -> list:
+        """Write encoded ``(rows, payload)`` blocks after a compressed column's committed ones.
+
+        Returns the column's new block list; pass it to :meth:`commit` as
+        ``blocks={name: ...}`` to make the blocks visible.
+        """
+        committed = list(self._meta["blocks"][name])
+        with open(self.column_path(name), "ab") as fh:
+            fh.truncate(sum(nbytes for _, nbytes in committed))
+            for rows, payload in blocks:
+                fh.write(payload)
+                committed.append([rows, len(payload)])
+            fh.flush()
+            os.fsync(fh.fileno())
+        return committed
+
+    def column_path(self, name: str) -> Path:
+        return self.path / f"{name}.bin"
+
+    def preallocate(self, added: int) -> int:
+        """Size every column file for ``added`` more rows; returns the first new row.
+
+        For writers that fill rows in place (e.g. several at once, at
+        different offsets).  The new rows read as zeros until written and
+        are not visible to readers until :meth:`commit`.  Compressed columns
+        are left alone; they grow block by block through :meth:`write_blocks`.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        old_rows = self.rows
+        for name, dtype in self._meta["columns"].items():
+            if self.codec(name) is not None:
+                continue  # appended block by block, see write_blocks
+            itemsize = np.dtype(dtype).itemsize
+            with open(self.column_path(name), "ab") as fh:
+                fh.truncate(old_rows * itemsize)
+                fh.truncate((old_rows + added) * itemsize)
+        return old_rows
+
+    def commit(self, rows: int, *, blocks: Mapping[str, list] | None = None, **meta) -> None:
+        """Make the first ``rows`` rows visible, recording any extra ``meta``.
+
+        ``blocks`` gives the new block lists of compressed columns written
+        with :meth:`write_blocks`.
+        """
+        if blocks:
+            meta["blocks"] = dict(self._meta["blocks"], **blocks)
+        self._meta = dict(self._meta, **meta, rows=rows)
+        _write_json(self.path / "meta.json", self._meta)
+        self._maps.clear()
+
+
+class Store:
+    """A directory of season partitions."""
+
+    def __init__(self, root: str | os.PathLike, *, create: bool = False,
+                 codecs: Mapping[str, str] | str | None = None):
+        self.root = Path(root)
+        if create:
+            self.root.mkdir(parents=True, exist_ok=True)
+        elif not self.root.is_dir():
+            raise StoreError(f"no store at {self.root}")
+        if codecs is not None:
+            if not create:
+                raise StoreError("codecs can only be chosen when creating a store")
+            if isinstance(codecs, str):
+                codecs = {name: codecs for name in schema.COLUMN_NAMES}
+            for codec in codecs.values():
+                _codec(codec)
+            _write_json(self.root / "store.json", dict(self._settings(), codecs=dict(codecs)))
+        self._partitions: dict[int, Partition] = {}
+        self._seen_generation = self.generation
+
+    def _settings(self) -> dict:
+        path = self.root / "store.json"
+        return _read_json(path) if path.exists() else {}
+
+    @property
+    def codecs(self) -> dict[str, str]:
+        """Column -> codec for seasons created from now on."""
+        return self._settings().get("codecs", {})
+
+    def __repr__(self) -> str:
+        return f"Store({str(self.root)!r})"
+
+    @property
+    def generation(self) -> int:
+        """Number of completed ingests; 0 for a store that was never written."""
+        return int(self._settings().get("generation", 0))
+
+    def bump_generation(self) -> int:
+        settings = self._settings()
+        generation = settings.get("generation", 0) + 1
+        _write_json(self.root / "store.json", dict(settings, generation=generation))
+        self._seen_generation = generation
+        return generation
+
+    def refresh(self) -> int:
+        """Pick up ingests made by other processes; returns the current generation.
+
+        Partition metadata is cached per :class:`Store` object, so a reader
+        that outlives a writer's ingest calls this to see the new rows.
+        """
+        generation = self.generation
+        if generation != self._seen_generation:
+            self._partitions.clear()
+            self._seen_generation = generation
+        return generation
+
+    def seasons(self) -> list[int]:
+        found = []
+        for entry in os.scandir(self.root):
+            match = _PARTITION_RE.match(entry.name)
+            if match and entry.is_dir():
+                found.append(int(match.group(1)))
+        return sorted(found)
+
+    def partition(self, season: int) -> Partition:
+        """The partition for ``season``, created empty if it does not exist."""
+        part = self._partitions.get(season)
+        if part is None:
+            part = self._partitions[season] = Partition(self.root / f"season={season}",
+                                                        codecs=self.codecs)
+        return part
+
+    def partitions(self, seasons: Iterable[int] | None = None) -> Iterator[Partition]:
+        for season in self.seasons() if seasons is None else seasons:
+            yield self.partition(season)
+
+    def table(self, seasons: Iterable[int] | int | None = None) -> EventTable:
+        """Events for the given seasons (all seasons by default).
+
+        A single season is served straight from its memory maps; several
+        seasons are concatenated column by column as columns are accessed.
+        """
+        if isinstance(seasons, int):
+            seasons = [seasons]
+        parts = [p for p in self.partitions(seasons) if p.rows]
+        if len(parts) == 1:
+            return parts[0].table()
+        names = schema.COLUMN_NAMES
+        return EventTable(sum(p.rows for p in parts), names,
+                          lambda name: np.concatenate([p.column(name) for p in parts])
+                          if parts else np.empty(0, dtype=schema.DTYPES[name]))
+
+    def append(self, season: int, columns: Mapping[str, np.ndarray]) -> int:
+        return self.partition(season).append(columns)
@@ -0,0 +1,486 @@
+"""Seeded synthetic seasons for benchmarks and local development.
+
+The generator plays out every game plate appearance by plate appearance
+(outs, base runners and score are tracked so innings and games end the way
+real ones do) and then expands plate appearances into pitches with NumPy.
+A default season is 2,430 games and roughly 750k pitches, the size of a real
+MLB regular season.  The same ``(season, seed)`` always yields the same data.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+import numpy as np
+
+from . import schema
+
+N_TEAMS = 30
+GAMES_PER_SEASON = 2430
+LINEUP_SIZE = 9
+HITTERS_PER_TEAM = 13
+STARTERS_PER_TEAM = 5
+PITCHERS_PER_TEAM = 13
+
+# PA result probabilities, roughly a modern league-average line.
+_EVENT_PROBS = {
+    "single": 0.140, "double": 0.045, "triple": 0.004, "home_run": 0.030,
+    "walk": 0.083, "hit_by_pitch": 0.011, "strikeout": 0.225, "field_out": 0.401,
+    "force_out": 0.020, "grounded_into_double_play": 0.020, "sac_fly": 0.006,
+    "field_error": 0.010, "fielders_choice": 0.005,
+}
+_EVENT_NAMES = tuple(_EVENT_PROBS)
+_EVENT_CDF = np.cumsum(list(_EVENT_PROBS.values()))
+_EVENT_CDF /= _EVENT_CDF[-1]
+
+# Exit velocity / launch angle (mean, sd) by batted-ball result.
+_BATTED_BALL = {
+    "single": ((89.0, 10.0), (8.0, 15.0)),
+    "double": ((97.0, 7.0), (17.0, 12.0)),
+    "triple": ((95.0, 6.0), (16.0, 10.0)),
+    "home_run": ((104.0, 4.0), (28.0, 5.0)),
+}
+_BATTED_BALL_OUT = ((86.0, 13.0), (22.0, 28.0))
+
+# Pitch-type velocity offsets from the pitcher's four-seam fastball.
+_PITCH_SPEED_OFFSET = {
+    "FF": 0.0, "SI": -0.8, "FC": -5.0, "SL": -9.0, "ST": -12.0,
+    "CU": -15.0, "KC": -12.5, "CH": -8.5, "FS": -7.5,
+}
+_SECONDARY = ("SI", "FC", "SL", "ST", "CU", "KC", "CH", "FS")
+
+# Pitch-type shape for a right-hander: spin (rpm) and movement (pfx_x, pfx_z
+# in ft, catcher's view); a left-hander's mirrors it horizontally.
+_PITCH_SHAPE = {
+    "FF": (2300.0, -0.6, 1.30), "SI": (2150.0, -1.3, 0.70), "FC": (2350.0, 0.2, 0.70),
+    "SL": (2400.0, 0.4, 0.20), "ST": (2500.0, 1.2, 0.00), "CU": (2550.0, 0.6, -0.80),
+    "KC": (2400.0, 0.5, -0.60), "CH": (1750.0, -1.2, 0.50), "FS": (1300.0, -0.8, 0.30),
+}
+
+# The rulebook strike zone, roughly: ft from the middle of the plate, ft up.
+_ZONE_HALF_WIDTH = 0.83
+_ZONE_BOTTOM, _ZONE_TOP = 1.5, 3.5
+
+
+def batter_id(team: int, slot: int) -> int:
+    return 400000 + team * 100 + slot
+
+
+def pitcher_id(team: int, slot: int) -> int:
+    return 600000 + team * 100 + slot
+
+
+def handedness(player_ids: np.ndarray, left_share: float) -> np.ndarray:
+    """Stable L/R codes per player id, with about ``left_share`` lefties."""
+    spread = (np.asarray(player_ids).astype(np.uint64) * np.uint64(2654435761)) % np.uint64(1000)
+    return np.where(spread < left_share * 1000, schema.code_of("stand", "L"),
+                    schema.code_of("stand", "R")).astype(schema.DTYPES["stand"])
+
+
+def _count_before(flag: np.ndarray, first: np.ndarray, pa: np.ndarray) -> np.ndarray:
+    """How many earlier pitches of the same PA have ``flag`` set."""
+    seen = np.cumsum(flag) - flag
+    return seen - seen[first][pa]
+
+
+def season_dates(season: int, n_days: int) -> np.ndarray:
+    """``n_days`` game dates as YYYYMMDD, spread from late March to late September."""
+    start = np.datetime64(f"{season}-03-28")
+    span = np.datetime64(f"{season}-09-29") - start
+    offsets = (np.arange(n_days) * span.astype(int)) // max(n_days - 1, 1)
+    days = start + offsets.astype("timedelta64[D]")
+    ymd = days.astype(str)
+    return np.array([int(d.replace("-", "")) for d in ymd], dtype=np.int32)
+
+
+def _advance(event: str, bases: int, outs: int) -> tuple[int, int, int]:
+    """Apply a PA result to the base/out state; returns (bases, outs, runs).
+
+    ``bases`` is a bitmask: 1 = runner on first, 2 = second, 4 = third.
+    """
+    on1, on2, on3 = bases & 1, (bases >> 1) & 1, (bases >> 2) & 1
+    if event == "single" or event == "field_error":
+        return 1 | (on1 << 1), outs, on2 + on3
+    if event == "double":
+        return 2 | (on1 << 2), outs, on2 + on3
+    if event == "triple":
+        return 4, outs, on1 + on2 + on3
+    if event == "home_run":
+        return 0, outs, on1 + on2 + on3 + 1
+    if event in ("walk", "hit_by_pitch"):
+        forced = on1 & on2
+        return 1 | ((on1 | on2) << 1) | ((on3 | forced) << 2), outs, forced & on3
+    if event == "sac_fly":
+        return bases & 3, outs + 1, 1
+    if event == "grounded_into_double_play":
+        return bases & 6, outs + 2, 0
+    if event in ("force_out", "fielders_choice"):
+        return 1 | (on2 << 1) | (on3 << 2), outs + 1, 0
+    # strikeout, field_out
+    return bases, outs + 1, 0
+
+
+def _resolve_event(draw: float, bases: int, outs: int) -> str:
+    event = _EVENT_NAMES[int(np.searchsorted(_EVENT_CDF, draw, side="right"))]
+    if event in ("grounded_into_double_play", "force_out", "fielders_choice") and \
+            (not bases & 1 or outs == 2):
+        return "field_out"
+    if event == "sac_fly" and (not bases & 4 or outs == 2):
+        return "field_out"
+    return event
+
+
+class _Plate:
+    """Per-plate-appearance columns collected while games are simulated."""
+
+    def __init__(self):
+        self.game_pk: list[int] = []
+        self.game_date: list[int] = []
+        self.home_team: list[int] = []
+        self.away_team: list[int] = []
+        self.at_bat_number: list[int] = []
+        self.inning: list[int] = []
+        self.inning_topbot: list[int] = []
+        self.outs_when_up: list[int] = []
+        self.on_base: list[int] = []
+        self.bat_score: list[int] = []
+        self.runs: list[int] = []
+        self.batter: list[int] = []
+        self.pitcher: list[int] = []
+        self.event: list[str] = []
+
+
+def _uniforms(rng: np.random.Generator, chunk: int) -> Iterator[float]:
+    """Uniform draws from ``rng``, ``chunk`` at a time, for as long as they are wanted."""
+    while True:
+        yield from rng.random(chunk)
+
+
+def _simulate_games(season: int, n_games: int, rng: np.random.Generator) -> _Plate:
+    games_per_day = N_TEAMS // 2
+    dates = season_dates(season, -(-n_games // games_per_day))
+    team_games = np.zeros(N_TEAMS, dtype=np.int64)
+    plate = _Plate()
+    draws = _uniforms(rng, n_games * 100)
+
+    matchups = np.concatenate([rng.permutation(N_TEAMS)
+                               for _ in range(-(-n_games // games_per_day))])
+    for g in range(n_games):
+        away, home = int(matchups[2 * g]), int(matchups[2 * g + 1])
+        game_pk = season * 10000 + g + 1
+        game_date = int(dates[g // games_per_day])
+        lineups, staffs, next_up, score = [], [], [0, 0], [0, 0]
+        for team in (away, home):
+            n = int(team_games[team])
+            bench = HITTERS_PER_TEAM - LINEUP_SIZE
+            lineups.append([batter_id(team, LINEUP_SIZE + (n + i) % bench
+                                      if (n + i) % 10 == 0 else i)
+                            for i in range(LINEUP_SIZE)])
+            staffs.append((pitcher_id(team, n % STARTERS_PER_TEAM), team))
+            team_games[team] += 1
+
+        at_bat = 0
+        inning = 0
+        while True:
+            inning += 1
+            for half in (0, 1):
+                if half == 1 and inning >= 9 and score[1] > score[0]:
+                    break
+                starter, fielding_team = staffs[1 - half]
+                pitcher = starter if inning <= 6 else pitcher_id(
+                    fielding_team, STARTERS_PER_TEAM + int(next(draws) * (
+                        PITCHERS_PER_TEAM - STARTERS_PER_TEAM)))
+                bases = outs = 0
+                while outs < 3:
+                    at_bat += 1
+                    event = _resolve_event(next(draws), bases, outs)
+                    plate.game_pk.append(game_pk)
+                    plate.game_date.append(game_date)
+                    plate.home_team.append(home + 1)
+                    plate.away_team.append(away + 1)
+                    plate.at_bat_number.append(at_bat)
+                    plate.inning.append(inning)
+                    plate.inning_topbot.append(half)
+                    plate.outs_when_up.append(outs)
+                    plate.on_base.append(bases)
+                    plate.batter.append(lineups[half][next_up[half]])
+                    plate.pitcher.append(pitcher)
+                    plate.event.append(event)
+                    plate.bat_score.append(score[half])
+                    next_up[half] = (next_up[half] + 1) % LINEUP_SIZE
+                    bases, outs, runs = _advance(event, bases, outs)
+                    plate.runs.append(runs)
+                    score[half] += runs
+                    if half == 1 and inning >= 9 and score[1] > score[0]:
+                        break  # walk-off
+            if inning >= 9 and score[0] != score[1]:
+                break
+    return plate
+
+
+def _pitch_arsenals(pitchers: np.ndarray, rng: np.random.Generator):
+    """Per-pitcher fastball velocity and cumulative pitch-mix table."""
+    n = len(pitchers)
+    n_types = 4
+    types = np.empty((n, n_types), dtype=schema.DTYPES["pitch_type"])
+    types[:, 0] = schema.code_of("pitch_type", "FF")
+    secondary = np.array([schema.code_of("pitch_type", t) for t in _SECONDARY])
+    for i in range(n):
+        types[i, 1:] = rng.choice(secondary, size=n_types - 1, replace=False)
+    mix = rng.dirichlet([4.0, 2.5, 1.5, 1.0], size=n)
+    return types, np.cumsum(mix, axis=1), rng.normal(94.0, 2.0, size=n)
+
+
+def _plate_locations(is_ball: np.ndarray, p_throws: np.ndarray, rng: np.random.Generator):
+    """Pitch locations: strikes around the zone, balls pushed just outside it."""
+    n = len(is_ball)
+    arm_side = np.where(p_throws == schema.code_of("p_throws", "L"), -0.15, 0.15)
+    x = np.where(is_ball, rng.normal(0.0, 0.9, n), rng.normal(0.0, 0.45, n)) + arm_side
+    z = np.where(is_ball, rng.normal(2.4, 0.9, n), rng.normal(2.5, 0.45, n))
+    inside = (is_ball & (np.abs(x) < _ZONE_HALF_WIDTH)
+              & (z > _ZONE_BOTTOM) & (z < _ZONE_TOP))
+    x[inside] += np.where(x[inside] < 0, -_ZONE_HALF_WIDTH, _ZONE_HALF_WIDTH)
+    return x.astype(np.float32), np.clip(z, 0.0, None).astype(np.float32)
+
+
+def _pitch_shapes(pitch_type: np.ndarray, pidx: np.ndarray, p_throws: np.ndarray,
+                  rng: np.random.Generator):
+    """Spin, release point and movement: the pitch type's shape plus each pitcher's own."""
+    n, n_pitchers = len(pitch_type), int(pidx.max()) + 1 if len(pidx) else 0
+    shape = np.zeros((len(schema.PITCH_TYPES), 3), dtype=np.float64)
+    for name, values in _PITCH_SHAPE.items():
+        shape[schema.code_of("pitch_type", name)] = values
+    spin_factor = rng.normal(1.0, 0.07, n_pitchers)
+    movement = rng.normal(0.0, 0.15, (n_pitchers, 2))
+    release = np.column_stack([rng.normal(1.9, 0.35, n_pitchers),
+                               rng.normal(5.8, 0.35, n_pitchers)])
+    side = np.where(p_throws == schema.code_of("p_throws", "L"), -1.0, 1.0)
+    spin = shape[pitch_type, 0] * spin_factor[pidx] + rng.normal(0.0, 60.0, n)
+    pfx_x = (shape[pitch_type, 1] + movement[pidx, 0] + rng.normal(0.0, 0.12, n)) * side
+    pfx_z = shape[pitch_type, 2] + movement[pidx, 1] + rng.normal(0.0, 0.12, n)
+    release_x = -release[pidx, 0] * side + rng.normal(0.0, 0.08, n)
+    release_z = release[pidx, 1] + rng.normal(0.0, 0.08, n)
+    return {name: values.astype(np.float32) for name, values in (
+        ("release_spin_rate", spin), ("release_pos_x", release_x),
+        ("release_pos_z", release_z), ("pfx_x", pfx_x), ("pfx_z", pfx_z))}
+
+
+def _hit_coordinates(events: np.ndarray, stand: np.ndarray, launch_speed: np.ndarray,
+                     launch_angle: np.ndarray, rng: np.random.Generator):
+    """Landing spots of balls in play, pulled toward the batter's side."""
+    n = len(events)
+    pull = np.where(stand == schema.code_of("stand", "L"), 12.0, -12.0)
+    spray = np.radians(np.clip(rng.normal(pull, 20.0, n), -44.0, 44.0))
+    angle = np.clip(launch_angle, 0.0, 90.0)
+    carry = np.sin(np.radians(2 * np.minimum(angle, 45.0))) * np.clip((90.0 - angle) / 45.0, 0, 1)
+    feet = launch_speed * (1.0 + 3.4 * carry) + rng.normal(0.0, 10.0, n)
+    feet = np.where(events == "home_run", np.maximum(feet, 340.0), np.maximum(feet, 20.0))
+    units = feet / schema.HIT_FEET_PER_UNIT
+    home_x, home_y = schema.HIT_HOME
+    return ((home_x + units * np.sin(spray)).astype(np.float32),
+            (home_y - units * np.cos(spray)).astype(np.float32))
+
+
+def generate_season(season: int, *, seed: int = 0,
+                    n_games: int = GAMES_PER_SEASON) -> dict[str, np.ndarray]:
+    """Return one synthetic season as column arrays matching :mod:`statshot.schema`."""
+    rng = np.random.default_rng([seed, season])
+    plate = _simulate_games(season, n_games, rng)
+    n_pa = len(plate.event)
+    event_codes = schema.codes_for("event", plate.event)
+    events = np.array(plate.event)
+
+    # Final count before the last pitch of each PA, then how many extra
+    # two-strike fouls were spoiled off before it.
+    is_walk = (events == "walk")
+    is_k = (events == "strikeout")
+    balls = np.where(is_walk, 3, rng.integers(0, 4, n_pa))
+    strikes = np.where(is_k, 2, rng.integers(0, 3, n_pa))
+    fouls = np.where(strikes == 2, rng.geometric(0.6, n_pa) - 1, 0)
+    n_pitches = balls + strikes + fouls + 1
+
+    pa = np.repeat(np.arange(n_pa), n_pitches)
+    first = np.cumsum(n_pitches) - n_pitches
+    pos = np.arange(len(pa)) - first[pa]
+    b, s = balls[pa], strikes[pa]
+    # Phase 0 pitches (the balls and strikes that build the count) are shuffled
+    # within the PA; phase 1 are two-strike fouls; phase 2 the final pitch.
+    phase = np.where(pos < b + s, 0, np.where(pos < b + s + fouls[pa], 1, 2))
+    order = np.lexsort((rng.random(len(pa)), phase, pa))
+    is_ball = (phase == 0) & (pos < b)
+    is_ball = is_ball[order]
+    phase = phase[order]
+    pa_end = phase == 2
+    count_balls = _count_before(is_ball, first, pa)
+    count_strikes = np.minimum(_count_before(~is_ball & ~pa_end, first, pa), 2)
+
+    outcome = np.empty(len(pa), dtype=schema.DTYPES["outcome"])
+    strike_kind = rng.choice(
+        [schema.code_of("outcome", o) for o in ("called_strike", "swinging_strike", "foul")],
+        p=[0.45, 0.25, 0.30], size=len(pa))
+    outcome[:] = strike_kind
+    outcome[is_ball] = schema.code_of("outcome", "ball")
+    outcome[phase == 1] = schema.code_of("outcome", "foul")
+    final_outcome = np.full(n_pa, schema.code_of("outcome", "hit_into_play"),
+                            dtype=outcome.dtype)
+    final_outcome[is_walk] = schema.code_of("outcome", "ball")
+    final_outcome[events == "hit_by_pitch"] = schema.code_of("outcome", "hit_by_pitch")
+    final_outcome[is_k] = np.where(rng.random(int(is_k.sum())) < 0.7,
+                                   schema.code_of("outcome", "swinging_strike"),
+                                   schema.code_of("outcome", "called_strike"))
+    outcome[pa_end] = final_outcome
+
+    pitchers = np.array(plate.pitcher, dtype=np.int32)
+    roster, pitcher_idx = np.unique(pitchers, return_inverse=True)
+    arsenal, mix_cdf, fastball = _pitch_arsenals(roster, rng)
+    pidx = pitcher_idx[pa]
+    choice = (rng.random(len(pa))[:, None] > mix_cdf[pidx]).sum(axis=1)
+    choice = np.minimum(choice, arsenal.shape[1] - 1)
+    pitch_type = arsenal[pidx, choice]
+    offsets = np.zeros(len(schema.PITCH_TYPES), dtype=np.float32)
+    for name, delta in _PITCH_SPEED_OFFSET.items():
+        offsets[schema.code_of("pitch_type", name)] = delta
+    release_speed = fastball[pidx] + offsets[pitch_type] + rng.normal(0.0, 0.9, len(pa))
+
+    launch_speed = np.full(n_pa, np.nan, dtype=np.float32)
+    launch_angle = np.full(n_pa, np.nan, dtype=np.float32)
+    in_play = final_outcome == schema.code_of("outcome", "hit_into_play")
+    for name, ((ev_mu, ev_sd), (la_mu, la_sd)) in _BATTED_BALL.items():
+        mask = events == name
+        launch_speed[mask] = rng.normal(ev_mu, ev_sd, int(mask.sum()))
+        launch_angle[mask] = rng.normal(la_mu, la_sd, int(mask.sum()))
+    mask = in_play & ~np.isin(events, list(_BATTED_BALL))
+    (ev_mu, ev_sd), (la_mu, la_sd) = _BATTED_BALL_OUT
+    launch_speed[mask] = rng.normal(ev_mu, ev_sd, int(mask.sum()))
+    launch_angle[mask] = rng.normal(la_mu, la_sd, int(mask.sum()))
+    np.clip(launch_speed, 20.0, 121.0, out=launch_speed)
+
+    pitch_launch_speed = np.full(len(pa), np.nan, dtype=np.float32)
+    pitch_launch_angle = np.full(len(pa), np.nan, dtype=np.float32)
+    pitch_launch_speed[pa_end] = launch_speed
+    pitch_launch_angle[pa_end] = launch_angle
+    pitch_event = np.zeros(len(pa), dtype=schema.DTYPES["event"])
+    pitch_event[pa_end] = event_codes
+    hc_x = np.full(len(pa), np.nan, dtype=np.float32)
+    hc_y = np.full(len(pa), np.nan, dtype=np.float32)
+
+    per_pa = {
+        "game_pk": plate.game_pk, "game_date": plate.game_date,
+        "home_team": plate.home_team, "away_team": plate.away_team,
+        "at_bat_number": plate.at_bat_number, "inning": plate.inning,
+        "inning_topbot": plate.inning_topbot, "outs_when_up": plate.outs_when_up,
+        "on_base": plate.on_base, "bat_score": plate.bat_score,
+        "batter": plate.batter,
+        "pitcher": plate.pitcher,
+    }
+    columns = {name: np.asarray(values, dtype=schema.DTYPES[name])[pa]
+               for name, values in per_pa.items()}
+    stand = handedness(columns["batter"], 0.4)
+    p_throws = handedness(columns["pitcher"], 0.28)
+    plate_x, plate_z = _plate_locations(outcome == schema.code_of("outcome", "ball"),
+                                        p_throws, rng)
+    ends = np.flatnonzero(pa_end)[in_play]
+    hc_x[ends], hc_y[ends] = _hit_coordinates(events[in_play], stand[ends],
+                                              launch_speed[in_play], launch_angle[in_play], rng)
+    columns.update(_pitch_shapes(pitch_type, pidx, p_throws, rng))
+    columns.update(
+        park=schema.HOME_PARKS[columns["home_team"]],
+        post_bat_score=(columns["bat_score"] + np.where(pa_end, np.asarray(plate.runs)[pa], 0)
+                        ).astype(schema.DTYPES["post_bat_score"]),
+        pitch_number=(pos + 1).astype(schema.DTYPES["pitch_number"]),
+        stand=stand,
+        p_throws=p_throws,
+        balls=count_balls.astype(schema.DTYPES["balls"]),
+        strikes=count_strikes.astype(schema.DTYPES["strikes"]),
+        pitch_type=pitch_type,
+        release_speed=release_speed.astype(np.float32),
+        plate_x=plate_x,
+        plate_z=plate_z,
+        launch_speed=pitch_launch_speed,
+        launch_angle=pitch_launch_angle,
+        hc_x=hc_x,
+        hc_y=hc_y,
+        outcome=outcome,
+        event=pitch_event,
+    )
+    return {name: columns[name] for name in schema.COLUMN_NAMES}
+
+
+def _feed_values(columns: dict[str, np.ndarray]) -> dict[str, list]:
+    """Column arrays -> per-field Python lists in feed representation."""
+    from .ingest import BASE_FIELDS, FEED_FIELDS
+
+    values: dict[str, list] = {}
+    # Runners have no ids here; an occupied base names the placeholder runner 1.
+    for bit, field in enumerate(BASE_FIELDS):
+        values[field] = [1 if on else None for on in ((columns["on_base"] >> bit) & 1).tolist()]
+    for name, field in FEED_FIELDS.items():
+        array = columns[name]
+        if name in schema.VOCABULARIES:
+            labels = np.array(schema.VOCABULARIES[name], dtype=object)
+            values[field] = [label or None for label in labels[array]]
+        elif name == "inning_topbot":
+            values[field] = np.array(["Top", "Bot"], dtype=object)[array].tolist()
+        elif name == "game_date":
+            values[field] = [f"{d // 10000:04d}-{d // 100 % 100:02d}-{d % 100:02d}"
+                             for d in array.tolist()]
+        elif array.dtype.kind == "f":
+            rounded = np.round(array.astype(np.float64), 2)
+            values[field] = [None if v != v else v for v in rounded.tolist()]
+        else:
+            values[field] = array.tolist()
+    return values
+
+
+def write_feeds(columns: dict[str, np.ndarray], directory, *, fmt: str = "json") -> list:
+    """Write ``columns`` as feed files that :mod:`statshot.ingest` reads.
+
+    ``fmt="json"`` writes one file per game, ``fmt="csv"`` one file per game
+    date.  File names start with the game date so sorted order is
+    chronological.  Returns the paths written.
+    """
+    import csv
+    import json
+    from pathlib import Path
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    values = _feed_values(columns)
+    fields = list(values)
+    rows = list(zip(*values.values()))
+    key = columns["game_pk"] if fmt == "json" else columns["game_date"]
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(key)) + 1, [len(key)]])
+    paths = []
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        date = int(columns["game_date"][lo])
+        if fmt == "json":
+            game_fields = ("game_pk", "game_date")
+            doc = {"game_pk": int(columns["game_pk"][lo]),
+                   "game_date": values["game_date"][lo],
+                   "pitches": [{f: v for f, v in zip(fields, row) if f not in game_fields}
+                               for row in rows[lo:hi]]}
+            path = directory / f"{date}-{doc['game_pk']}.json"
+            with open(path, "w") as fh:
+                json.dump(doc, fh, separators=(",", ":"))
+        elif fmt == "csv":
+            path = directory / f"{date}.csv"
+            with open(path, "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(fields)
+                writer.writerows(rows[lo:hi])
+        else:
+            raise ValueError(f"unknown feed format {fmt!r}")
+        paths.append(path)
+    return paths
+
+
+def build_store(root, seasons, *, seed: int = 0, n_games: int = GAMES_PER_SEASON):
+    """Write synthetic ``seasons`` into a new store at ``root`` and return it."""
+    from .ingest import append_columns
+    from .store import Store
+
+    store = Store(root, create=True)
+    for season in seasons:
+        append_columns(store, season, generate_season(season, seed=seed, n_games=n_games))
+    store.bump_generation()
+    return store
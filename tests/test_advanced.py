@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from statshot import advanced, query, schema, synth
+from statshot.ingest import append_columns
+from statshot.store import EventTable, Store
+
+SEASON = 2023
+N_GAMES = 45
+
+
+@pytest.fixture(scope="module")
+def season_columns():
+    return synth.generate_season(SEASON, seed=7, n_games=N_GAMES)
+
+
+@pytest.fixture
+def store(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    append_columns(store, SEASON, season_columns)
+    return store
+
+
+def _events(rows):
+    """An event table from ``(game, inning, topbot, outs, on_base, score, runs, event)`` rows."""
+    columns = {name: [] for name in ("game_pk", "inning", "inning_topbot", "outs_when_up",
+                                     "on_base", "bat_score", "post_bat_score", "event")}
+    for game, inning, topbot, outs, on_base, score, runs, event in rows:
+        for name, value in zip(columns, (game, inning, topbot, outs, on_base, score,
+                                         score + runs, schema.code_of("event", event))):
+            columns[name].append(value)
+    n = len(rows)
+    arrays = {name: np.array(values, dtype=schema.DTYPES[name])
+              for name, values in columns.items()}
+    arrays.update(park=np.ones(n, np.int8), home_team=np.ones(n, np.int8),
+                  away_team=np.full(n, 2, np.int8),
+                  batter=np.arange(n, dtype=np.int32) % 3 + 100,
+                  pitcher=np.full(n, 7, np.int32))
+    return EventTable.from_arrays(arrays)
+
+
+def test_run_expectancy_and_re24_by_hand():
+    table = _events([
+        # top 1st: 2 runs on a homer after a single, then three outs
+        (1, 1, 0, 0, 0, 0, 0, ""),          # a ball: not a plate appearance
+        (1, 1, 0, 0, 0, 0, 0, "single"),
+        (1, 1, 0, 0, 1, 0, 2, "home_run"),
+        (1, 1, 0, 0, 0, 2, 0, "strikeout"),
+        (1, 1, 0, 1, 0, 2, 0, "field_out"),
+        (1, 1, 0, 2, 0, 2, 0, "strikeout"),
+        # bottom 1st: three up, three down
+        (1, 1, 1, 0, 0, 0, 0, "strikeout"),
+        (1, 1, 1, 1, 0, 0, 0, "strikeout"),
+        (1, 1, 1, 2, 0, 0, 0, "strikeout"),
+    ])
+    season = advanced.compute(table)
+
+    # Runs to the end of the half from bases empty, 0 out: 2, 0 and 0.
+    want = np.zeros(advanced.N_STATES)
+    want[0] = 2 / 3
+    want[1] = 2.0
+    np.testing.assert_allclose(season.run_expectancy, want)
+
+    re24 = [0, 4 / 3, 2 / 3, -2 / 3, 0, 0, -2 / 3, 0, 0]
+    np.testing.assert_allclose(season.columns["re24"], re24, atol=1e-6)
+    np.testing.assert_array_equal(season.columns["woba_denom"], [0, 1, 1, 1, 1, 1, 1, 1, 1])
+
+
+def test_park_factors_by_hand():
+    # (game, park, home, away, runs): park 1 sees 8 runs a game, its team's
+    # games elsewhere 4; park 2 the other way round.
+    games = [(1, 1, 1, 2, 8), (2, 2, 2, 1, 4), (3, 2, 2, 3, 4)]
+    table = _events([(game, 1, 0, 0, 0, 0, runs, "home_run")
+                     for game, _, _, _, runs in games])
+    park, home, away = (np.array(col, np.int8) for col in list(zip(*games))[1:4])
+    table = EventTable.from_arrays({**table.to_dict(), "park": park, "home_team": home,
+                                    "away_team": away})
+    factors = advanced.compute(table).park_factors
+    assert factors[1] == pytest.approx(2.0)
+    assert factors[2] == pytest.approx(0.5)
+    assert factors[3] == 1.0
+
+
+def test_woba_weights_scale_to_league_obp(store):
+    season = advanced.load(store.partition(SEASON))
+    table = store.table(SEASON)
+    counts = query.count_stats(table)[2].sum(axis=0)
+    league = dict(zip(query.COUNTING_STATS, counts[:, None]))
+    obp = query.rate_stats(league)["obp"][0]
+
+    assert season.league_woba == pytest.approx(obp)
+    woba = season.columns["woba_value"].sum(dtype=np.float64) / season.columns["woba_denom"].sum()
+    assert woba == pytest.approx(obp, rel=1e-5)
+    assert query.rate_stats(league, season.weights())["woba"][0] == pytest.approx(obp)
+
+    weights = season.weights()
+    assert 0 < weights["bb"] < weights["singles"] < weights["doubles"] < weights["hr"]
+
+
+@pytest.mark.parametrize("role", query.ROLES)
+def test_player_lines_match_scan(store, role):
+    table = store.table(SEASON)
+    season = advanced.load(store.partition(SEASON))
+    lines = advanced.player_lines(store, role=role)
+    players, _, counts = query.count_stats(table, role=role)
+    np.testing.assert_array_equal(lines["player"], players)
+    scanned = dict(zip(query.COUNTING_STATS, counts.T))
+    np.testing.assert_array_equal(lines["pa"], scanned["pa"])
+    np.testing.assert_allclose(lines["woba"], query.rate_stats(scanned, season.weights())["woba"],
+                               rtol=1e-5)
+    pa = table["event"] != 0
+    _, group = query.factorize(table[role][pa])
+    np.testing.assert_allclose(lines["re24"],
+                               np.bincount(group, season.columns["re24"][pa].astype(float)),
+                               atol=1e-3)
+
+
+def test_incremental_ingest_matches_batch(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    n = len(season_columns["game_pk"])
+    for lo, hi in [(0, n // 3), (n // 3, n)]:
+        append_columns(store, SEASON, {k: v[lo:hi] for k, v in season_columns.items()})
+    stored = advanced.load(store.partition(SEASON))
+    rebuilt = advanced.compute(store.table(SEASON))
+    np.testing.assert_allclose(stored.run_expectancy, rebuilt.run_expectancy)
+    for role in query.ROLES:
+        np.testing.assert_allclose(stored.sums[role], rebuilt.sums[role])
+
+
+def test_partition_without_plate_appearances(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    first_pa = int(np.argmax(season_columns["event"] != 0))
+    assert first_pa > 0
+    head = {k: v[:first_pa] for k, v in season_columns.items()}
+    assert append_columns(store, SEASON, head) == first_pa
+
+    season = advanced.load(store.partition(SEASON))
+    assert season is not None
+    assert len(season.columns["re24"]) == first_pa
+    assert len(advanced.player_lines(store)) == 0
+    assert advanced.constants(store, SEASON)["league_woba"] == 0.0
+
+    append_columns(store, SEASON, {k: v[first_pa:] for k, v in season_columns.items()})
+    assert len(advanced.player_lines(store)) > 0
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from statshot import api, query, synth
+from statshot.ingest import append_columns
+from statshot.store import Store
+
+SEASON = 2023
+
+
+@pytest.fixture(scope="module")
+def root(tmp_path_factory):
+    root = tmp_path_factory.mktemp("store")
+    store = Store(root, create=True)
+    append_columns(store, SEASON, synth.generate_season(SEASON, seed=7, n_games=20))
+    store.bump_generation()
+    return root
+
+
+def test_parse_request_routes():
+    key = api.parse_request("/player/600101?season=2024,2023&stats=obp,avg&split=count")
+    assert (key.kind, key.player, key.seasons, key.split) == ("player", 600101, (2023, 2024),
+                                                               "count")
+    assert key.stats == ("avg", "obp")
+    board = api.parse_request("/leaderboard?stat=obp&min_pa=10&role=pitcher")
+    assert (board.kind, board.role, board.stats) == ("leaderboard", "pitcher", ("obp",))
+    assert dict(board.options) == {"min_pa": 10, "limit": 50}
+    splits = api.parse_request("/splits?split=month&players=3,1,3")
+    assert dict(splits.options)["players"] == (1, 3)
+    assert api.parse_request("/health/").kind == "health"
+
+
+@pytest.mark.parametrize("target", [
+    "/player/abc", "/player/1?season=last", "/leaderboard?limit=ten",
+    "/leaderboard?min_pa=1.5", "/splits", "/splits?split=month&players=x",
+])
+def test_parse_request_bad_parameters(target):
+    with pytest.raises(api.BadRequest):
+        api.parse_request(target)
+
+
+@pytest.mark.parametrize("target", ["/", "/nope", "/player", "/player/1/2", "/health/x"])
+def test_parse_request_unknown_routes(target):
+    with pytest.raises(api.NotFound):
+        api.parse_request(target)
+
+
+def test_answer_statuses_and_cache(root):
+    async def run():
+        server = api.StatShotServer(root, port=0, workers=0)
+        await server.start()
+        try:
+            return [await server.answer(target) for target in (
+                "/health", "/leaderboard?stat=obp&min_pa=5&limit=3",
+                "/leaderboard?stat=obp&min_pa=5&limit=3", "/leaderboard?stat=ev_p150",
+                "/leaderboard?stat=nope", "/player/x", "/nope")]
+        finally:
+            await server.close()
+
+    health, miss, hit, *errors = asyncio.run(run())
+    assert health[0] == HTTPStatus.OK
+    assert json.loads(health[1]) == {"generation": 1, "seasons": [SEASON]}
+    assert (miss[0], miss[2]) == (HTTPStatus.OK, False)
+    assert (hit[0], hit[1], hit[2]) == (HTTPStatus.OK, miss[1], True)
+    rows = json.loads(miss[1])["rows"]
+    want = query.leaderboard(Store(root), "obp", min_pa=5, limit=3)
+    assert [row["player"] for row in rows] == want["player"].tolist()
+    assert [status for status, _, _ in errors] == [
+        HTTPStatus.BAD_REQUEST, HTTPStatus.BAD_REQUEST, HTTPStatus.BAD_REQUEST,
+        HTTPStatus.NOT_FOUND]
+    assert all("error" in json.loads(body) for _, body, _ in errors)
+
+
+def test_http_round_trip(root):
+    async def get(port, target):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return head.decode("latin-1").split("\r\n"), body
+
+    async def run():
+        server = api.StatShotServer(root, port=0, workers=0)
+        await server.start()
+        try:
+            return [await get(server.port, target) for target in (
+                "/splits?split=month&stats=pa", "/splits?split=month&stats=pa", "/nope")]
+        finally:
+            await server.close()
+
+    (miss, body), (hit, again), (missing, _) = asyncio.run(run())
+    assert miss[0] == "HTTP/1.1 200 OK" and "X-Cache: miss" in miss
+    assert hit[0] == "HTTP/1.1 200 OK" and "X-Cache: hit" in hit
+    assert body == again and json.loads(body)["split"] == "month"
+    assert missing[0] == "HTTP/1.1 404 Not Found"
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_answered_with_400(root, length):
+    async def run():
+        server = api.StatShotServer(root, port=0, workers=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(f"GET /health HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            await server.close()
+
+    head, _, body = asyncio.run(run()).partition(b"\r\n\r\n")
+    assert head.split(b"\r\n")[0] == b"HTTP/1.1 400 Bad Request"
+    assert b"Connection: close" in head and "error" in json.loads(body)
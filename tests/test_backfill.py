@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from statshot import backfill, comps, query, schema, synth
+from statshot.ingest import ingest
+from statshot.store import Store
+
+SEASONS = (2022, 2023)
+
+
+@pytest.fixture(scope="module")
+def feeds(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("feeds")
+    for i, season in enumerate(SEASONS):
+        synth.write_feeds(synth.generate_season(season, seed=10 + i, n_games=16), directory)
+    return directory
+
+
+@pytest.fixture(scope="module")
+def plain(tmp_path_factory, feeds):
+    store = Store(tmp_path_factory.mktemp("plain") / "store", create=True)
+    ingest(store, feeds)
+    return store
+
+
+def assert_same_store(store, want):
+    assert store.seasons() == want.seasons()
+    for season in want.seasons():
+        table, expected = store.table(season), want.table(season)
+        for name in schema.COLUMN_NAMES:
+            np.testing.assert_array_equal(table[name], expected[name], err_msg=name)
+    for role in ("batter", "pitcher"):
+        got = query.stat_lines(store, role=role, split="month", ev_percentiles=(50,))
+        expected = query.stat_lines(want, role=role, split="month", ev_percentiles=(50,))
+        for name in expected.columns:
+            np.testing.assert_array_equal(got[name], expected[name], err_msg=name)
+
+
+@pytest.mark.parametrize("by, codecs", [("season", None), ("month", "zlib")])
+def test_matches_plain_ingest(tmp_path, feeds, plain, by, codecs):
+    store = Store(tmp_path / "store", create=True, codecs=codecs)
+    report = backfill.backfill(store, feeds, by=by, workers=2)
+    assert report.shards == report.shards_staged == report.shards_merged
+    assert report.games_added == 2 * 16
+    assert report.pitches == sum(len(plain.table(s)) for s in SEASONS)
+    assert report.generation == store.generation == 1
+    assert not (store.root / backfill.BACKFILL_DIR).exists()
+    assert all(comps.load(part) is not None for part in store.partitions())
+    assert_same_store(store, plain)
+
+    # The feeds are in the ingest manifest now: neither path loads them again.
+    assert backfill.backfill(store, feeds, by=by).shards == 0
+    assert ingest(store, feeds).files_unchanged > 0
+    # Shards the seasons list as merged are not staged again, even on a rescan.
+    again = backfill.backfill(store, feeds, by=by, rescan=True)
+    assert again.shards == report.shards
+    assert (again.shards_staged, again.games_added) == (0, 0)
+    assert store.generation == 1
+    assert_same_store(store, plain)
+
+
+def test_resumes_after_interruption(tmp_path, feeds, plain):
+    store = Store(tmp_path / "store", create=True)
+    shards = backfill.plan(feeds, by="month")
+    assert len(shards) > 2
+    # A run that staged two shards and merged one of them before it died.
+    for shard in shards[:2]:
+        backfill.stage(store.root, shard)
+    backfill.merge(store, shards[:1])
+
+    report = backfill.backfill(store, feeds, by="month", workers=2)
+    assert report.shards_resumed == 2
+    assert report.shards_staged == len(shards) - 2
+    assert report.games_added == 2 * 16
+    assert_same_store(store, plain)
+
+
+def test_plan_rejects_unknown_shard_size(feeds):
+    with pytest.raises(ValueError):
+        backfill.plan(feeds, by="week")
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from statshot import query, synth
+from statshot.cache import CachedQueries, ResultCache, query_key, sizeof
+from statshot.ingest import append_columns
+from statshot.store import Store
+
+SEASON = 2023
+
+
+def _array(kib):
+    return np.zeros(kib * 1024, np.uint8)
+
+
+def test_query_key_normalizes():
+    a = query_key("player", player=np.int64(5), seasons=[2024, 2023, 2024],
+                  stats=["obp", "avg"], level=None)
+    b = query_key("player", player=5, seasons=(2023, 2024), stats=("avg", "obp"))
+    assert a == b and hash(a) == hash(b)
+    assert query_key("leaderboard", seasons=2023).seasons == (2023,)
+    assert query_key("leaderboard", limit=5) != query_key("leaderboard", limit=10)
+
+
+def test_lru_eviction_by_bytes():
+    cache = ResultCache(max_bytes=3 * sizeof(_array(10)))
+    for key in "abc":
+        cache.put(key, _array(10), 0)
+    assert cache.get("a", 0) is not None        # a is now the most recently used
+    cache.put("d", _array(10), 0)
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    stats = cache.stats()
+    assert stats.evictions == 1 and stats.bytes <= cache.max_bytes and stats.entries == 3
+
+    cache.put("huge", _array(100), 0)           # larger than the whole cache: not kept
+    assert "huge" not in cache and len(cache) == 3
+
+
+def test_generation_invalidates_everything():
+    cache = ResultCache()
+    cache.put("a", 1, 3)
+    assert cache.get("a", 3) == 1
+    assert cache.get("a", 4) is None            # a newer generation drops every entry
+    assert len(cache) == 0 and cache.stats().invalidations == 1
+    cache.put("b", 2, 3)                        # computed before the ingest: stale
+    assert "b" not in cache
+    cache.put("b", 2, 4)
+    assert cache.get("b", 3) is None            # an older reader does not see it
+
+
+def test_ttl_expiry():
+    now = [0.0]
+    cache = ResultCache(ttl=10, clock=lambda: now[0])
+    cache.put("a", 1, 0)
+    now[0] = 9.9
+    assert cache.get("a", 0) == 1
+    now[0] = 10.0
+    assert cache.get("a", 0) is None
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.expirations) == (1, 1, 1)
+    assert stats.hit_rate == pytest.approx(0.5)
+
+
+def test_cached_queries_follow_store_generation(tmp_path):
+    columns = synth.generate_season(SEASON, seed=9, n_games=20)
+    n = len(columns["game_pk"])
+    store = Store(tmp_path / "store", create=True)
+    append_columns(store, SEASON, {k: v[: n // 2] for k, v in columns.items()})
+    store.bump_generation()
+    cached = CachedQueries(store)
+
+    first = cached.leaderboard("obp", min_pa=5, limit=5)
+    assert cached.leaderboard("obp", min_pa=5, limit=5) is first
+    card = cached.player_card(int(first["player"][0]), stats=["avg", "ev_p90"])
+    assert "ev_p90" in card.columns
+    assert cached.cache.stats().hits == 1
+
+    append_columns(store, SEASON, {k: v[n // 2:] for k, v in columns.items()})
+    store.bump_generation()
+    fresh = cached.leaderboard("obp", min_pa=5, limit=5)
+    assert fresh is not first
+    want = query.leaderboard(store, "obp", min_pa=5, limit=5)
+    np.testing.assert_array_equal(fresh["player"], want["player"])
+    with pytest.raises(query.QueryError):
+        cached.player_card(1, stats=["ev_p150"])
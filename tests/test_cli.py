@@ -0,0 +1,104 @@
+import pytest
+
+from statshot import cli, synth
+from statshot.cli import CACHE_DIR, main
+from statshot.ingest import append_columns
+from statshot.store import Store
+
+SEASON = 2023
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    store = Store(tmp_path_factory.mktemp("cli") / "store", create=True)
+    append_columns(store, SEASON, synth.generate_season(SEASON, seed=3, n_games=20))
+    store.bump_generation()
+    return store
+
+
+def run(capsys, store, *args):
+    code = main(["--store", str(store.root), *args])
+    out, err = capsys.readouterr()
+    return code, out, err
+
+
+def _cached(store):
+    return sorted((store.root / CACHE_DIR).glob("*.out"))
+
+
+def test_empty_result_renders_header(capsys, store):
+    for fmt in cli._FORMATS:
+        code, out, _ = run(capsys, store, "player", "1", "--format", fmt, "--no-cache")
+        assert code == 0
+        if fmt == "json":
+            assert out == "[]\n"
+        else:
+            assert out.startswith("player") and len(out.splitlines()) == 1
+    batter = str(store.table(SEASON)["batter"][0])
+    code, out, _ = run(capsys, store, "comps", batter, "--min-pa", "100000", "--no-cache")
+    assert code == 0
+    assert out.split() == ["player", "level", "distance", "pa", "avg", "obp", "iso", "k_pct",
+                           "bb_pct"]
+
+
+def test_repeated_query_is_answered_from_cache(capsys, store):
+    args = ("leaderboard", "obp", "--min-pa", "5", "--limit", "5")
+    code, first, _ = run(capsys, store, *args)
+    assert code == 0 and len(first.splitlines()) == 6
+    path = cli._cache_path(store.root, cli.build_parser().parse_args(
+        ["--store", str(store.root), *args]), store.generation)
+    assert path.read_text() == first
+
+    path.write_text("from the cache\n")
+    assert run(capsys, store, *args)[1] == "from the cache\n"
+    assert run(capsys, store, *args, "--no-cache")[1] == first
+    assert run(capsys, store, *args, "--limit", "3")[1] != "from the cache\n"
+
+
+def test_generation_bump_invalidates_cache(capsys, store):
+    args = ("leaderboard", "woba", "--min-pa", "5", "--limit", "5")
+    first = run(capsys, store, *args)[1]
+    stale = _cached(store)
+    for path in stale:
+        path.write_text("stale\n")
+
+    store.bump_generation()
+    assert run(capsys, store, *args)[1] == first
+    assert not any(path.exists() for path in stale)
+    assert len(_cached(store)) == 1
+
+
+def test_errors_exit_2(capsys, store, tmp_path):
+    code, _, err = run(capsys, store, "leaderboard", "nope", "--no-cache")
+    assert code == 2 and err.startswith("statshot:")
+    assert main(["--store", str(tmp_path / "missing"), "player", "1"]) == 2
+
+
+def test_synth_writes_seasons(capsys, tmp_path):
+    root = tmp_path / "synth"
+    # One 2024 game with seed 10 used to run the simulation out of random draws.
+    code, out, _ = run(capsys, Store(root, create=True), "synth", "2023,2024", "--games", "1",
+                       "--seed", "10")
+    assert code == 0
+    store = Store(root)
+    assert store.seasons() == [2023, 2024] and store.generation == 1
+    for season in (2023, 2024):
+        want = synth.generate_season(season, seed=10, n_games=1)
+        assert store.table(season)["game_pk"].tolist() == want["game_pk"].tolist()
+    assert out == f"2 season(s), {len(store.table())} pitches written (generation 1)\n"
+
+    code, _, err = run(capsys, store, "synth", "2023", "--games", "1")
+    assert code == 2 and "already in the store" in err
+
+
+def test_synth_writes_feeds(capsys, tmp_path):
+    feeds = tmp_path / "feeds"
+    code = main(["--store", str(tmp_path / "unused"), "synth", "2023", "--games", "3",
+                 "--feeds", str(feeds), "--feed-format", "csv"])
+    out = capsys.readouterr().out
+    assert code == 0 and out == f"{len(list(feeds.iterdir()))} feed files written to {feeds}\n"
+    assert not (tmp_path / "unused").exists()
+
+    code, _, _ = run(capsys, Store(tmp_path / "store", create=True), "ingest", str(feeds))
+    assert code == 0
+    assert len(set(Store(tmp_path / "store").table(2023)["game_pk"].tolist())) == 3
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from statshot import comps, metrics, query, synth
+from statshot.ingest import append_columns, ingest
+from statshot.store import EventTable, Store
+
+SEASON = 2023
+
+
+@pytest.fixture(scope="module")
+def season_columns():
+    return synth.generate_season(SEASON, seed=13, n_games=40)
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory, season_columns):
+    store = Store(tmp_path_factory.mktemp("store"), create=True)
+    append_columns(store, SEASON, season_columns)
+    return store
+
+
+def test_exact_matches_brute_force():
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(500, 4)) * [1, 10, 100, 0.1]
+    features[::50, 2] = np.nan                   # not indexed
+    knn = comps.build(features, np.arange(1000, 1500))
+    assert len(knn) == 490
+    point = features[1]
+    rows, distances = knn.exact(point, 5)
+    vectors = (features - knn.center) / knn.scale
+    target = (point - knn.center) / knn.scale
+    brute = sorted((float(np.linalg.norm(v - target)), 1000 + i) for i, v in enumerate(vectors)
+                   if np.isfinite(v).all())[:5]
+    assert rows.tolist() == [row for _, row in brute]
+    np.testing.assert_allclose(distances, [d for d, _ in brute], rtol=1e-4, atol=1e-4)
+    assert rows[0] == 1001 and distances[0] == pytest.approx(0, abs=1e-4)
+
+
+def test_search_recall_against_exact(season_columns):
+    features = comps.pitch_features(EventTable.from_arrays(season_columns))
+    knn = comps.build(features)
+    assert len(knn.centroids) > 8
+    rng = np.random.default_rng(1)
+    points = knn.normalize(features[rng.choice(knn.rows, 100, replace=False)])
+    exact = [set(knn.exact(p, 10, normalized=True)[0].tolist()) for p in points]
+
+    def recall(nprobe):
+        return np.mean([len(truth & set(knn.search(p, 10, nprobe=nprobe,
+                                                   normalized=True)[0].tolist())) / 10
+                        for truth, p in zip(exact, points)])
+
+    assert recall(len(knn.centroids)) == 1.0
+    assert recall(comps.DEFAULT_NPROBE) >= 0.9
+    assert recall(1) <= recall(comps.DEFAULT_NPROBE)
+
+
+def test_pitch_index_is_built_at_ingest(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    n = len(season_columns["game_pk"])
+    append_columns(store, SEASON, {k: v[: n // 2] for k, v in season_columns.items()})
+    part = store.partition(SEASON)
+    assert comps.load(part) is not None and comps.update(part) == 0
+
+    # Appended without a refresh: the stale index is rebuilt by the query.
+    store.append(SEASON, {k: v[n // 2:] for k, v in season_columns.items()})
+    part = store.partition(SEASON)
+    assert comps.load(part) is None
+    assert len(comps.pitch_index(store, SEASON)) == len(comps.load(part))
+    assert not list(part.path.glob("*.tmp*"))
+    with pytest.raises(query.QueryError):
+        comps.pitch_index(store, SEASON + 1)
+
+
+def test_ingest_builds_the_index_once(tmp_path, season_columns):
+    feeds = tmp_path / "feeds"
+    synth.write_feeds(season_columns, feeds)
+    store = Store(tmp_path / "store", create=True)
+    metrics.REGISTRY.reset()
+    ingest(store, feeds, batch_pitches=1000)
+    timers = metrics.REGISTRY.snapshot()["timers"]
+    built = [t for t in timers if t["labels"] == {"stage": "comps"}]
+    assert built[0]["count"] == 1 and built[0]["rows"] == len(season_columns["game_pk"])
+    assert [t["count"] for t in timers if t["labels"] == {"stage": "index"}][0] > 1
+
+
+def test_read_only_store_answers_from_memory(tmp_path, season_columns, monkeypatch):
+    store = Store(tmp_path / "store", create=True)
+    store.append(SEASON, season_columns)
+
+    def read_only(*args):
+        raise PermissionError("read-only file system")
+
+    monkeypatch.setattr(comps, "_write", read_only)
+    knn = comps.pitch_index(store, SEASON)
+    assert len(knn) > 0 and comps.load(store.partition(SEASON)) is None
+    table = store.table(SEASON)
+    pitcher = int(table["pitcher"][np.argmax(table["pitch_type"] == comps._pitch_type_code("FF"))])
+    assert len(comps.similar_pitches(store, pitcher, "FF", season=SEASON))
+
+
+def test_similar_pitches(store):
+    table = store.table(SEASON)
+    fastball = table["pitch_type"] == comps._pitch_type_code("FF")
+    pitcher = int(table["pitcher"][np.argmax(fastball)])
+    similar = comps.similar_pitches(store, pitcher, "FF", season=SEASON, k=5, neighbours=200)
+    assert isinstance(similar, query.StatTable) and similar.origin == "index"
+    assert 0 < len(similar) <= 5 and pitcher not in similar["player"].tolist()
+    assert similar["pitches"].sum() <= 200
+    assert similar["pitches"].tolist() == sorted(similar["pitches"].tolist(), reverse=True)
+    for bad in ({"pitch_type": "XX"}, {"pitcher": -1}):
+        with pytest.raises(query.QueryError):
+            comps.similar_pitches(store, **{"pitcher": pitcher, "pitch_type": "FF", **bad},
+                                  season=SEASON)
+
+
+def test_similar_players_brute_force(store):
+    lines = query.stat_lines(store, ev_percentiles=())
+    names = comps.PLAYER_FEATURES["batter"]
+    features = np.column_stack([lines[name] for name in names])
+    player = int(lines["player"][np.argmax(lines["pa"])])
+    similar = comps.similar_players(store, player, k=4, min_pa=10)
+
+    pool = (lines["pa"] >= 10) & (lines["player"] != player)
+    center, scale = features[pool].mean(axis=0), features[pool].std(axis=0)
+    target = (features[lines["player"] == player][0] - center) / scale
+    distance = np.linalg.norm((features - center) / scale - target, axis=1)
+    want = lines["player"][pool][np.argsort(distance[pool], kind="stable")][:4]
+    assert pool.sum() > 4 and similar["player"].tolist() == want.tolist()
+    assert (similar["pa"] >= 10).all()
+    with pytest.raises(query.QueryError):
+        comps.similar_players(store, -1)
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from statshot import export, query, schema, synth
+from statshot.ingest import append_columns
+from statshot.store import Store
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+SEASON = 2023
+
+
+@pytest.fixture(scope="module")
+def season_columns():
+    return synth.generate_season(SEASON, seed=14, n_games=10)
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory, season_columns):
+    store = Store(tmp_path_factory.mktemp("store"), create=True)
+    n = len(season_columns["game_pk"])
+    append_columns(store, SEASON, {k: v[: n // 3] for k, v in season_columns.items()})
+    append_columns(store, SEASON + 1, {k: v[n // 3:] for k, v in season_columns.items()})
+    return store
+
+
+def _address(array):
+    return array.buffers()[-1].address
+
+
+def test_event_arrays_are_views(store):
+    table = store.partition(SEASON).table()
+    arrays = export.event_arrays(store, SEASON, ["batter", "launch_speed"], start=5, stop=25)
+    assert list(arrays) == ["batter", "launch_speed"]
+    for name, values in arrays.items():
+        assert len(values) == 20 and not values.flags.writeable
+        assert np.shares_memory(values, table[name])
+        np.testing.assert_array_equal(values, table[name][5:25])
+    with pytest.raises(ValueError):
+        export.event_arrays(store, SEASON, ["nope"])
+
+
+def test_to_arrow_shares_the_maps(store):
+    table = store.partition(SEASON).table().slice(10, 110)
+    arrow = export.to_arrow(table, ["batter", "launch_speed", "pitch_type"])
+    assert arrow.column_names == ["batter", "launch_speed", "pitch_type"]
+    for name in ("batter", "launch_speed"):
+        assert _address(arrow[name].chunk(0)) == table[name].ctypes.data
+    pitch_type = arrow["pitch_type"].chunk(0)
+    assert pa.types.is_dictionary(pitch_type.type)
+    assert _address(pitch_type.indices) == table["pitch_type"].ctypes.data
+    assert pitch_type.dictionary.to_pylist() == list(schema.VOCABULARIES["pitch_type"])
+    assert pitch_type.to_pylist() == [schema.VOCABULARIES["pitch_type"][c]
+                                      for c in table["pitch_type"].tolist()]
+    # NaN stays NaN rather than becoming null.
+    assert arrow["launch_speed"].null_count == 0
+    plain = export.to_arrow(table, ["pitch_type"], labels=False)
+    assert plain["pitch_type"].type == pa.from_numpy_dtype(schema.DTYPES["pitch_type"])
+    with pytest.raises(ValueError):
+        export.to_arrow(table, ["nope"])
+
+
+def test_to_arrow_query_results(store):
+    lines = query.stat_lines(store, split="stand", ev_percentiles=())
+    arrow = export.to_arrow(lines)
+    assert arrow.num_rows == len(lines)
+    assert arrow.schema.metadata == {b"role": b"batter", b"split": b"stand",
+                                     b"origin": lines.origin.encode()}
+    assert arrow["level"].chunk(0).dictionary.to_pylist() == list(lines.labels)
+    np.testing.assert_array_equal(arrow["pa"].to_numpy(), lines["pa"])
+
+
+def test_write_parquet_round_trip(tmp_path, store, season_columns):
+    path = tmp_path / "events.parquet"
+    assert export.write_parquet(store, path, row_group_rows=500) == len(season_columns["game_pk"])
+    assert not list(tmp_path.glob("*.tmp"))
+    meta = pq.ParquetFile(path).metadata
+    want_groups = sum(-(-len(store.partition(s)) // 500) for s in store.seasons())
+    assert meta.num_row_groups == want_groups
+    assert max(meta.row_group(i).num_rows for i in range(want_groups)) == 500
+
+    read = pq.read_table(path)
+    for name in schema.COLUMN_NAMES:
+        want = season_columns[name].astype(schema.DTYPES[name])
+        if name in schema.VOCABULARIES:
+            got = read[name].combine_chunks().indices.to_numpy()
+        else:
+            got = read[name].to_numpy()
+        np.testing.assert_array_equal(got, want, err_msg=name)
+
+    some = tmp_path / "some.parquet"
+    assert export.write_parquet(store, some, [SEASON], ["batter", "event"]) == len(
+        store.partition(SEASON))
+    assert pq.read_table(some).column_names == ["batter", "event"]
+
+
+def test_empty_export_and_bad_arguments(tmp_path, store):
+    empty = Store(tmp_path / "empty", create=True)
+    path = tmp_path / "empty.parquet"
+    assert export.write_parquet(empty, path) == 0
+    read = pq.read_table(path)
+    assert read.num_rows == 0 and read.column_names == list(schema.COLUMN_NAMES)
+    with pytest.raises(ValueError):
+        export.write_parquet(store, tmp_path / "bad.parquet", columns=["nope"])
+    with pytest.raises(ValueError):
+        list(export.record_batches(store, rows=0))
+    assert not (tmp_path / "bad.parquet").exists()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from statshot import heatmap, synth
+from statshot.ingest import append_columns
+from statshot.store import Store
+
+SEASON = 2023
+N_GAMES = 30
+
+_TRACKING = ("hc_x", "hc_y", "plate_x", "plate_z")
+
+
+@pytest.fixture(scope="module")
+def season_columns():
+    return synth.generate_season(SEASON, seed=11, n_games=N_GAMES)
+
+
+def _games(columns, first, last):
+    """The pitches of games ``first:last`` (by order of appearance)."""
+    starts = np.r_[np.searchsorted(columns["game_pk"], np.unique(columns["game_pk"])),
+                   len(columns["game_pk"])]
+    lo, hi = starts[first], starts[min(last, len(starts) - 1)]
+    return {k: v[lo:hi] for k, v in columns.items()}
+
+
+def _untracked(columns):
+    """``columns`` as if no pitch location or landing spot had been recorded."""
+    return {k: np.full_like(v, np.nan) if k in _TRACKING else v for k, v in columns.items()}
+
+
+def assert_maps_equal(got, want):
+    for key in heatmap.MAPS:
+        np.testing.assert_array_equal(got[key].players, want[key].players)
+        np.testing.assert_array_equal(got[key].counts, want[key].counts)
+
+
+def test_incremental_heatmaps_match_rescan(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    batches = [
+        _untracked(_games(season_columns, 0, 2)),   # nothing to bin yet ...
+        _untracked(_games(season_columns, 2, 4)),   # ... twice in a row
+        _games(season_columns, 4, 15),
+        _untracked(_games(season_columns, 15, 17)),
+        _games(season_columns, 17, N_GAMES),
+    ]
+    for batch in batches:
+        append_columns(store, SEASON, batch)
+        partition = store.partition(SEASON)
+        maps = heatmap.load(partition)
+        assert maps is not None
+        assert_maps_equal(maps, heatmap.compute(store.table(SEASON)))
+    assert len(maps["zone", "batter"].players) > 0
+
+
+def test_merge_of_empty_maps_is_empty():
+    empty = heatmap._empty("zone")
+    merged = heatmap.merge([empty, empty])
+    assert len(merged.players) == 0
+    assert merged.counts.shape == empty.counts.shape
+    with pytest.raises(ValueError):
+        heatmap.merge([])
+
+
+def test_store_heatmaps_equal_table(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    append_columns(store, SEASON, season_columns)
+    for grid in heatmap.GRIDS:
+        from_store = heatmap.heatmaps(store, grid, role="pitcher")
+        from_table = heatmap.heatmaps(store.table(SEASON), grid, role="pitcher")
+        np.testing.assert_array_equal(from_store.counts, from_table.counts)
+        player = int(from_store.players[0])
+        np.testing.assert_array_equal(
+            heatmap.player_heatmap(store, player, grid, role="pitcher"), from_store.counts[0])
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from statshot import index, schema, synth
+from statshot.ingest import append_columns
+from statshot.store import Store
+
+SEASON = 2023
+
+
+@pytest.fixture(scope="module")
+def season_columns():
+    return synth.generate_season(SEASON, seed=8, n_games=20)
+
+
+def assert_index_equals(got, want):
+    for got_field, want_field in zip(got, want):
+        np.testing.assert_array_equal(got_field, want_field)
+
+
+def test_lookups_by_hand():
+    idx = index.build(np.array([5, 3, 5, 1, 3, 5]), start=10)
+    assert idx.keys.tolist() == [1, 3, 5]
+    assert idx.lookup(5).tolist() == [10, 12, 15]
+    assert idx.lookup(4).tolist() == [] and idx.lookup(9).tolist() == []
+    assert idx.lookup_range(2, 3).tolist() == [11, 14]
+    assert idx.lookup_many([5, 1, 7, 1]).tolist() == [10, 12, 13, 15]
+    assert idx.lookup_many([]).tolist() == []
+
+
+def test_merge_equals_rebuild(season_columns):
+    values = season_columns["batter"]
+    whole = index.build(values)
+    for cut in (0, 1, len(values) // 3, len(values)):
+        merged = index.merge(index.build(values[:cut]), index.build(values[cut:], cut))
+        assert_index_equals(merged, whole)
+
+
+def test_incremental_update_equals_rebuild(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    n = len(season_columns["game_pk"])
+    for lo, hi in ((0, n // 4), (n // 4, n // 4), (n // 4, n)):
+        append_columns(store, SEASON, {k: v[lo:hi] for k, v in season_columns.items()})
+        assert index.load(store.partition(SEASON)) is not None
+    part = store.partition(SEASON)
+    assert index.update(part) == 0
+    for column in index.INDEXED:
+        values = season_columns[column].astype(schema.DTYPES[column])
+        assert_index_equals(index.load(part)[column], index.build(values))
+
+    # Appending without updating leaves a stale index, which is not used.
+    store.append(SEASON, {k: v[:10] for k, v in season_columns.items()})
+    part = store.partition(SEASON)
+    assert index.load(part) is None and index.select(store, "batter", 1) is None
+    assert index.update(part) == 10
+
+
+def test_select_matches_a_scan(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    n = len(season_columns["game_pk"])
+    append_columns(store, SEASON, {k: v[: n // 2] for k, v in season_columns.items()})
+    append_columns(store, SEASON + 1, {k: v[n // 2:] for k, v in season_columns.items()})
+    table = store.table()
+    batters = np.unique(season_columns["batter"])[:3].tolist()
+    for column, values in (("batter", batters), ("pitcher", int(table["pitcher"][0])),
+                           ("game_pk", [int(table["game_pk"][-1])]), ("batter", [-1])):
+        picked = index.select(store, column, values)
+        mask = np.isin(table[column], values)
+        assert len(picked) == mask.sum()
+        for name in schema.COLUMN_NAMES:
+            np.testing.assert_array_equal(picked[name], table[name][mask], err_msg=name)
+    assert len(index.select(store, "batter", batters, seasons=SEASON + 1)) == np.isin(
+        store.table(SEASON + 1)["batter"], batters).sum()
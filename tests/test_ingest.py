@@ -0,0 +1,90 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from statshot import schema, synth
+from statshot.ingest import FeedError, ingest, iter_games
+from statshot.store import Store
+
+SEASON = 2023
+N_GAMES = 12
+
+
+@pytest.fixture(scope="module")
+def season_columns():
+    return synth.generate_season(SEASON, seed=4, n_games=N_GAMES)
+
+
+@pytest.fixture(scope="module", params=["json", "csv"])
+def feeds(request, tmp_path_factory, season_columns):
+    directory = tmp_path_factory.mktemp(f"feeds-{request.param}")
+    synth.write_feeds(season_columns, directory, fmt=request.param)
+    return directory
+
+
+def assert_store_has(store, columns):
+    table = store.table(SEASON)
+    for name in schema.COLUMN_NAMES:
+        want = columns[name].astype(schema.DTYPES[name])
+        if want.dtype.kind == "f":      # feeds carry measurements to two decimals
+            np.testing.assert_allclose(table[name], want, atol=0.006, err_msg=name)
+        else:
+            np.testing.assert_array_equal(table[name], want, err_msg=name)
+
+
+def test_feeds_round_trip(tmp_path, feeds, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    report = ingest(store, feeds, batch_pitches=5000)
+    assert report.games_added == N_GAMES
+    assert report.pitches == len(season_columns["game_pk"])
+    assert report.generation == store.generation == 1
+    assert_store_has(store, season_columns)
+
+
+def test_games_already_stored_are_skipped(tmp_path, feeds, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    games = list(iter_games(feeds))
+    ingest(store, games[:5])
+    report = ingest(store, games)
+    assert (report.games_added, report.games_skipped) == (N_GAMES - 5, 5)
+    # The same game twice in one source is only added once.
+    report = ingest(store, games[-1:] * 2)
+    assert (report.games_added, report.games_skipped) == (0, 2)
+    assert report.generation == store.generation == 2
+    assert_store_has(store, season_columns)
+
+
+def test_manifest_skips_unchanged_files(tmp_path, feeds, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    first = ingest(store, feeds)
+    assert first.files_unchanged == 0
+
+    again = ingest(store, feeds)
+    assert again.files_unchanged == again.files == first.files
+    assert again.games_added == again.games_skipped == 0
+
+    touched = sorted(p for p in feeds.iterdir())[0]
+    stat = touched.stat()
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    changed = ingest(store, feeds)
+    assert changed.files_unchanged == first.files - 1
+    assert changed.games_skipped >= 1 and changed.games_added == 0
+
+    rescanned = ingest(store, feeds, rescan=True)
+    assert rescanned.files_unchanged == 0
+    assert rescanned.games_skipped == N_GAMES
+    assert store.generation == 1
+    assert_store_has(store, season_columns)
+
+
+def test_bad_feeds_raise_feed_error(tmp_path):
+    (tmp_path / "20230401-1.json").write_text(json.dumps({"game_pk": 1}))
+    with pytest.raises(FeedError):
+        list(iter_games(tmp_path))
+    (tmp_path / "20230401-1.json").unlink()
+    (tmp_path / "20230401.csv").write_text("game_pk,batter\n1,2\n")
+    with pytest.raises(FeedError):
+        list(iter_games(tmp_path))
+
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from statshot import live, query, synth
+from statshot.ingest import append_columns
+from statshot.store import Store
+
+SEASON = 2023
+
+
+@pytest.fixture(scope="module")
+def season_columns():
+    return synth.generate_season(SEASON, seed=5, n_games=30)
+
+
+@pytest.fixture(scope="module")
+def slate():
+    return live.stand_in(SEASON, n_games=4, seed=6)
+
+
+@pytest.fixture
+def store(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    append_columns(store, SEASON, season_columns)
+    return store
+
+
+def _pitches(records):
+    return [r for r in records if live.FINAL_FIELD not in r]
+
+
+def test_apply_adds_to_season_lines(store, slate):
+    board = live.LiveBoard(store, SEASON)
+    applied = [board.apply(record) for record in slate]
+    assert sum(applied) == board.events == len(_pitches(slate))
+
+    before = query.stat_lines(store, ev_percentiles=())
+    batter = int(_pitches(slate)[0]["batter"])
+    pas = [r for r in _pitches(slate) if int(r["batter"]) == batter and r["events"]]
+    old = before["pa"][before["player"] == batter]
+    assert board.line(batter)["pa"] == (old[0] if len(old) else 0) + len(pas)
+
+
+def test_duplicate_and_stale_pitches_are_skipped(slate):
+    board = live.LiveBoard()
+    game = [r for r in _pitches(slate) if r["game_pk"] == slate[0]["game_pk"]]
+    assert board.apply(game[0]) and board.apply(game[1])
+    assert not board.apply(game[1])             # resent
+    assert not board.apply(game[0])             # older than what was applied
+    assert board.events == 2
+
+
+def test_leaderboard_matches_store_after_commit(store, slate):
+    board = live.LiveBoard(store, SEASON)
+    for record in slate:
+        board.apply(record)
+    live_board = board.leaderboard("woba", min_pa=20, limit=None)
+    assert board.final_games() == board.games()
+    report = board.commit(store)
+    assert report.games_added == 4
+    assert board.games() == []
+
+    stored = query.leaderboard(store, "woba", min_pa=20)
+    assert [row["player"] for row in live_board] == stored["player"].tolist()
+    np.testing.assert_allclose([row["woba"] for row in live_board], stored["woba"])
+    # Committed games are in the store now; replaying them changes nothing.
+    assert not any(board.apply(record) for record in slate)
+
+
+def test_unfinished_games_are_not_committed(store, slate):
+    unfinished = slate[-1]["game_pk"]
+    game = [r for r in slate if r["game_pk"] == unfinished]
+    head = [r for r in slate if r["game_pk"] != unfinished] + game[:len(game) // 2]
+    board = live.LiveBoard(store, SEASON)
+    for record in head:
+        board.apply(record)
+    assert unfinished in board.games()
+    assert unfinished not in board.final_games()
+    with pytest.raises(ValueError):
+        board.commit(store, [unfinished])
+
+    board.commit(store)
+    assert unfinished not in store.partition(SEASON).game_pks()
+    assert board.games() == [unfinished]
+
+    # After a restart, the whole game can still be applied and committed.
+    board = live.LiveBoard(store, SEASON)
+    assert all(board.apply(r) for r in _pitches(game))
+    board.apply(game[-1])
+    assert board.commit(store).games_added == 1
+    stored = store.table(SEASON)["game_pk"] == unfinished
+    assert stored.sum() == len(_pitches(game))
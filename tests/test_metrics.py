@@ -0,0 +1,116 @@
+import json
+import sys
+import threading
+
+from statshot import metrics, query, synth
+from statshot.store import EventTable
+
+
+def _timer(snap, name, **labels):
+    found = [t for t in snap["timers"] if t["name"] == name
+             and all(t["labels"].get(k) == v for k, v in labels.items())]
+    assert len(found) == 1, found
+    return found[0]
+
+
+def test_span_records_count_rows_and_labels():
+    registry = metrics.Registry()
+    for rows in (3, 4):
+        with registry.span("query", kind="leaderboard", split=None) as span:
+            span.rows = rows
+            span.labels["origin"] = "rollup"
+    registry.observe("query", 20.0, rows=1, kind="leaderboard", split=None, origin="rollup")
+    timer = _timer(registry.snapshot(), "query")
+    assert timer["labels"] == {"kind": "leaderboard", "origin": "rollup", "split": "none"}
+    assert (timer["count"], timer["rows"]) == (3, 8)
+    assert timer["max_seconds"] == 20.0
+    assert sum(timer["buckets"]) == 3 and timer["buckets"][-1] == 1
+
+
+def test_prometheus_text():
+    registry = metrics.Registry()
+    registry.observe("query", 0.003, rows=10, kind="card")
+    registry.observe("query", 0.2, rows=5, kind="card")
+    registry.count("slow_profiles", name='a"b')
+    registry.gauge("cache_bytes", 1024)
+    text = registry.to_prometheus()
+    lines = text.splitlines()
+    assert "# TYPE statshot_query_seconds histogram" in lines
+    assert 'statshot_query_seconds_bucket{kind="card",le="0.005"} 1' in lines
+    assert 'statshot_query_seconds_bucket{kind="card",le="+Inf"} 2' in lines
+    assert 'statshot_query_seconds_count{kind="card"} 2' in lines
+    assert "# TYPE statshot_query_rows_total counter" in lines
+    assert 'statshot_query_rows_total{kind="card"} 15' in lines
+    assert 'statshot_slow_profiles_total{name="a\\"b"} 1' in lines
+    assert "statshot_cache_bytes 1024" in lines
+    assert sum(line.startswith("# TYPE statshot_query_seconds ") for line in lines) == 1
+
+
+def test_json_round_trip_and_merge():
+    worker = metrics.Registry()
+    worker.observe("query", 0.01, rows=7, kind="splits")
+    worker.count("slow_profiles", 2, name="query")
+    snap = json.loads(worker.to_json())
+    assert snap == worker.snapshot()
+
+    parent = metrics.Registry()
+    parent.observe("query", 0.02, rows=1, kind="splits")
+    parent.merge(json.loads(json.dumps(worker.drain())))
+    assert worker.snapshot()["timers"] == []
+    timer = _timer(parent.snapshot(), "query", kind="splits")
+    assert (timer["count"], timer["rows"]) == (2, 8)
+    assert parent.snapshot()["counters"][0]["value"] == 2
+
+
+def test_slow_spans_are_profiled(tmp_path):
+    registry = metrics.Registry()
+    registry.profile_slow(0.0, keep=2, directory=tmp_path)
+    for _ in range(3):
+        with registry.span("query", kind="card"):
+            with registry.span("inner"):
+                sum(range(1000))
+    profiles = registry.profiles()
+    assert len(profiles) == 2 and all(p["name"] == "query" for p in profiles)
+    assert len(list(tmp_path.glob("query-*.prof"))) == 3
+    registry.profile_slow(None)
+    with registry.span("query", kind="card"):
+        pass
+    assert len(registry.profiles()) == 2 and not registry.profiling
+
+
+def test_queries_are_timed():
+    table = EventTable.from_arrays(synth.generate_season(2023, seed=12, n_games=10))
+    metrics.REGISTRY.reset()
+    query.stat_lines(table, ev_percentiles=())
+    timer = _timer(metrics.REGISTRY.snapshot(), "query", kind="lines")
+    assert (timer["count"], timer["rows"]) == (1, len(table))    # every pitch was read
+
+
+def test_drain_loses_nothing_recorded_concurrently():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)               # switch threads as often as possible
+    try:
+        _drain_while_recording()
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def _drain_while_recording():
+    registry = metrics.Registry()
+    per_thread, n_threads = 2000, 4
+    drained = []
+
+    def record():
+        for _ in range(per_thread):
+            registry.observe("query", 0.001, rows=1)
+
+    threads = [threading.Thread(target=record) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        drained.append(registry.drain())
+    for thread in threads:
+        thread.join()
+    drained.append(registry.drain())
+    total = sum(t["count"] for snap in drained for t in snap["timers"])
+    assert total == per_thread * n_threads
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from statshot import query, schema
+from statshot.store import EventTable
+
+
+def _table(plate_appearances):
+    """One pitch per ``(batter, event, launch_speed)`` plate appearance, pitcher 9."""
+    batter, event, speed = zip(*plate_appearances)
+    return EventTable.from_arrays({
+        "batter": np.array(batter, np.int32),
+        "pitcher": np.full(len(batter), 9, np.int32),
+        "event": schema.codes_for("event", event),
+        "launch_speed": np.array(speed, np.float32),
+    })
+
+
+nan = float("nan")
+
+TABLE = _table([
+    (1, "single", 90.0), (1, "double", 100.0), (1, "walk", nan), (1, "strikeout", nan),
+    (1, "home_run", 110.0), (1, "sac_fly", 80.0),
+    (2, "field_out", 70.0), (2, "hit_by_pitch", nan), (2, "intent_walk", nan),
+    (2, "", nan),                       # a pitch that did not end the plate appearance
+])
+
+
+def test_stat_lines_by_hand():
+    lines = query.stat_lines(TABLE, ev_percentiles=(0, 50, 100))
+    assert lines["player"].tolist() == [1, 2]
+    one = {name: lines[name][0] for name in lines.columns}
+    assert (one["pa"], one["ab"], one["h"], one["tb"], one["bb"], one["so"], one["sf"]) == (
+        6, 4, 3, 7, 1, 1, 1)
+    assert one["avg"] == pytest.approx(3 / 4)
+    assert one["obp"] == pytest.approx(4 / 6)
+    assert one["slg"] == pytest.approx(7 / 4)
+    w = query.WOBA_WEIGHTS
+    assert one["woba"] == pytest.approx((w["bb"] + w["singles"] + w["doubles"] + w["hr"]) / 6)
+    assert one["bbe"] == 4
+    assert (one["ev_p0"], one["ev_p50"], one["ev_p100"]) == pytest.approx((80, 95, 110))
+
+    two = {name: lines[name][1] for name in lines.columns}
+    assert (two["pa"], two["ab"], two["h"], two["hbp"], two["ibb"]) == (3, 1, 0, 1, 1)
+    assert two["obp"] == pytest.approx(2 / 3)
+    assert two["ev_p50"] == 70
+
+
+def test_pitcher_lines_count_batters_faced():
+    lines = query.stat_lines(TABLE, role="pitcher", ev_percentiles=())
+    assert lines["player"].tolist() == [9]
+    assert lines["pa"][0] == 9
+
+
+def test_group_percentiles_by_hand():
+    group = np.array([0, 0, 0, 0, 1, 0])
+    values = np.array([4.0, 1.0, 3.0, 2.0, 10.0, nan])
+    sizes, table = query.group_percentiles(group, values, 3, (0, 50, 100))
+    assert sizes.tolist() == [4, 1, 0]
+    np.testing.assert_allclose(table[:2], [[1, 2.5, 4], [10, 10, 10]])
+    assert np.isnan(table[2]).all()
+    with pytest.raises(ValueError):
+        query.group_percentiles(group, values, 3, (100.5,))
+
+
+def test_parse_ev_percentiles():
+    assert query.parse_ev_percentiles(["avg", "ev_p90", "ev_p0", "ev_p100", "ev_p97.5"]) == (
+        90, 0, 100, 97.5)
+    for bad in ("ev_pxx", "ev_p", "ev_p150", "ev_p100.5", "ev_p-1", "ev_pnan"):
+        with pytest.raises(query.QueryError):
+            query.parse_ev_percentiles([bad])
+
+
+@pytest.mark.parametrize("stat", ["ev_pxx", "ev_p150", "ev_p101"])
+def test_leaderboard_rejects_bad_percentiles(stat):
+    with pytest.raises(query.QueryError):
+        query.leaderboard(TABLE, stat)
+
+
+def test_leaderboard_ranks_and_filters():
+    board = query.leaderboard(TABLE, "obp", min_pa=4)
+    assert board["player"].tolist() == [1]
+    board = query.leaderboard(TABLE, "ev_p100")
+    assert board["player"].tolist() == [1, 2]
+    assert board["ev_p100"].tolist() == [110, 70]
+    with pytest.raises(query.QueryError):
+        query.leaderboard(TABLE, "nope")
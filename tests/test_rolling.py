@@ -0,0 +1,155 @@
+import numpy as np
+import pytest
+
+from statshot import query, rolling, schema, synth
+from statshot.store import EventTable
+
+SEASON = 2023
+
+
+@pytest.fixture(scope="module")
+def table():
+    return EventTable.from_arrays(synth.generate_season(SEASON, seed=11, n_games=45))
+
+
+def _segments(offsets):
+    return [range(lo, hi) for lo, hi in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def _brute_runs(flags, offsets, neutral):
+    found = []
+    for segment in _segments(offsets):
+        start = end = None
+        length = 0
+        for row in segment:
+            if neutral[row]:
+                continue
+            if flags[row]:
+                start = row if length == 0 else start
+                end, length = row, length + 1
+            else:
+                if length:
+                    found.append((start, end, length))
+                length = 0
+        if length:
+            found.append((start, end, length))
+    return found
+
+
+def test_window_sums_brute_force():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 5, size=(60, 3))
+    offsets = np.array([0, 1, 1, 25, 60])
+    for window in (1, 3, 10, 100):
+        sums, sizes = rolling.window_sums(values, offsets, window)
+        for segment in _segments(offsets):
+            for row in segment:
+                lo = max(segment.start, row - window + 1)
+                np.testing.assert_array_equal(sums[row], values[lo:row + 1].sum(axis=0))
+                assert sizes[row] == row + 1 - lo
+    with pytest.raises(ValueError):
+        rolling.window_sums(values, offsets, 0)
+
+
+def test_runs_brute_force():
+    rng = np.random.default_rng(1)
+    flags = rng.random(200) < 0.6
+    neutral = rng.random(200) < 0.15
+    offsets = np.array([0, 3, 3, 50, 120, 200])
+    for skip in (np.zeros(200, dtype=bool), neutral):
+        start, end, lengths = rolling.runs(flags, offsets, skip if skip.any() else None)
+        got = list(zip(start.tolist(), end.tolist(), lengths.tolist()))
+        assert got == _brute_runs(flags, offsets, skip)
+
+
+def test_game_log_and_rolling_brute_force(table):
+    log = rolling.game_log(table)
+    # Every player's games, in date order, each holding that game's line.
+    rows = query.pa_rows(table)
+    for i in (0, len(log.players) // 2, len(log.players) - 1):
+        player = log.players[i]
+        mine = rows[table["batter"][rows] == player]
+        games = sorted(set(zip(table["game_date"][mine].tolist(),
+                               table["game_pk"][mine].tolist())))
+        span = slice(log.offsets[i], log.offsets[i + 1])
+        assert list(zip(log.game_date[span].tolist(), log.game_pk[span].tolist())) == games
+        for row, (_, game) in zip(range(span.start, span.stop), games):
+            line = query.stat_lines(table.take(mine[table["game_pk"][mine] == game]),
+                                    ev_percentiles=())
+            for stat in query.COUNTING_STATS:
+                assert log.column(stat)[row] == line[stat][0], stat
+
+    window = 7
+    windows = rolling.rolling(log, window)
+    assert len(windows) == len(log)
+    for segment in _segments(log.offsets):
+        for row in segment:
+            lo = max(segment.start, row - window + 1)
+            assert windows["games"][row] == row + 1 - lo
+            assert windows["pa"][row] == log.column("pa")[lo:row + 1].sum()
+            h, ab = log.column("h")[lo:row + 1].sum(), log.column("ab")[lo:row + 1].sum()
+            if ab:
+                assert windows["avg"][row] == pytest.approx(h / ab)
+
+
+def test_pitch_log_velocity_brute_force(table):
+    log = rolling.pitch_log(table)
+    velo = rolling.rolling(log, 3)
+    fastball = np.isin(table["pitch_type"], schema.codes_for("pitch_type", ["FF"]))
+    fastballs = np.flatnonzero(np.isfinite(table["release_speed"]) & fastball)
+    i = int(np.argmax(np.diff(log.offsets)))
+    pitcher = log.players[i]
+    mine = fastballs[table["pitcher"][fastballs] == pitcher]
+    for row in range(log.offsets[i], log.offsets[i + 1]):
+        games = log.game_pk[max(log.offsets[i], row - 2):row + 1]
+        speeds = table["release_speed"][mine[np.isin(table["game_pk"][mine], games)]]
+        assert velo["pitches"][row] == len(speeds)
+        assert velo["release_speed"][row] == pytest.approx(speeds.astype(np.float64).mean())
+
+
+def test_hitting_streaks_brute_force(table):
+    log = rolling.game_log(table)
+    hit, neutral = log.column("h") > 0, log.column("ab") == 0
+    want = _brute_runs(hit, log.offsets, neutral)
+    streaks = rolling.hitting_streaks(log, min_length=2)
+    assert len(streaks)
+    assert sorted(streaks["games"].tolist()) == sorted(n for _, _, n in want if n >= 2)
+    assert streaks["games"].tolist() == sorted(streaks["games"].tolist(), reverse=True)
+    owner = log.player_of_row()
+    for player, length, last in zip(streaks["player"], streaks["games"], streaks["last_game"]):
+        assert any(log.players[owner[end]] == player and n == length
+                   and log.game_pk[end] == last for _, end, n in want)
+
+
+def test_scoreless_streaks_brute_force(table):
+    log = rolling.inning_log(table)
+    want = _brute_runs(log.column("runs") == 0, log.offsets, np.zeros(len(log), dtype=bool))
+    streaks = rolling.scoreless_streaks(log)
+    assert sorted(streaks["innings"].tolist()) == sorted(n for _, _, n in want)
+    ends = {end for _, end, _ in want}
+    assert streaks["active"].sum() == sum(hi - 1 in ends for hi in log.offsets[1:].tolist())
+
+
+def test_starts_only_keeps_the_first_pitcher_of_each_half():
+    # (pitcher, inning, topbot, at_bat_number, pitch_number): 10 starts for the
+    # home side and is knocked out in the 1st, 11 relieves in the 1st; 20
+    # starts for the visitors, 21 takes over in the 2nd.
+    pitches = [(11, 1, 0, 3, 1), (10, 1, 0, 1, 2), (20, 1, 1, 4, 1), (10, 1, 0, 1, 1),
+               (11, 1, 0, 5, 1), (10, 1, 0, 2, 1), (21, 2, 1, 9, 1), (20, 1, 1, 4, 2),
+               (11, 2, 0, 7, 1)]
+    pitcher, inning, topbot, at_bat, number = (np.array(c) for c in zip(*pitches))
+    n = len(pitches)
+    table = EventTable.from_arrays({
+        "game_pk": np.full(n, 1, np.int32), "game_date": np.full(n, 20240401, np.int32),
+        "pitcher": pitcher.astype(np.int32), "inning": inning.astype(np.int8),
+        "inning_topbot": topbot.astype(np.int8), "at_bat_number": at_bat.astype(np.int16),
+        "pitch_number": number.astype(np.int8),
+        "pitch_type": schema.codes_for("pitch_type", ["FF"] * n),
+        "release_speed": np.arange(n, dtype=np.float32) + 90,
+    })
+    np.testing.assert_array_equal(rolling._starts(table), np.isin(pitcher, [10, 20]))
+    log = rolling.pitch_log(table, starts_only=True)
+    assert log.players.tolist() == [10, 20]
+    assert log.column("pitches").tolist() == [3, 2]
+    assert rolling.pitch_log(table).players.tolist() == [10, 11, 20, 21]
+    assert not rolling._starts(table.take(np.arange(0))).size
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from statshot import query, rollup, synth
+from statshot.ingest import append_columns, ingest, iter_games
+from statshot.store import Store
+
+SEASON = 2023
+N_GAMES = 45
+
+
+@pytest.fixture(scope="module")
+def season_columns():
+    return synth.generate_season(SEASON, seed=7, n_games=N_GAMES)
+
+
+@pytest.fixture
+def store(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    append_columns(store, SEASON, season_columns)
+    return store
+
+
+def _split_at_game(columns, fraction):
+    """Row index of the first pitch of the game ``fraction`` of the way in."""
+    games = np.unique(columns["game_pk"])
+    cut = games[int(len(games) * fraction)]
+    return int(np.searchsorted(columns["game_pk"], cut))
+
+
+def assert_cube_matches_scan(cube, table, role, split):
+    players, levels, counts = query.count_stats(table, role=role, split=split)
+    np.testing.assert_array_equal(cube.players, players)
+    np.testing.assert_array_equal(cube.levels, levels)
+    np.testing.assert_array_equal(cube.counts, counts)
+
+
+@pytest.mark.parametrize("role, split", rollup.CUBES)
+def test_rollup_matches_raw_scan(store, role, split):
+    cubes = rollup.load(store.partition(SEASON))
+    assert cubes is not None
+    assert_cube_matches_scan(cubes[role, split], store.table(SEASON), role, split)
+
+
+def test_incremental_updates_match_full_rebuild(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    bounds = [0, _split_at_game(season_columns, 0.3), _split_at_game(season_columns, 0.7),
+              len(season_columns["game_pk"])]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        append_columns(store, SEASON, {k: v[lo:hi] for k, v in season_columns.items()})
+        table = store.table(SEASON)
+        cubes = rollup.load(store.partition(SEASON))
+        for role, split in rollup.CUBES:
+            assert_cube_matches_scan(cubes[role, split], table, role, split)
+
+    rebuilt = rollup.compute(store.table(SEASON))
+    for key in rollup.CUBES:
+        for got, want in zip(cubes[key], rebuilt[key]):
+            np.testing.assert_array_equal(got, want)
+
+
+def test_ingest_keeps_rollups_current(tmp_path, season_columns):
+    feeds = tmp_path / "feeds"
+    synth.write_feeds(season_columns, feeds)
+    store = Store(tmp_path / "store", create=True)
+    games = list(iter_games(feeds))
+    ingest(store, games[: len(games) // 2], batch_pitches=2000)
+    ingest(store, games, batch_pitches=2000)
+
+    cubes = rollup.load(store.partition(SEASON))
+    assert cubes is not None
+    table = store.table(SEASON)
+    for role, split in rollup.CUBES:
+        assert_cube_matches_scan(cubes[role, split], table, role, split)
+
+
+@pytest.mark.parametrize("role", query.ROLES)
+@pytest.mark.parametrize("split", [None, "count", "pitch_type"])
+def test_store_lines_from_rollup_equal_scan(store, role, split):
+    rolled = query.stat_lines(store, role=role, split=split, ev_percentiles=())
+    scanned = query.stat_lines(store.table(SEASON), role=role, split=split, ev_percentiles=())
+    assert rolled.origin == "rollup"
+    assert scanned.origin == "scan"
+    assert rolled.columns.keys() == scanned.columns.keys()
+    for name in rolled.columns:
+        np.testing.assert_allclose(rolled[name], scanned[name], equal_nan=True)
+
+
+def test_leaderboard_player_filter_uses_rollup(store):
+    players = query.leaderboard(store, limit=3)["player"]
+    lines = query.stat_lines(store, players=players.tolist(), ev_percentiles=())
+    assert lines.origin == "rollup"
+    assert sorted(lines["player"].tolist()) == sorted(players.tolist())
+
+
+def test_exit_velocity_queries_fall_back_to_scan(store):
+    board = query.leaderboard(store, "ev_p90", min_pa=50)
+    assert board.origin == "scan"
+    assert np.all(np.diff(board["ev_p90"]) <= 0)
+
+
+def test_stale_rollup_falls_back_to_scan(store, season_columns):
+    # Appending behind the maintenance path leaves the rollup one batch behind.
+    extra = {k: v[:500] for k, v in season_columns.items()}
+    extra["game_pk"] = extra["game_pk"] + N_GAMES
+    store.append(SEASON, extra)
+    assert rollup.load(store.partition(SEASON)) is None
+
+    lines = query.stat_lines(store, ev_percentiles=())
+    assert lines.origin == "scan"
+    assert lines["pa"].sum() == (store.table(SEASON)["event"] != 0).sum()
+
+    assert rollup.update(store.partition(SEASON)) == 500
+    assert query.stat_lines(store, ev_percentiles=()).origin == "rollup"
+
+
+def test_multi_season_rollup_sums_seasons(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    append_columns(store, SEASON, season_columns)
+    append_columns(store, SEASON + 1, synth.generate_season(SEASON + 1, seed=7, n_games=N_GAMES))
+    rolled = query.stat_lines(store, split="home_away", ev_percentiles=())
+    scanned = query.stat_lines(store.table(), split="home_away", ev_percentiles=())
+    assert rolled.origin == "rollup"
+    for name in query.COUNTING_STATS:
+        np.testing.assert_array_equal(rolled[name], scanned[name])
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from statshot import schema, synth
+from statshot.store import CODECS, Partition, Store, StoreError, decode_block, encode_block
+
+SEASON = 2023
+
+
+@pytest.fixture(scope="module")
+def season_columns():
+    return synth.generate_season(SEASON, seed=2, n_games=10)
+
+
+def _rows(columns, lo, hi):
+    return {k: v[lo:hi] for k, v in columns.items()}
+
+
+def assert_table_equals(table, columns):
+    assert len(table) == len(columns["game_pk"])
+    for name in schema.COLUMN_NAMES:
+        np.testing.assert_array_equal(table[name], columns[name].astype(schema.DTYPES[name]))
+
+
+def test_append_and_read_back(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    n = len(season_columns["game_pk"])
+    assert store.append(SEASON, _rows(season_columns, 0, n // 2)) == n // 2
+    assert store.append(SEASON, _rows(season_columns, n // 2, n)) == n - n // 2
+    assert store.append(SEASON, _rows(season_columns, 0, 0)) == 0
+    assert store.seasons() == [SEASON]
+    assert_table_equals(store.table(SEASON), season_columns)
+
+    reopened = Store(tmp_path / "store")
+    assert isinstance(reopened.table(SEASON)["batter"], np.memmap)
+    assert_table_equals(reopened.table(SEASON), season_columns)
+
+
+def test_append_rejects_ragged_or_missing_columns(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    columns = _rows(season_columns, 0, 10)
+    with pytest.raises(StoreError):
+        store.append(SEASON, {k: v for k, v in columns.items() if k != "event"})
+    with pytest.raises(StoreError):
+        store.append(SEASON, dict(columns, event=columns["event"][:5]))
+    with pytest.raises(StoreError):
+        Store(tmp_path / "missing")
+
+
+def test_uncommitted_bytes_are_ignored_and_truncated(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    store.append(SEASON, _rows(season_columns, 0, 100))
+    # A writer that died after writing column bytes but before meta.json.
+    partition = store.partition(SEASON)
+    for name in ("batter", "launch_speed"):
+        with open(partition.column_path(name), "ab") as fh:
+            fh.write(b"\xff" * 40)
+
+    reopened = Store(tmp_path / "store")
+    assert len(reopened.table(SEASON)) == 100
+    assert_table_equals(reopened.table(SEASON), _rows(season_columns, 0, 100))
+
+    reopened.append(SEASON, _rows(season_columns, 100, 300))
+    assert_table_equals(Store(tmp_path / "store").table(SEASON), _rows(season_columns, 0, 300))
+
+
+def test_preallocate_then_commit(tmp_path, season_columns):
+    partition = Partition(tmp_path / f"season={SEASON}")
+    partition.append(_rows(season_columns, 0, 50))
+    start = partition.preallocate(30)
+    assert start == 50
+    assert partition.rows == 50
+    for name in schema.COLUMN_NAMES:
+        data = season_columns[name][50:80].astype(schema.DTYPES[name])
+        with open(partition.column_path(name), "r+b") as fh:
+            fh.seek(start * data.itemsize)
+            fh.write(data.tobytes())
+    partition.commit(80)
+    assert_table_equals(Partition(partition.path).table(), _rows(season_columns, 0, 80))
+
+
+def test_multi_season_table_and_refresh(tmp_path, season_columns):
+    store = Store(tmp_path / "store", create=True)
+    reader = Store(tmp_path / "store")
+    store.append(SEASON, _rows(season_columns, 0, 100))
+    store.append(SEASON + 1, _rows(season_columns, 100, 250))
+    table = store.table()
+    assert len(table) == 250
+    np.testing.assert_array_equal(table["game_pk"], season_columns["game_pk"][:250])
+    assert len(store.table([SEASON + 1])) == 150
+
+    assert len(reader.partition(SEASON)) == 100
+    store.append(SEASON, _rows(season_columns, 250, 300))
+    assert len(reader.partition(SEASON)) == 100       # cached until the next ingest
+    store.bump_generation()
+    assert reader.refresh() == 1
+    assert len(reader.partition(SEASON)) == 150
+
+
+@pytest.mark.parametrize("codec", ["zlib", "zstd"])
+def test_compressed_round_trip(tmp_path, season_columns, codec):
+    if codec not in CODECS:
+        pytest.skip(f"{codec} is not installed")
+    store = Store(tmp_path / "store", create=True, codecs={"launch_speed": codec, "event": codec})
+    n = len(season_columns["game_pk"])
+    for lo, hi in ((0, 7), (7, n // 2), (n // 2, n)):
+        store.append(SEASON, _rows(season_columns, lo, hi))
+    assert len(store.partition(SEASON).meta["blocks"]["launch_speed"]) == 3
+
+    reopened = Store(tmp_path / "store")
+    assert reopened.codecs == {"launch_speed": codec, "event": codec}
+    assert reopened.partition(SEASON).codec("batter") is None
+    assert_table_equals(reopened.table(SEASON), season_columns)
+
+
+def test_encode_decode_block(season_columns):
+    for name in ("launch_speed", "game_pk", "event"):
+        values = season_columns[name].astype(schema.DTYPES[name])
+        payload = encode_block("zlib", values)
+        assert len(payload) < values.nbytes
+        np.testing.assert_array_equal(decode_block("zlib", payload, values.dtype, len(values)),
+                                      values)
+    with pytest.raises(StoreError):
+        encode_block("lz99", season_columns["batter"])
+
+
+def test_unknown_codecs_are_rejected(tmp_path):
+    with pytest.raises(StoreError):
+        Store(tmp_path / "a", create=True, codecs="lz99")
+    with pytest.raises(StoreError):
+        Partition(tmp_path / f"season={SEASON}", codecs={"nope": "zlib"})
+    Store(tmp_path / "b", create=True)
+    with pytest.raises(StoreError):
+        Store(tmp_path / "b", codecs="zlib")
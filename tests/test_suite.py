@@ -0,0 +1,68 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+SUITE_PATH = Path(__file__).resolve().parent.parent / "benchmarks" / "suite.py"
+
+
+@pytest.fixture(scope="module")
+def suite():
+    spec = importlib.util.spec_from_file_location("suite", SUITE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _results(commit, **metrics):
+    return {"environment": {"commit": commit},
+            "benchmarks": {"query": {"reports": [{"benchmark": "stat lines",
+                                                  "results": metrics}]},
+                           "api": {"error": ["boom"]}}}
+
+
+def test_flatten_keeps_numbers(suite):
+    flat = suite.flatten(_results("a", scan_ms=2, rows=10, cached=True, note="x", p50_us=1.5))
+    assert flat == {"query/stat lines/scan_ms": 2.0, "query/stat lines/rows": 10.0,
+                    "query/stat lines/p50_us": 1.5}
+
+
+@pytest.mark.parametrize("metric, sense", [
+    ("q/r/scan_ms", -1), ("q/r/build_s", -1), ("q/r/rss_mb", -1), ("q/r/errors", -1),
+    ("q/r/pitches_per_s", 1), ("q/r/probe8_recall", 1), ("q/r/hit_rate", 1),
+    ("q/r/speedup_x", 1), ("q/r/rows", 0), ("q/r/pitches", 0),
+])
+def test_direction(suite, metric, sense):
+    assert suite.direction(metric) == sense
+
+
+def test_compare_flags_regressions(suite):
+    old = _results("a", scan_ms=10.0, pitches_per_s=1000.0, rows=5, hit_rate=0.5, gone_ms=1.0)
+    new = _results("b", scan_ms=12.0, pitches_per_s=1200.0, rows=50, hit_rate=0.52)
+    rows, regressions = suite.compare(old, new, 0.10)
+    flags = {row[0].rsplit("/", 1)[-1]: row[4] for row in rows}
+    assert flags == {"scan_ms": "REGRESSION", "pitches_per_s": "improved", "rows": "",
+                     "hit_rate": "", "gone_ms": "missing"}
+    assert regressions == 1
+    assert suite.compare(old, new, 0.25)[1] == 0
+    assert suite.compare(old, old, 0.0)[1] == 0
+
+
+def test_compare_exit_status(suite, tmp_path, monkeypatch, capsys):
+    base, same, slower = (tmp_path / f"{name}.json" for name in ("base", "same", "slower"))
+    base.write_text(json.dumps(_results("a", scan_ms=10.0)))
+    same.write_text(json.dumps(_results("b", scan_ms=10.5)))
+    slower.write_text(json.dumps(_results("c", scan_ms=20.0)))
+
+    monkeypatch.setattr(sys, "argv", ["suite.py", "--compare", str(base), str(same)])
+    assert suite.main() == 0
+    assert "0 regression(s) over 10%" in capsys.readouterr().out
+    monkeypatch.setattr(sys, "argv", ["suite.py", "--compare", str(base), str(slower)])
+    assert suite.main() == 1
+    out = capsys.readouterr().out
+    assert "REGRESSION" in out and "1 regression(s) over 10%" in out
+    monkeypatch.setattr(sys, "argv", ["suite.py", "--compare", str(base), str(slower),
+                                      "--threshold", "1.5"])
+    assert suite.main() == 0
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from statshot import schema, synth
+
+SEASON = 2024
+
+
+@pytest.mark.parametrize("n_games", [1, 2, 3])
+def test_short_seasons_for_many_seeds(n_games):
+    # A single long or high-scoring game needs more random draws than an
+    # average one; seeds 10, 27 and 56 used to run out with one game.
+    for seed in range(60):
+        columns = synth.generate_season(SEASON, seed=seed, n_games=n_games)
+        assert set(columns) == set(schema.COLUMN_NAMES)
+        assert len(np.unique(columns["game_pk"])) == n_games
+        assert columns["inning"].max() >= 9
+
+
+def test_same_seed_same_season():
+    one = synth.generate_season(SEASON, seed=10, n_games=4)
+    two = synth.generate_season(SEASON, seed=10, n_games=4)
+    for name in schema.COLUMN_NAMES:
+        np.testing.assert_array_equal(one[name], two[name], err_msg=name)
+    other = synth.generate_season(SEASON, seed=11, n_games=4)
+    assert not np.array_equal(one["event"], other["event"])